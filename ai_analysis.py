@@ -1,76 +1,802 @@
+import functools
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
 import streamlit as st
-from anthropic import Anthropic
+import metrics
+import model_router
+import settings
+from analysis_cache import canonical_json, get_analysis_cache, make_cache_key
+from caas_scoring import score_level
+from llm_client import CircuitOpenError, create_message, stream_message
+from rate_limiter import AdmissionRejected
+from similarity_cache import get_similarity_index
+from single_flight import LeaderInterrupted, SingleFlight, get_shared_flight
+from state_backend import StateBackendError
 
-def generate_career_analysis(caas_scores, background_info):
-    """Generate comprehensive career analysis using Claude"""
-    
-    # Construct the prompt
-    prompt = f"""You are a career guidance expert specializing in supporting people at risk of offending. 
-    Please analyze the following assessment results and background information to provide personalized career guidance.
-
-    CAAS Assessment Scores:
-    {format_caas_scores(caas_scores)}
-
-    Background Information:
-    - Location: {background_info['county']}, {background_info['postcode_area']}
-    - Education: {background_info['education']}
-    - Current Situation: {background_info['current_situation']}
-    - Career Interests: {', '.join(background_info['interests'])}
-    - Barriers: {', '.join(background_info['barriers'])}
-    - Support Systems: {background_info['support_systems']}
-    - Goals: {background_info['goals']}
-
-    Please provide:
-    1. A summary of key strengths and areas for development
-    2. Specific career recommendations considering local opportunities
-    3. Tailored strategies for overcoming identified barriers
-    4. Immediate next steps they can take
-    5. Long-term development suggestions
-
-    Focus on practical, achievable recommendations that consider their specific circumstances.
-    
-    Format your response with clear section headers using markdown formatting (e.g., ### Strengths and Development Areas).
+# The primary model tier; requests may be routed to ANALYSIS_FAST_MODEL
+ANALYSIS_MODEL = settings.ANALYSIS_MODEL
+
+# Bump whenever the prompt wording changes so cached analyses are not reused
+PROMPT_VERSION = "3"
+
+# Minimum seconds between progressive repaints while streaming
+STREAM_REPAINT_INTERVAL = 0.05
+
+BUSY_MESSAGE = "Lots of people are asking for an analysis right now, so a basic analysis is shown instead. Please try again in a few minutes."
+
+logger = logging.getLogger(__name__)
+
+# Identical requests in flight at the same time share one upstream call
+analysis_flight = SingleFlight()
+
+# Model requests the page waits on run here, so the script thread stays
+# free to paint progress (and, when hedged against the local analysis, can
+# stop waiting at the deadline while the request finishes in the cache)
+_hedge_executor = ThreadPoolExecutor(
+    max_workers=settings.ANALYSIS_WORKERS,
+    thread_name_prefix="hedged-analysis",
+)
+
+# Separate pool for per-section requests, which are submitted from the
+# hedged pool's threads
+_section_executor = ThreadPoolExecutor(
+    max_workers=settings.ANALYSIS_WORKERS,
+    thread_name_prefix="analysis-section",
+)
+
+SYSTEM_PROMPT = "You are a career guidance expert specializing in supporting people at risk of offending. Provide practical, empathetic guidance with clear section headers using markdown."
+
+# Static instructions shared by every request. Together with the system
+# prompt they form the cacheable prefix; only the profile below varies.
+ANALYSIS_INSTRUCTIONS = """You are a career guidance expert specializing in supporting people at risk of offending.
+Please analyze the assessment results and background information in the user's message to provide personalized career guidance.
+
+Please provide:
+1. A summary of key strengths and areas for development
+2. Specific career recommendations considering local opportunities
+3. Tailored strategies for overcoming identified barriers
+4. Immediate next steps they can take
+5. Long-term development suggestions
+
+Focus on practical, achievable recommendations that consider their specific circumstances.
+
+Format your response with clear section headers using markdown formatting (e.g., ### Strengths and Development Areas)."""
+
+SYSTEM_BLOCKS = [{
+    "type": "text",
+    "text": f"{SYSTEM_PROMPT}\n\n{ANALYSIS_INSTRUCTIONS}",
+    "cache_control": {"type": "ephemeral"},
+}]
+
+@dataclass(frozen=True, slots=True)
+class AnalysisSection:
+    """One section of the analysis when it is generated section by section
+
+    ``inputs`` lists the background fields the section depends on; together
+    with the scores (when ``uses_scores``) they are the section's prompt and
+    its cache key, so sections with narrow inputs are shared across users.
     """
+    key: str
+    title: str
+    instruction: str
+    inputs: tuple
+    max_tokens: int
+    uses_scores: bool = True
 
-    try:
-        anthropic = Anthropic(api_key=st.secrets["anthropic"]["api_key"])
-        
-        response = anthropic.messages.create(
-            model="claude-3-sonnet-20240229",
-            max_tokens=1500,
-            temperature=0.7,
-            system="You are a career guidance expert specializing in supporting people at risk of offending. Provide practical, empathetic guidance with clear section headers using markdown.",
-            messages=[{
+ANALYSIS_SECTIONS = (
+    AnalysisSection(
+        "strengths", "Strengths and Development Areas",
+        "Summarise their key strengths and areas for development.",
+        (), 250,
+    ),
+    AnalysisSection(
+        "careers", "Career Recommendations",
+        "Recommend specific careers, considering local opportunities.",
+        ("county", "postcode_area", "education", "interests", "goals"), 350,
+    ),
+    AnalysisSection(
+        "barriers", "Strategies for Overcoming Barriers",
+        "Give tailored strategies for overcoming each barrier, with local support where possible.",
+        ("county", "postcode_area", "barriers"), 300, uses_scores=False,
+    ),
+    AnalysisSection(
+        "next_steps", "Immediate Next Steps",
+        "List the immediate next steps they can take this week and this month.",
+        ("county", "postcode_area", "education", "current_situation", "interests",
+         "barriers", "support_systems", "goals"), 250,
+    ),
+    AnalysisSection(
+        "long_term", "Long-Term Development",
+        "Suggest how they can keep developing over the next one to three years.",
+        ("education", "interests", "goals"), 250,
+    ),
+)
+
+SECTION_INSTRUCTIONS = """You are writing one section of a personalised career guidance report.
+Use only the information in the user's message and focus on practical, achievable recommendations.
+Write the body of the section in markdown, using short paragraphs or bullet points. Do not add a heading; the section title is added for you."""
+
+SECTION_SYSTEM_BLOCKS = [{
+    "type": "text",
+    "text": f"{SYSTEM_PROMPT}\n\n{SECTION_INSTRUCTIONS}",
+    "cache_control": {"type": "ephemeral"},
+}]
+
+# Token budgets for free-text fields; longer answers are truncated
+FIELD_TOKEN_BUDGETS = {
+    "current_situation": 300,
+    "goals": 300,
+    "support_systems": 200,
+}
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text):
+    """Cheap token estimate (about four characters per token for English)"""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+def fit_to_budget(text, max_tokens):
+    """Truncate text at a word boundary so it fits within max_tokens"""
+    text = (text or "").strip()
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[:max_tokens * CHARS_PER_TOKEN]
+    if " " in cut:
+        cut = cut.rsplit(" ", 1)[0]
+    return cut.rstrip(" ,;:") + " [...]"
+
+# Background fields that reach the prompt; anything else in the form
+# (e.g. additional_info) is not sent and does not affect the cache key
+PROMPT_FIELDS = (
+    "county", "postcode_area", "education", "current_situation",
+    "interests", "barriers", "support_systems", "goals",
+)
+
+def prompt_fields(background_info):
+    """The background values the prompt is built from, free text cut to budget"""
+    fields = {name: background_info[name] for name in PROMPT_FIELDS}
+    for name, budget in FIELD_TOKEN_BUDGETS.items():
+        fields[name] = fit_to_budget(fields[name], budget)
+    return fields
+
+def build_prompt(caas_scores, background_info):
+    """Construct the per-user part of the prompt from scores and background"""
+    fields = prompt_fields(background_info)
+    return f"""CAAS Assessment Scores:
+{format_caas_scores(caas_scores)}
+
+Background Information:
+- Location: {fields['county']}, {fields['postcode_area']}
+- Education: {fields['education']}
+- Current Situation: {fields['current_situation']}
+- Career Interests: {', '.join(fields['interests'])}
+- Barriers: {', '.join(fields['barriers'])}
+- Support Systems: {fields['support_systems']}
+- Goals: {fields['goals']}"""
+
+def build_request(caas_scores, background_info):
+    """Keyword arguments for messages.create / messages.stream"""
+    with metrics.span("prompt_build"):
+        return {
+            "model": ANALYSIS_MODEL,
+            "max_tokens": settings.ANALYSIS_MAX_TOKENS,
+            "temperature": 0.7,
+            "system": SYSTEM_BLOCKS,
+            "messages": [{
+                "role": "user",
+                "content": build_prompt(caas_scores, background_info)
+            }],
+        }
+
+def build_section_prompt(section, caas_scores, background_info):
+    """The per-user prompt for one section, holding only the inputs it depends on"""
+    lines = [f"Section: {section.title}", f"Task: {section.instruction}"]
+    if section.uses_scores:
+        lines += ["", "CAAS Assessment Scores:", format_caas_scores(caas_scores)]
+    lines += ["", "Background Information:"]
+    fields = prompt_fields(background_info)
+    if "county" in section.inputs:
+        lines.append(f"- Location: {fields['county']}, {fields['postcode_area']}")
+    for field, label in (
+        ("education", "Education"),
+        ("current_situation", "Current Situation"),
+        ("interests", "Career Interests"),
+        ("barriers", "Barriers"),
+        ("support_systems", "Support Systems"),
+        ("goals", "Goals"),
+    ):
+        if field not in section.inputs:
+            continue
+        value = fields[field]
+        if isinstance(value, (list, tuple)):
+            value = ", ".join(value) or "None"
+        lines.append(f"- {label}: {value}")
+    return "\n".join(lines)
+
+def build_section_request(section, caas_scores, background_info):
+    """Keyword arguments for one section's messages request"""
+    with metrics.span("prompt_build"):
+        return {
+            "model": ANALYSIS_MODEL,
+            "max_tokens": section.max_tokens,
+            "temperature": 0.7,
+            "system": SECTION_SYSTEM_BLOCKS,
+            "messages": [{
                 "role": "user",
-                "content": prompt
-            }]
+                "content": build_section_prompt(section, caas_scores, background_info)
+            }],
+        }
+
+def section_cache_key(section, caas_scores, background_info, model=ANALYSIS_MODEL):
+    """Cache key covering only the inputs a section depends on"""
+    fields = prompt_fields(background_info)
+    return make_cache_key(
+        caas_scores if section.uses_scores else {},
+        {field: fields[field] for field in section.inputs},
+        model,
+        f"{PROMPT_VERSION}/{section.key}",
+    )
+
+def log_usage(usage, label="analysis"):
+    """Log input, cached and output token counts from a response"""
+    if usage is None:
+        return
+    metrics.increment("llm_input_tokens_total", getattr(usage, "input_tokens", None) or 0)
+    metrics.increment("llm_cache_read_tokens_total", getattr(usage, "cache_read_input_tokens", None) or 0)
+    metrics.increment("llm_cache_write_tokens_total", getattr(usage, "cache_creation_input_tokens", None) or 0)
+    metrics.increment("llm_output_tokens_total", getattr(usage, "output_tokens", None) or 0)
+    logger.info(
+        "%s usage: input=%s cache_read=%s cache_write=%s output=%s",
+        label,
+        getattr(usage, "input_tokens", None),
+        getattr(usage, "cache_read_input_tokens", None),
+        getattr(usage, "cache_creation_input_tokens", None),
+        getattr(usage, "output_tokens", None),
+    )
+
+def analysis_cache_key(caas_scores, background_info, model=ANALYSIS_MODEL):
+    """Content-addressed key identifying an analysis written by model
+
+    Keyed on what the prompt is built from, so answers that produce the
+    same prompt share an entry.
+    """
+    return make_cache_key(caas_scores, prompt_fields(background_info), model, PROMPT_VERSION)
+
+def acceptable_models(route):
+    """Models whose cached text may answer a request on route, best first
+
+    The primary model's text always may; a faster tier's only while
+    requests like this one are routed to that tier anyway.
+    """
+    if route is None or route.model == ANALYSIS_MODEL:
+        return (ANALYSIS_MODEL,)
+    return (ANALYSIS_MODEL, route.model)
+
+def _lookup(get, key_for, models):
+    """First cached (text, model) among the models' keys, or None"""
+    for model in models:
+        text = get(key_for(model))
+        if text is not None:
+            return text, model
+    return None
+
+def queue_message(position):
+    """Progress note shown while a request waits for admission"""
+    if position <= 1:
+        return "_You're next in line for the AI service..._"
+    return f"_You're number {position} in line for the AI service..._"
+
+def request_fingerprint(request):
+    """Hash of the exact request payload, used to coalesce duplicates"""
+    return hashlib.sha256(canonical_json(request).encode("utf-8")).hexdigest()
+
+def request_career_analysis(caas_scores, background_info, on_queue=None, on_text=None):
+    """Return the analysis text from the cache or the model
+
+    Safe to call outside a Streamlit script thread: it touches no UI and
+    lets upstream errors propagate. Returns None if the model replied with
+    no content. ``on_queue(position)`` is called while the request waits in
+    the admission queue. When ``on_text`` is given the response is streamed
+    and each chunk is passed to it as it arrives.
+    """
+    # Serve repeat renders from the persistent cache
+    cache = get_analysis_cache()
+    route = model_router.route(background_info)
+    key_for = lambda model: analysis_cache_key(caas_scores, background_info, model)
+    if cache is not None:
+        found = _lookup(cache.get, key_for, acceptable_models(route))
+        if found is not None:
+            return found[0]
+
+    reused = reuse_similar_analysis(caas_scores, background_info)
+    if reused is not None:
+        return reused
+
+    if settings.ANALYSIS_SECTIONED:
+        analysis, model = request_sectioned_analysis(caas_scores, background_info, on_queue, on_text)
+    else:
+        analysis, model = _generate(
+            build_request(caas_scores, background_info), key_for, on_queue, on_text, route
         )
-        
-        # Extract the content from the response
-        if hasattr(response, 'content') and len(response.content) > 0:
-            return response.content[0].text
+    # Similar profiles reuse an analysis as the primary model's, so only
+    # those are offered
+    if analysis is not None and model == ANALYSIS_MODEL:
+        remember_profile(caas_scores, background_info)
+    return analysis
+
+def reuse_similar_analysis(caas_scores, background_info):
+    """Return the analysis of a profile differing only in postcode area, or None
+
+    The reused analysis is also cached under this profile's own key.
+    """
+    index = get_similarity_index()
+    if index is None:
+        return None
+    cache = get_analysis_cache()
+    with metrics.span("similarity_lookup"):
+        analysis = index.find(caas_scores, background_info, cache)
+    if analysis is None:
+        return None
+    logger.info("Reusing the analysis of a profile in another postcode area")
+    cache.set(analysis_cache_key(caas_scores, background_info), analysis)
+    return analysis
+
+def remember_profile(caas_scores, background_info):
+    """Make a freshly generated analysis available to similar profiles"""
+    index = get_similarity_index()
+    if index is not None:
+        index.add(caas_scores, background_info, analysis_cache_key(caas_scores, background_info))
+
+def request_sectioned_analysis(caas_scores, background_info, on_queue=None, on_text=None):
+    """Generate the analysis as concurrent, smaller per-section requests
+
+    Wall-clock time is bounded by the slowest section rather than the whole
+    response. Each section has its own token budget and cache entry. With
+    ``on_text`` the sections are streamed to it in order: a section's text
+    is passed on once every section before it has finished. ``on_queue`` is
+    called from this thread, never from the section threads.
+
+    Returns (analysis, model), the model being the least capable tier that
+    wrote a section; the assembled analysis is cached under that model's
+    key, and the caller checks that cache first.
+    """
+    cache = get_analysis_cache()
+
+    streamed = [[] for _ in ANALYSIS_SECTIONS]
+    # Filled by the section threads and passed on while waiting below, as
+    # on_queue may paint the page
+    queue_position = [None]
+    futures = [
+        _section_executor.submit(
+            _request_text,
+            build_section_request(section, caas_scores, background_info),
+            functools.partial(section_cache_key, section, caas_scores, background_info),
+            lambda position: queue_position.__setitem__(0, position),
+            chunks.append if on_text is not None else None,
+            model_router.route(background_info, max_tokens=section.max_tokens),
+        )
+        for section, chunks in zip(ANALYSIS_SECTIONS, streamed)
+    ]
+
+    poll = STREAM_REPAINT_INTERVAL if on_text is not None or on_queue is not None else None
+    shown_position = None
+    parts = []
+    models = set()
+    try:
+        for section, future, chunks in zip(ANALYSIS_SECTIONS, futures, streamed):
+            heading = f"### {section.title}\n\n"
+            sent = 0
+            while True:
+                try:
+                    body, model = future.result(timeout=poll)
+                    break
+                except FutureTimeout:
+                    pass
+                if on_queue is not None and queue_position[0] != shown_position:
+                    shown_position = queue_position[0]
+                    on_queue(shown_position)
+                # The heading goes out with the section's first text, so
+                # nothing is passed on before the model has answered
+                available = len(chunks)
+                if on_text is not None and available > sent:
+                    on_text(("" if sent else heading) + "".join(chunks[sent:available]))
+                    sent = available
+            body = _strip_heading(body or "")
+            if not body:
+                continue
+            models.add(model)
+            if on_text is not None:
+                # Every chunk is in by the time the future completes
+                rest = "".join(chunks[sent:]) if sent else body
+                on_text(("" if sent else heading) + rest + "\n\n")
+            parts.append(heading + body)
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+
+    if not parts:
+        return None, None
+    analysis = "\n\n".join(parts)
+    tiers = [tier.name for tier in model_router.get_tiers()]
+    model = max(models, key=tiers.index)
+    if cache is not None:
+        cache.set(analysis_cache_key(caas_scores, background_info, model), analysis)
+    return analysis, model
+
+def _strip_heading(text):
+    """Drop a leading markdown heading the model added despite the prompt"""
+    text = text.strip()
+    if text.startswith("#"):
+        text = text.partition("\n")[2].strip()
+    return text
+
+def _request_text(request, key_for, on_queue=None, on_text=None, route=None):
+    """Cached, coalesced model call returning (text or None, model)"""
+    # Serve repeat renders from the persistent cache
+    cache = get_analysis_cache()
+    if cache is not None:
+        found = _lookup(cache.get, key_for, acceptable_models(route))
+        if found is not None:
+            return found
+    return _generate(request, key_for, on_queue, on_text, route)
+
+def _generate(request, key_for, on_queue=None, on_text=None, route=None):
+    """Coalesced model call returning (text or None, model that wrote it)
+
+    The text is cached under ``key_for(model)``, so a fast-tier or hedged
+    reply never fills the primary model's entry. With a route the request
+    goes to the routed model and output budget, hedged as the route says;
+    identical requests still coalesce on the unrouted payload.
+
+    With streaming enabled the leading call streams even when its own
+    caller has no ``on_text`` (e.g. a speculative job), publishing the text
+    so a caller that joins it with ``on_text`` is streamed to as well.
+    """
+    cache = get_analysis_cache()
+    flight_key = request_fingerprint(request)
+    streaming = on_text is not None or settings.ANALYSIS_STREAMING
+
+    def publish(text):
+        analysis_flight.publish(flight_key, text)
+        if on_text is not None:
+            on_text(text)
+
+    def call_model():
+        sink = publish if streaming else None
+        if route is None:
+            model = request["model"]
+            analysis = _call_model(request, on_queue, sink)
         else:
+            routed = dict(request, max_tokens=route.max_tokens)
+            analysis, model = model_router.run(
+                route,
+                lambda model, claim: _call_model(dict(routed, model=model), on_queue, sink, claim),
+                streaming=streaming,
+            )
+        if analysis is not None and cache is not None:
+            cache.set(key_for(model), analysis)
+        return analysis, model
+
+    shared = get_shared_flight()
+    # Any model the leader may answer with
+    models = (request["model"],) if route is None else tuple(filter(None, (route.model, route.hedge_model)))
+
+    def call_once_across_processes():
+        # Other processes wait for this one's result to reach the cache
+        try:
+            return shared.do(
+                flight_key,
+                call_model,
+                lambda: _lookup(cache.peek, key_for, models),
+                timeout=settings.SINGLE_FLIGHT_WAIT_TIMEOUT,
+            )
+        except StateBackendError as e:
+            logger.warning("Requests not coalesced across processes: %s", e)
+            return call_model()
+
+    if shared is not None and cache is not None:
+        return analysis_flight.do(
+            flight_key, call_once_across_processes, settings.SINGLE_FLIGHT_WAIT_TIMEOUT, on_text
+        )
+    return analysis_flight.do(flight_key, call_model, settings.SINGLE_FLIGHT_WAIT_TIMEOUT, on_text)
+
+def _call_model(request, on_queue=None, on_text=None, claim=None):
+    """Send one model request; returns its text, or None if it was empty
+
+    ``claim()``, when given, is called once output is available. If it
+    returns False a competing hedged request got there first: the stream is
+    closed (or the reply dropped) and None is returned.
+    """
+    model = request["model"]
+    started = time.perf_counter()
+    if on_text is None:
+        response = create_message(on_queue=on_queue, **request)
+        usage = getattr(response, 'usage', None)
+        log_usage(usage)
+        model_router.record(
+            model, "create", None, time.perf_counter() - started, getattr(usage, "output_tokens", None)
+        )
+        if claim is not None and not claim():
+            return None
+
+        # Extract the content from the response
+        if not (hasattr(response, 'content') and len(response.content) > 0):
+            return None
+        return response.content[0].text
+
+    chunks = []
+    first_token = None
+    with stream_message(on_queue=on_queue, **request) as stream:
+        for text in stream.text_stream:
+            if first_token is None:
+                first_token = time.perf_counter() - started
+                if claim is not None and not claim():
+                    # Leaving the block closes the losing stream
+                    return None
+            chunks.append(text)
+            on_text(text)
+        usage = stream.get_final_message().usage
+    log_usage(usage)
+    model_router.record(
+        model, "stream", first_token, time.perf_counter() - started, getattr(usage, "output_tokens", None)
+    )
+    analysis = "".join(chunks)
+    return analysis if analysis.strip() else None
+
+def generate_career_analysis(caas_scores, background_info):
+    """Generate comprehensive career analysis using Claude"""
+    status = st.empty()
+    # Routed and sectioned requests report their queue position from worker
+    # threads, so it is collected here and painted from the script thread
+    queue_position = [None]
+    future = _hedge_executor.submit(
+        request_career_analysis,
+        caas_scores,
+        background_info,
+        lambda position: queue_position.__setitem__(0, position),
+    )
+    shown_position = None
+    try:
+        while True:
+            try:
+                analysis = future.result(timeout=STREAM_REPAINT_INTERVAL)
+                break
+            except FutureTimeout:
+                pass
+            if queue_position[0] != shown_position:
+                shown_position = queue_position[0]
+                status.info(queue_message(shown_position))
+        if analysis is None:
             return "Error: Unable to generate analysis"
+        return analysis
     
     except Exception as e:
-        st.error(f"Error generating AI analysis: {str(e)}")
-        return generate_fallback_analysis(caas_scores, background_info)
+        return fallback_after_error(e, caas_scores, background_info)
+    finally:
+        status.empty()
+
+def hedged_career_analysis(caas_scores, background_info, placeholder, deadline):
+    """Show the local analysis at once and swap in the model's if it arrives in time
+
+    The model request runs on a worker thread. Its output replaces the local
+    analysis if it starts arriving within ``deadline`` seconds: the first
+    token when streaming, otherwise the whole response. A speculative job
+    already generating the same analysis is joined and its text so far
+    shown. A late response is still cached for the next visit. Returns
+    (analysis, from_model).
+    """
+    cache = get_analysis_cache()
+    if cache is not None:
+        try:
+            found = _lookup(
+                cache.get,
+                lambda model: analysis_cache_key(caas_scores, background_info, model),
+                acceptable_models(model_router.route(background_info)),
+            )
+        except Exception as e:
+            # The worker repeats the lookup; the local analysis covers a failure
+            logger.warning("Analysis cache lookup failed: %s", e)
+            found = None
+        if found is not None:
+            placeholder.markdown(found[0])
+            return found[0], True
+
+    local = _local_analysis(caas_scores, background_info)
+    placeholder.markdown(local)
+
+    # Filled by the worker thread; only this thread touches the page
+    chunks = []
+    queue_position = [None]
+    future = _hedge_executor.submit(
+        request_career_analysis,
+        caas_scores,
+        background_info,
+        lambda position: queue_position.__setitem__(0, position),
+        chunks.append if settings.ANALYSIS_STREAMING else None,
+    )
+
+    started = time.perf_counter()
+    status = st.empty()
+    shown_position = None
+    try:
+        while True:
+            try:
+                analysis = future.result(timeout=STREAM_REPAINT_INTERVAL)
+                break
+            except FutureTimeout:
+                pass
+            if chunks:
+                status.empty()
+                placeholder.markdown("".join(chunks) + " ▌")
+            elif time.perf_counter() - started >= deadline:
+                logger.info("Model analysis missed the %.1fs deadline; keeping the local analysis", deadline)
+                status.caption("Your personalised AI analysis is still being prepared. Check back in a minute.")
+                return local, False
+            elif queue_position[0] != shown_position:
+                shown_position = queue_position[0]
+                status.caption(queue_message(shown_position).strip("_"))
+    except Exception as e:
+        logger.warning("Model analysis failed, keeping the local analysis: %s", e)
+        metrics.increment("analysis_fallbacks_total")
+        status.caption("The AI service is unavailable right now, so this analysis was prepared from your answers.")
+        return local, False
+
+    status.empty()
+    if not analysis:
+        placeholder.markdown(local)
+        return local, False
+    placeholder.markdown(analysis)
+    return analysis, True
+
+def _stream_into(placeholder, request, flight_key):
+    """Stream a request into placeholder; returns (text, time of first token, usage)
+
+    Each chunk is also published to callers following flight_key.
+    """
+    first_token_at = None
+    chunks = []
+    on_queue = lambda position: placeholder.markdown(queue_message(position))
+    with stream_message(on_queue=on_queue, **request) as stream:
+        last_paint = 0.0
+        for text in stream.text_stream:
+            now = time.perf_counter()
+            if first_token_at is None:
+                first_token_at = now
+            chunks.append(text)
+            analysis_flight.publish(flight_key, text)
+            # Throttle repaints so long responses don't flood the websocket
+            if now - last_paint >= STREAM_REPAINT_INTERVAL:
+                placeholder.markdown("".join(chunks) + " ▌")
+                last_paint = now
+        usage = stream.get_final_message().usage
+    log_usage(usage)
+    return "".join(chunks), first_token_at, usage
+
+def stream_career_analysis(caas_scores, background_info, placeholder):
+    """Stream the career analysis into a placeholder as tokens arrive
+
+    Records time-to-first-token and total generation time in
+    ``st.session_state.analysis_timings`` and returns the assembled text.
+    """
+    cache = get_analysis_cache()
+    # Streaming into the page is not hedged, but still takes the routed tier
+    route = model_router.route(background_info)
+    if cache is not None:
+        found = _lookup(
+            cache.get,
+            lambda model: analysis_cache_key(caas_scores, background_info, model),
+            acceptable_models(route),
+        )
+        if found is not None:
+            placeholder.markdown(found[0])
+            return found[0]
+
+    reused = reuse_similar_analysis(caas_scores, background_info)
+    if reused is not None:
+        placeholder.markdown(reused)
+        return reused
+
+    request = build_request(caas_scores, background_info)
+    flight_key = request_fingerprint(request)
+    request = dict(request, model=route.model, max_tokens=route.max_tokens)
+    placeholder.markdown("_Generating your personalised analysis..._")
+
+    future, leader = analysis_flight.begin(flight_key)
+    if not leader:
+        # An identical request is already being generated; share its result,
+        # showing its text as it is written
+        shown = []
+
+        def paint(text):
+            shown.append(text)
+            placeholder.markdown("".join(shown) + " ▌")
+
+        try:
+            analysis, _ = analysis_flight.wait(future, settings.SINGLE_FLIGHT_WAIT_TIMEOUT, paint)
+        except LeaderInterrupted:
+            analysis = generate_career_analysis(caas_scores, background_info)
+        except Exception as e:
+            analysis = fallback_after_error(e, caas_scores, background_info)
+        if analysis is None:
+            analysis = "Error: Unable to generate analysis"
+        placeholder.markdown(analysis)
+        return analysis
+
+    started = time.perf_counter()
+    try:
+        try:
+            analysis, first_token_at, usage = _stream_into(placeholder, request, flight_key)
+        except BaseException as e:
+            analysis_flight.reject(flight_key, future, e)
+            raise
+
+    except Exception as e:
+        fallback = fallback_after_error(e, caas_scores, background_info)
+        placeholder.markdown(fallback)
+        return fallback
+
+    finished = time.perf_counter()
+    timings = {
+        "time_to_first_token": (first_token_at - started) if first_token_at else None,
+        "total_time": finished - started,
+    }
+    st.session_state.analysis_timings = timings
+    model_router.record(
+        route.model, "stream", timings["time_to_first_token"], timings["total_time"],
+        getattr(usage, "output_tokens", None),
+    )
+    logger.info(
+        "Streamed analysis: ttft=%s total=%.3fs chars=%d",
+        f"{timings['time_to_first_token']:.3f}s" if first_token_at else "n/a",
+        timings["total_time"],
+        len(analysis),
+    )
+
+    if not analysis.strip():
+        analysis_flight.resolve(flight_key, future, (None, route.model))
+        placeholder.error("Unable to generate career analysis. Please try again later.")
+        return analysis
+
+    if cache is not None:
+        cache.set(analysis_cache_key(caas_scores, background_info, route.model), analysis)
+    analysis_flight.resolve(flight_key, future, (analysis, route.model))
+    if route.model == ANALYSIS_MODEL:
+        remember_profile(caas_scores, background_info)
+    placeholder.markdown(analysis)
+    return analysis
 
 def format_caas_scores(scores):
     """Format CAAS scores for the prompt"""
     formatted_scores = []
     for dimension, score in scores.items():
-        level = "high" if score >= 4 else "medium" if score >= 3 else "low"
+        level = score_level(score)
         formatted_scores.append(f"{dimension}: {score}/5.0 ({level})")
     return "\n".join(formatted_scores)
 
+def _local_analysis(caas_scores, background_info):
+    # Imported on use: local_analysis builds on recommendations, which imports this module
+    from local_analysis import generate_local_analysis
+
+    return generate_local_analysis(caas_scores, background_info)
+
 def generate_fallback_analysis(caas_scores, background_info):
-    """Generate basic analysis if AI service is unavailable"""
-    return """### Analysis Currently Unavailable
+    """Generate the rule-based analysis if the AI service is unavailable"""
+    metrics.increment("analysis_fallbacks_total")
+    return _local_analysis(caas_scores, background_info)
 
-We apologize, but we're unable to generate a personalized analysis at the moment. 
-Please refer to the Career Paths, Skill Development, and Resources tabs for guidance.
-"""
+def fallback_after_error(error, caas_scores, background_info):
+    """Tell the user why the model analysis failed and return the rule-based one"""
+    if isinstance(error, AdmissionRejected):
+        st.info(BUSY_MESSAGE)
+    elif isinstance(error, CircuitOpenError):
+        st.warning("The AI service is temporarily unavailable, so a basic analysis is shown instead.")
+    else:
+        st.error(f"Error generating AI analysis: {str(error)}")
+    return generate_fallback_analysis(caas_scores, background_info)
 
 def display_ai_analysis(analysis):
     """Display the AI analysis in the Streamlit UI"""
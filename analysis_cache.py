@@ -0,0 +1,247 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import metrics
+import settings
+from state_backend import StateBackendError, get_state_backend
+
+logger = logging.getLogger(__name__)
+
+def canonical_json(value):
+    """Serialize a value deterministically so equal inputs hash equally"""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+def _normalize(value):
+    """Normalize nested inputs: round floats, strip text, sort selection lists"""
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_normalize(v) for v in value]
+        if all(isinstance(v, str) for v in items):
+            return sorted(items)
+        return items
+    if isinstance(value, float):
+        return round(value, 4)
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+def make_cache_key(caas_scores, background_info, model, prompt_version):
+    """Build a content-addressed key for an analysis request"""
+    payload = {
+        "scores": _normalize(caas_scores),
+        "background": _normalize(background_info),
+        "model": model,
+        "prompt_version": prompt_version,
+    }
+    return hashlib.sha256(canonical_json(payload).encode("utf-8")).hexdigest()
+
+class AnalysisCache:
+    """SQLite-backed key/value store with TTL expiry and LRU size eviction
+
+    Reads never write: access times of hits are kept in memory and written
+    in one batch with the next ``set``, or at most every
+    ``TOUCH_FLUSH_SECONDS`` on a best-effort basis, so cache hits in
+    several processes do not queue for the database's write lock. A
+    database error reads as a miss and skips the write.
+    """
+
+    # Longest hits go without their access time reaching the database
+    TOUCH_FLUSH_SECONDS = 30.0
+
+    def __init__(self, path, ttl_seconds, max_bytes):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._touched = {}
+        self._touch_lock = threading.Lock()
+        self._next_flush = time.monotonic() + self.TOUCH_FLUSH_SECONDS
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            # Readers in other processes proceed while one process writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS analyses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_analyses_accessed ON analyses(accessed_at)"
+            )
+
+    def _connect(self, timeout=5):
+        # A short-lived connection per operation keeps the cache safe to use
+        # from Streamlit's script threads without sharing sqlite handles.
+        return sqlite3.connect(self.path, timeout=timeout)
+
+    def get(self, key):
+        """Return the cached value for key, or None if missing or expired"""
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value, created_at FROM analyses WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("Analysis cache unavailable: %s", e)
+            metrics.increment("analysis_cache_total", result="error")
+            return None
+        if row is None:
+            metrics.increment("analysis_cache_total", result="miss")
+            return None
+        value, created_at = row
+        if now - created_at > self.ttl_seconds:
+            # Removed by the next eviction
+            metrics.increment("analysis_cache_total", result="expired")
+            return None
+        metrics.increment("analysis_cache_total", result="hit")
+        with self._touch_lock:
+            self._touched[key] = now
+            due = time.monotonic() >= self._next_flush
+        if due:
+            self._flush_touches()
+        return value
+
+    def peek(self, key):
+        """Return the live value for key without counting or touching it"""
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value FROM analyses WHERE key = ? AND created_at >= ?",
+                    (key, time.time() - self.ttl_seconds),
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("Analysis cache unavailable: %s", e)
+            return None
+        return None if row is None else row[0]
+
+    def _take_touches(self):
+        with self._touch_lock:
+            touched, self._touched = self._touched, {}
+            self._next_flush = time.monotonic() + self.TOUCH_FLUSH_SECONDS
+        return touched
+
+    def _write_touches(self, conn, touched):
+        conn.executemany(
+            "UPDATE analyses SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+            [(accessed_at, key) for key, accessed_at in touched.items()],
+        )
+
+    def _flush_touches(self):
+        """Write pending access times without waiting on a busy database"""
+        touched = self._take_touches()
+        if not touched:
+            return
+        try:
+            with self._connect(timeout=0) as conn:
+                self._write_touches(conn, touched)
+        except sqlite3.Error:
+            # Best effort: an approximate LRU order is good enough
+            metrics.increment("analysis_cache_touches_dropped_total", len(touched))
+
+    def set(self, key, value):
+        """Store value under key and evict entries beyond the size budget"""
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        touched = self._take_touches()
+        try:
+            with self._connect() as conn:
+                self._write_touches(conn, touched)
+                conn.execute(
+                    """INSERT OR REPLACE INTO analyses (key, value, size, created_at, accessed_at)
+                    VALUES (?, ?, ?, ?, ?)""",
+                    (key, value, size, now, now),
+                )
+                self._evict(conn, now)
+        except sqlite3.Error as e:
+            logger.warning("Analysis not cached: %s", e)
+            metrics.increment("analysis_cache_write_errors_total")
+            metrics.increment("analysis_cache_touches_dropped_total", len(touched))
+
+    def _evict(self, conn, now):
+        """Drop expired entries, then least recently used ones until under budget"""
+        conn.execute("DELETE FROM analyses WHERE created_at < ?", (now - self.ttl_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM analyses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute("SELECT key, size FROM analyses ORDER BY accessed_at ASC")
+        stale = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM analyses WHERE key = ?", stale)
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM analyses")
+
+class SharedAnalysisCache:
+    """Analysis cache kept in a shared state backend, for several replicas
+
+    Entries expire through the backend's TTL; size eviction is left to the
+    server (e.g. Redis ``maxmemory-policy allkeys-lru``). An unreachable
+    backend reads as a miss and skips the write.
+    """
+
+    NAMESPACE = "analysis:"
+
+    def __init__(self, backend, ttl_seconds):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key):
+        try:
+            value = self.backend.get(self.NAMESPACE + key)
+        except StateBackendError as e:
+            logger.warning("Analysis cache unavailable: %s", e)
+            value = None
+        metrics.increment("analysis_cache_total", result="miss" if value is None else "hit")
+        return value
+
+    def peek(self, key):
+        try:
+            return self.backend.get(self.NAMESPACE + key)
+        except StateBackendError as e:
+            logger.warning("Analysis cache unavailable: %s", e)
+            return None
+
+    def set(self, key, value):
+        try:
+            self.backend.set(self.NAMESPACE + key, value, ttl=self.ttl_seconds)
+        except StateBackendError as e:
+            logger.warning("Analysis not cached: %s", e)
+
+    def clear(self):
+        self.backend.delete_prefix(self.NAMESPACE)
+
+@functools.lru_cache(maxsize=None)
+def get_analysis_cache():
+    """Return the process-wide analysis cache, or None when caching is disabled
+
+    With the redis state backend the cache is shared by every replica;
+    otherwise it is the SQLite file, shared by the processes on one host.
+    """
+    if not settings.ANALYSIS_CACHE_ENABLED:
+        return None
+    if settings.STATE_BACKEND == "redis":
+        return SharedAnalysisCache(get_state_backend(), settings.ANALYSIS_CACHE_TTL_SECONDS)
+    return AnalysisCache(
+        settings.ANALYSIS_CACHE_PATH,
+        settings.ANALYSIS_CACHE_TTL_SECONDS,
+        settings.ANALYSIS_CACHE_MAX_BYTES,
+    )
@@ -1,4 +1,8 @@
 import streamlit as st
+from caas_assessment import is_assessment_complete
+from recommendations import calculate_caas_scores
+from session_store import persist_session
+from speculative import start_speculative_analysis
 
 # Predefined options for form selections
 EDUCATION_LEVELS = [
@@ -83,6 +87,12 @@ def show_background_page():
     with tabs[2]:
         show_barriers_section()
 
+    save_background_info()
+
+    # Start generating the analysis as soon as everything it needs is known
+    if all_required_fields_filled() and is_assessment_complete():
+        start_speculative_analysis(calculate_caas_scores(), st.session_state.background_info)
+
     # Save and Continue button
     if all_required_fields_filled():
         if st.button("Save and Continue to Recommendations →", type="primary"):
@@ -194,6 +204,5 @@ def all_required_fields_filled():
     return all(field for field in required_fields)
 
 def save_background_info():
-    """Save background information to session state"""
-    # Additional processing or validation could be added here
-    pass
\ No newline at end of file
+    """Save background information to the session store if it changed"""
+    persist_session(background=st.session_state.background_info)
\ No newline at end of file
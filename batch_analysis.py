@@ -0,0 +1,208 @@
+"""Headless batch career analysis for whole caseloads
+
+Reads a JSONL file where each line is ``{"id": ..., "responses": {...},
+"background_info": {...}}`` (``responses`` keyed by CAAS question text, as
+stored by the assessment page), generates an analysis for each record with
+the same prompt as the app, and appends results to an output JSONL as they
+complete.
+
+The output file doubles as the checkpoint: records whose id already appears
+in it are skipped, so an interrupted run is resumed by running the same
+command again. Records without an ``id`` use their 1-based line number.
+
+    python batch_analysis.py cohort.jsonl analyses.jsonl --concurrency 8 --rpm 50
+
+Set ``ANTHROPIC_BASE_URL`` (or ``--base-url``) to run against the local stub
+server in ``tools/stub_llm_server.py``.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+from anthropic import AsyncAnthropic, Timeout
+
+import settings
+from ai_analysis import ANALYSIS_MODEL, analysis_cache_key, build_request, log_usage
+from analysis_cache import get_analysis_cache
+from caas_scoring import score_responses
+from llm_client import backoff_delay, get_api_key, is_retryable
+
+logger = logging.getLogger("batch_analysis")
+
+class RequestsPerMinuteLimiter:
+    """Spaces request starts evenly to stay within a requests-per-minute budget"""
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self.next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            start = max(now, self.next_start)
+            self.next_start = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+def truncate_torn_line(output_path):
+    """Drop a partially written final line left by an interrupted run"""
+    if not os.path.exists(output_path):
+        return
+    with open(output_path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+def load_completed_ids(output_path):
+    """Collect the ids already written to the output file"""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            completed.add(str(json.loads(line)["id"]))
+    return completed
+
+def read_records(input_path, completed):
+    """Yield (id, record) pairs that still need processing"""
+    with open(input_path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            record_id = str(record.get("id", line_number))
+            if record_id not in completed:
+                yield record_id, record
+
+async def analyse_record(client, limiter, record, use_cache):
+    """Generate the analysis for one record, retrying transient failures"""
+    caas_scores = score_responses(record["responses"])
+    background_info = record["background_info"]
+
+    cache = get_analysis_cache() if use_cache else None
+    cache_key = analysis_cache_key(caas_scores, background_info)
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return caas_scores, cached, True
+
+    request = build_request(caas_scores, background_info)
+    attempt = 0
+    while True:
+        await limiter.acquire()
+        try:
+            response = await client.messages.create(**request)
+            break
+        except Exception as e:
+            if not is_retryable(e) or attempt >= settings.LLM_MAX_RETRIES:
+                raise
+            await asyncio.sleep(backoff_delay(attempt, e))
+            attempt += 1
+
+    log_usage(response.usage, label="batch record")
+    if not response.content:
+        raise ValueError("Empty response from AI service")
+    analysis = response.content[0].text
+    if cache is not None:
+        cache.set(cache_key, analysis)
+    return caas_scores, analysis, False
+
+async def run_batch(input_path, output_path, concurrency=8, requests_per_minute=0,
+                    base_url=None, use_cache=True):
+    """Process every pending record and return a summary dict"""
+    truncate_torn_line(output_path)
+    completed = load_completed_ids(output_path)
+    timeout = Timeout(settings.LLM_READ_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT)
+    client = AsyncAnthropic(
+        api_key=get_api_key(),
+        base_url=base_url,
+        timeout=timeout,
+        max_retries=0,
+    )
+    limiter = RequestsPerMinuteLimiter(requests_per_minute)
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    summary = {"processed": 0, "failed": 0, "cache_hits": 0, "skipped": len(completed), "failed_ids": []}
+
+    with open(output_path, "a", encoding="utf-8") as out:
+
+        async def worker():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    queue.task_done()
+                    return
+                record_id, record = item
+                started = time.perf_counter()
+                try:
+                    caas_scores, analysis, cache_hit = await analyse_record(
+                        client, limiter, record, use_cache
+                    )
+                except Exception as e:
+                    logger.warning("Record %s failed: %s", record_id, e)
+                    summary["failed"] += 1
+                    summary["failed_ids"].append(record_id)
+                else:
+                    out.write(json.dumps({
+                        "id": record_id,
+                        "scores": caas_scores,
+                        "analysis": analysis,
+                        "model": ANALYSIS_MODEL,
+                        "cache_hit": cache_hit,
+                        "latency_s": round(time.perf_counter() - started, 3),
+                    }, ensure_ascii=False) + "\n")
+                    out.flush()
+                    summary["processed"] += 1
+                    summary["cache_hits"] += int(cache_hit)
+                finally:
+                    queue.task_done()
+
+        started = time.perf_counter()
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        for item in read_records(input_path, completed):
+            await queue.put(item)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+        elapsed = time.perf_counter() - started
+
+    await client.close()
+    summary["elapsed_s"] = round(elapsed, 3)
+    summary["records_per_second"] = round(summary["processed"] / elapsed, 3) if elapsed > 0 else 0.0
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate career analyses for a JSONL caseload")
+    parser.add_argument("input", help="JSONL file of {id, responses, background_info} records")
+    parser.add_argument("output", help="JSONL file to append results to (also the resume checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=8, help="maximum requests in flight")
+    parser.add_argument("--rpm", type=float, default=0, help="requests-per-minute budget (0 = unlimited)")
+    parser.add_argument("--base-url", default=None, help="override the Anthropic API base URL")
+    parser.add_argument("--no-cache", action="store_true", help="skip the persistent analysis cache")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    summary = asyncio.run(run_batch(
+        args.input,
+        args.output,
+        concurrency=args.concurrency,
+        requests_per_minute=args.rpm,
+        base_url=args.base_url,
+        use_cache=not args.no_cache,
+    ))
+    print(json.dumps(summary, indent=2))
+    return 1 if summary["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,66 +1,76 @@
 import streamlit as st
-
-# CAAS Assessment Questions
-CAAS_QUESTIONS = {
-    "Concern": [
-        "Thinking about what my future will be like",
-        "Realizing that today's choices shape my future",
-        "Preparing for the future",
-        "Becoming aware of the educational and career choices I must make",
-        "Planning how to achieve my goals",
-        "Concerned about my career"
-    ],
-    "Control": [
-        "Keeping upbeat",
-        "Making decisions by myself",
-        "Taking responsibility for my actions",
-        "Sticking up for my beliefs",
-        "Counting on myself",
-        "Doing what's right for me"
-    ],
-    "Curiosity": [
-        "Exploring my surroundings",
-        "Looking for opportunities to grow as a person",
-        "Investigating options before making a choice",
-        "Observing different ways of doing things",
-        "Probing deeply into questions I have",
-        "Becoming curious about new opportunities"
-    ],
-    "Confidence": [
-        "Performing tasks efficiently",
-        "Taking care to do things well",
-        "Learning new skills",
-        "Working up to my ability",
-        "Overcoming obstacles",
-        "Solving problems"
-    ]
-}
+from content_catalog import get_content
+from session_store import persist_session
+from caas_scoring import CAAS_QUESTIONS, QUESTION_INDEX, Answers, score_level, score_responses
 
 def initialize_assessment_state():
     """Initialize session state variables for the assessment"""
     if 'responses' not in st.session_state:
-        st.session_state.responses = {}
+        st.session_state.responses = Answers()
+    # A restored session continues at its first unfinished section
     if 'current_dimension' not in st.session_state:
-        st.session_state.current_dimension = list(CAAS_QUESTIONS.keys())[0]
+        st.session_state.current_dimension = next(
+            (d for d in CAAS_QUESTIONS if any(q not in st.session_state.responses for q in CAAS_QUESTIONS[d])),
+            list(CAAS_QUESTIONS.keys())[0],
+        )
     if 'show_results' not in st.session_state:
-        st.session_state.show_results = False
+        st.session_state.show_results = is_assessment_complete()
+
+def is_assessment_complete():
+    """Check whether every CAAS question has been answered"""
+    total_questions = sum(len(questions) for questions in CAAS_QUESTIONS.values())
+    return len(st.session_state.get('responses', {})) >= total_questions
 
 def calculate_dimension_score(dimension):
     """Calculate the score for a specific dimension"""
-    questions = CAAS_QUESTIONS[dimension]
-    total = 0
-    count = 0
-    for q in questions:
-        if q in st.session_state.responses:
-            total += st.session_state.responses[q]
-            count += 1
-    return round(total / count, 2) if count > 0 else 0
+    return score_responses(st.session_state.responses).get(dimension, 0)
+
+def rating_key(question):
+    """Short widget key for a question's slider"""
+    return f"rating_{QUESTION_INDEX[question]}"
+
+def commit_section(dimension, step):
+    """Save a submitted section's answers and move step sections along
+
+    Runs as the form's submit callback, so the answers land in
+    ``st.session_state.responses`` once per section rather than on every
+    slider movement.
+    """
+    for question in CAAS_QUESTIONS[dimension]:
+        key = rating_key(question)
+        st.session_state.responses[question] = st.session_state[key]
+        # The answer now lives only in responses, which seeds the slider if
+        # the section is shown again
+        del st.session_state[key]
+    persist_session(responses=st.session_state.responses)
+
+    dimensions = list(CAAS_QUESTIONS.keys())
+    target = dimensions.index(dimension) + step
+    if target < len(dimensions):
+        st.session_state.current_dimension = dimensions[target]
+    elif is_assessment_complete():
+        st.session_state.show_results = True
+    else:
+        # Send the user back to the first section with unanswered questions
+        st.session_state.current_dimension = next(
+            d for d in dimensions
+            if any(q not in st.session_state.responses for q in CAAS_QUESTIONS[d])
+        )
+        st.toast("Please answer all questions before viewing results.")
 
 def show_assessment_page():
     initialize_assessment_state()
     
     st.title("Career Adapt-Abilities Scale (CAAS) Assessment")
-    
+    show_assessment_body()
+
+@st.fragment
+def show_assessment_body():
+    """Progress, section form and results
+
+    Runs as a fragment: submitting a section re-executes only this function,
+    not the sidebar and page routing in streamlit_app.main.
+    """
     # Progress indication
     total_questions = sum(len(questions) for questions in CAAS_QUESTIONS.values())
     answered_questions = len(st.session_state.responses)
@@ -72,58 +82,50 @@ def show_assessment_page():
     if not st.session_state.show_results:
         # Show the assessment form
         dimension = st.session_state.current_dimension
+        dimensions = list(CAAS_QUESTIONS.keys())
+        index = dimensions.index(dimension)
         
         st.subheader(f"Section: {dimension}")
         st.write("Please rate how strongly you have developed each ability using the scale below:")
         st.write("1 = Not Strong, 2 = Somewhat Strong, 3 = Strong, 4 = Very Strong, 5 = Strongest")
         
-        for question in CAAS_QUESTIONS[dimension]:
-            col1, col2 = st.columns([3, 2])
+        # Sliders inside a form don't trigger reruns; answers are committed on submit
+        with st.form(f"section_{dimension}", border=False):
+            for question in CAAS_QUESTIONS[dimension]:
+                col1, col2 = st.columns([3, 2])
+                with col1:
+                    st.write(question)
+                with col2:
+                    st.select_slider(
+                        "Rate your ability",
+                        options=[1, 2, 3, 4, 5],
+                        value=st.session_state.responses.get(question, 3),
+                        key=rating_key(question),
+                        label_visibility="collapsed"
+                    )
+
+            # Navigation buttons
+            col1, col2, col3 = st.columns(3)
+            
             with col1:
-                st.write(question)
-            with col2:
-                key = f"rating_{question}"
-                response = st.select_slider(
-                    "Rate your ability",
-                    options=[1, 2, 3, 4, 5],
-                    value=st.session_state.responses.get(question, 3),
-                    key=key,
-                    label_visibility="collapsed"
+                if index > 0:
+                    st.form_submit_button(
+                        "← Previous Section", on_click=commit_section, args=(dimension, -1)
+                    )
+            
+            with col3:
+                label = "Next Section →" if index < len(dimensions) - 1 else "View Results"
+                st.form_submit_button(
+                    label, type="primary", on_click=commit_section, args=(dimension, 1)
                 )
-                st.session_state.responses[question] = response
-
-        # Navigation buttons
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            if list(CAAS_QUESTIONS.keys()).index(dimension) > 0:
-                if st.button("← Previous Section"):
-                    current_index = list(CAAS_QUESTIONS.keys()).index(dimension)
-                    st.session_state.current_dimension = list(CAAS_QUESTIONS.keys())[current_index - 1]
-                    st.rerun()
-        
-        with col3:
-            if dimension != list(CAAS_QUESTIONS.keys())[-1]:
-                if st.button("Next Section →"):
-                    current_index = list(CAAS_QUESTIONS.keys()).index(dimension)
-                    st.session_state.current_dimension = list(CAAS_QUESTIONS.keys())[current_index + 1]
-                    st.rerun()
-            else:
-                if answered_questions == total_questions:
-                    if st.button("View Results", type="primary"):
-                        st.session_state.show_results = True
-                        st.rerun()
-                else:
-                    st.warning("Please answer all questions before viewing results.")
 
     else:
         # Show results
         st.subheader("Your CAAS Assessment Results")
         
         # Calculate and display scores
-        scores = {}
-        for dimension in CAAS_QUESTIONS.keys():
-            scores[dimension] = calculate_dimension_score(dimension)
+        calculated = score_responses(st.session_state.responses)
+        scores = {dimension: calculated.get(dimension, 0) for dimension in CAAS_QUESTIONS}
             
         # Display scores with interpretations
         for dimension, score in scores.items():
@@ -148,40 +150,11 @@ def show_assessment_page():
         
         if st.button("Continue to Background Information →", type="primary"):
             st.session_state.page = 'background'
+            # Changing page needs the full script, not just this fragment
             st.rerun()
 
 def get_score_interpretation(dimension, score):
     """Provide interpretation of the score for each dimension"""
-    if dimension == "Concern":
-        if score >= 4:
-            return "You show strong future orientation and career planning abilities."
-        elif score >= 3:
-            return "You have a moderate level of career concern. Consider developing more specific future plans."
-        else:
-            return "You might benefit from activities that help you think more about your career future."
-    
-    elif dimension == "Control":
-        if score >= 4:
-            return "You demonstrate excellent decision-making and responsibility-taking abilities."
-        elif score >= 3:
-            return "You have a good sense of control over your career decisions. Consider building more confidence in your choices."
-        else:
-            return "You might benefit from activities that help you take more control of your career decisions."
-    
-    elif dimension == "Curiosity":
-        if score >= 4:
-            return "You show strong exploratory tendencies and openness to new experiences."
-        elif score >= 3:
-            return "You have a good level of curiosity. Consider exploring even more career options."
-        else:
-            return "You might benefit from activities that encourage more career exploration."
-    
-    elif dimension == "Confidence":
-        if score >= 4:
-            return "You demonstrate high self-efficacy and problem-solving abilities."
-        elif score >= 3:
-            return "You have good confidence levels. Consider taking on more challenging tasks to build it further."
-        else:
-            return "You might benefit from activities that help build your career confidence."
-    
-    return "Score interpretation not available."
\ No newline at end of file
+    return get_content().interpretations.get(
+        (dimension, score_level(score)), "Score interpretation not available."
+    )
@@ -0,0 +1,159 @@
+from collections.abc import MutableMapping
+from dataclasses import dataclass, field
+
+import numpy as np
+
+# CAAS Assessment Questions
+CAAS_QUESTIONS = {
+    "Concern": [
+        "Thinking about what my future will be like",
+        "Realizing that today's choices shape my future",
+        "Preparing for the future",
+        "Becoming aware of the educational and career choices I must make",
+        "Planning how to achieve my goals",
+        "Concerned about my career"
+    ],
+    "Control": [
+        "Keeping upbeat",
+        "Making decisions by myself",
+        "Taking responsibility for my actions",
+        "Sticking up for my beliefs",
+        "Counting on myself",
+        "Doing what's right for me"
+    ],
+    "Curiosity": [
+        "Exploring my surroundings",
+        "Looking for opportunities to grow as a person",
+        "Investigating options before making a choice",
+        "Observing different ways of doing things",
+        "Probing deeply into questions I have",
+        "Becoming curious about new opportunities"
+    ],
+    "Confidence": [
+        "Performing tasks efficiently",
+        "Taking care to do things well",
+        "Learning new skills",
+        "Working up to my ability",
+        "Overcoming obstacles",
+        "Solving problems"
+    ]
+}
+
+# Precomputed question index: responses are stored as a 24-element uint8
+# array in this question order, with 0 meaning "not answered yet".
+DIMENSIONS = tuple(CAAS_QUESTIONS)
+QUESTIONS = tuple(q for dimension in DIMENSIONS for q in CAAS_QUESTIONS[dimension])
+QUESTION_INDEX = {question: i for i, question in enumerate(QUESTIONS)}
+QUESTION_DIMENSION = np.array(
+    [DIMENSIONS.index(d) for d in DIMENSIONS for _ in CAAS_QUESTIONS[d]], dtype=np.intp
+)
+NUM_QUESTIONS = len(QUESTIONS)
+UNANSWERED = 0
+
+# (24, 4) one-hot matrix mapping each question to its dimension
+_DIMENSION_MATRIX = np.zeros((NUM_QUESTIONS, len(DIMENSIONS)), dtype=np.float64)
+_DIMENSION_MATRIX[np.arange(NUM_QUESTIONS), QUESTION_DIMENSION] = 1.0
+
+LEVELS = ("low", "medium", "high")
+LEVEL_THRESHOLDS = (3.0, 4.0)
+
+@dataclass(slots=True, eq=False)
+class Answers(MutableMapping):
+    """One session's ratings, one byte per question in QUESTIONS order
+
+    Behaves as the responses dict keyed by question text that it replaces,
+    with only answered questions as keys, but costs 24 bytes of ratings
+    instead of a dict entry per answer.
+    """
+    codes: bytearray = field(default_factory=lambda: bytearray(NUM_QUESTIONS))
+
+    def __getitem__(self, question):
+        rating = self.codes[QUESTION_INDEX[question]]
+        if rating == UNANSWERED:
+            raise KeyError(question)
+        return rating
+
+    def __setitem__(self, question, rating):
+        self.codes[QUESTION_INDEX[question]] = rating
+
+    def __delitem__(self, question):
+        self[question]
+        self.codes[QUESTION_INDEX[question]] = UNANSWERED
+
+    def __iter__(self):
+        return (QUESTIONS[i] for i, rating in enumerate(self.codes) if rating != UNANSWERED)
+
+    def __len__(self):
+        return NUM_QUESTIONS - self.codes.count(UNANSWERED)
+
+def encode_responses(responses):
+    """Pack a responses dict keyed by question text into a uint8 array"""
+    if isinstance(responses, Answers):
+        return np.frombuffer(responses.codes, dtype=np.uint8).copy()
+    codes = np.zeros(NUM_QUESTIONS, dtype=np.uint8)
+    for question, rating in responses.items():
+        index = QUESTION_INDEX.get(question)
+        if index is not None:
+            codes[index] = rating
+    return codes
+
+def decode_responses(codes):
+    """Unpack a response array into a dict keyed by question text"""
+    return {QUESTIONS[i]: int(rating) for i, rating in enumerate(codes) if rating != UNANSWERED}
+
+def dimension_means(matrix):
+    """Mean rating per dimension for an (N, 24) response matrix
+
+    Returns an (N, 4) float array rounded to two decimals, with NaN for
+    dimensions that have no answered questions.
+    """
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float64))
+    sums = matrix @ _DIMENSION_MATRIX
+    counts = (matrix != UNANSWERED) @ _DIMENSION_MATRIX
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+    return np.round(means, 2)
+
+def total_scores(matrix):
+    """CAAS total score (sum of all item ratings) for an (N, 24) matrix"""
+    return np.atleast_2d(np.asarray(matrix)).sum(axis=1, dtype=np.int64)
+
+def level_codes(means):
+    """Band dimension means into 0 = low, 1 = medium, 2 = high (-1 if missing)"""
+    means = np.asarray(means, dtype=np.float64)
+    codes = np.digitize(means, LEVEL_THRESHOLDS)
+    return np.where(np.isnan(means), -1, codes)
+
+def score_level(score):
+    """Level band name for a single dimension score"""
+    if score >= LEVEL_THRESHOLDS[1]:
+        return "high"
+    if score >= LEVEL_THRESHOLDS[0]:
+        return "medium"
+    return "low"
+
+def score_cohort(matrix):
+    """Score many respondents at once
+
+    Returns a dict of NumPy arrays: ``dimensions`` (N, 4) means,
+    ``total`` (N,) item sums and ``levels`` (N, 4) level codes.
+    """
+    means = dimension_means(matrix)
+    return {
+        "dimensions": means,
+        "total": total_scores(matrix),
+        "levels": level_codes(means),
+    }
+
+def score_codes(codes):
+    """Dimension scores for one encoded respondent, omitting unanswered dimensions"""
+    means = dimension_means(codes)[0]
+    return {
+        dimension: float(mean)
+        for dimension, mean in zip(DIMENSIONS, means)
+        if not np.isnan(mean)
+    }
+
+def score_responses(responses):
+    """Dimension scores for a responses dict keyed by question text"""
+    return score_codes(encode_responses(responses))
@@ -0,0 +1,145 @@
+import csv
+import functools
+from dataclasses import dataclass
+
+import numpy as np
+
+import settings
+from caas_scoring import DIMENSIONS
+from file_watch import WatchedFiles, data_path
+
+# Education levels from background_form.EDUCATION_LEVELS in ascending order.
+# "Other" is deliberately absent: an unknown level does not filter careers.
+EDUCATION_ORDER = (
+    "Less than high school",
+    "Some high school",
+    "High school diploma/GED",
+    "Some college/vocational training",
+    "College degree",
+)
+EDUCATION_RANK = {level: rank for rank, level in enumerate(EDUCATION_ORDER)}
+
+# Ranking weights for interest overlap, education fit and CAAS profile fit
+INTEREST_WEIGHT = 0.6
+EDUCATION_WEIGHT = 0.2
+CAAS_WEIGHT = 0.2
+
+# Assumed dimension score when the assessment is incomplete
+NEUTRAL_SCORE = 3.0
+
+@dataclass(frozen=True, slots=True)
+class Career:
+    """A single occupation in the catalog"""
+    title: str
+    interests: tuple
+    min_education: str
+    demands: tuple
+    description: str
+
+class CareerCatalog:
+    """Occupations with inverted indexes for fast ranked lookup
+
+    Careers are indexed by interest area and by minimum education level.
+    Ranking runs vectorised over the candidate set, so a top-k query stays
+    well under a millisecond for catalogs with tens of thousands of entries.
+    """
+
+    def __init__(self, careers):
+        self.careers = tuple(careers)
+        count = len(self.careers)
+
+        areas = sorted({area for career in self.careers for area in career.interests})
+        self.area_column = {area: i for i, area in enumerate(areas)}
+        self._interest_matrix = np.zeros((count, len(areas)), dtype=np.float32)
+        postings = {area: [] for area in areas}
+        for i, career in enumerate(self.careers):
+            for area in career.interests:
+                self._interest_matrix[i, self.area_column[area]] = 1.0
+                postings[area].append(i)
+        self.by_interest = {area: np.array(ids, dtype=np.intp) for area, ids in postings.items()}
+
+        self._min_rank = np.array(
+            [EDUCATION_RANK[career.min_education] for career in self.careers], dtype=np.int8
+        )
+        self.by_min_education = {
+            rank: np.flatnonzero(self._min_rank == rank) for rank in range(len(EDUCATION_ORDER))
+        }
+        # Careers open to someone at each education level, as boolean masks
+        self._eligible = {
+            rank: self._min_rank <= rank for rank in range(len(EDUCATION_ORDER))
+        }
+        self._everyone = np.ones(count, dtype=bool)
+        self._demands = np.array([career.demands for career in self.careers], dtype=np.float32) / 5.0
+
+    def __len__(self):
+        return len(self.careers)
+
+    def candidates(self, interests, education_level):
+        """Career ids matching any interest and open at this education level"""
+        rank = EDUCATION_RANK.get(education_level)
+        eligible = self._everyone if rank is None else self._eligible[rank]
+        mask = np.zeros(len(self.careers), dtype=bool)
+        for area in interests:
+            postings = self.by_interest.get(area)
+            if postings is not None:
+                mask[postings] = True
+        mask &= eligible
+        return np.flatnonzero(mask if mask.any() else eligible)
+
+    def top_k(self, interests, education_level, caas_scores=None, k=5):
+        """Return the k best careers for a profile, best first"""
+        ids = self.candidates(interests, education_level)
+        if ids.size == 0 or k <= 0:
+            return []
+
+        wanted = np.zeros(len(self.area_column), dtype=np.float32)
+        for area in interests:
+            if area in self.area_column:
+                wanted[self.area_column[area]] = 1.0
+        overlap = self._interest_matrix[ids] @ (wanted / max(wanted.sum(), 1.0))
+
+        # Prefer careers that make use of the education the person already has
+        rank = EDUCATION_RANK.get(education_level)
+        if rank is None:
+            education_fit = np.ones(ids.size, dtype=np.float32)
+        else:
+            education_fit = 1.0 - (rank - self._min_rank[ids]) / (len(EDUCATION_ORDER) - 1)
+
+        # Penalise careers that demand more adaptability than the profile shows
+        scores = caas_scores or {}
+        profile = np.array(
+            [scores.get(dimension, NEUTRAL_SCORE) for dimension in DIMENSIONS], dtype=np.float32
+        ) / 5.0
+        shortfall = np.maximum(self._demands[ids] - profile, 0.0).mean(axis=1)
+        caas_fit = 1.0 - shortfall
+
+        score = INTEREST_WEIGHT * overlap + EDUCATION_WEIGHT * education_fit + CAAS_WEIGHT * caas_fit
+        if ids.size > k:
+            best = np.argpartition(-score, k - 1)[:k]
+        else:
+            best = np.arange(ids.size)
+        best = best[np.argsort(-score[best], kind="stable")]
+        return [self.careers[i] for i in ids[best]]
+
+def load_careers(path):
+    """Read careers from a CSV file with the columns of data/careers.csv"""
+    careers = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            careers.append(Career(
+                title=row["title"],
+                interests=tuple(area.strip() for area in row["interests"].split(";") if area.strip()),
+                min_education=row["min_education"],
+                demands=tuple(int(row[dimension.lower()]) for dimension in DIMENSIONS),
+                description=row["description"],
+            ))
+    return careers
+
+@functools.lru_cache(maxsize=None)
+def _catalog_file():
+    path = data_path(settings.CAREER_CATALOG_PATH)
+    return WatchedFiles((path,), lambda: CareerCatalog(load_careers(path)), settings.DATA_RELOAD_SECONDS)
+
+def get_career_catalog():
+    """Return the process-wide career catalog, reloaded when its file changes"""
+    return _catalog_file().get()
@@ -0,0 +1,80 @@
+import functools
+import json
+from dataclasses import dataclass
+from types import MappingProxyType
+
+import settings
+from caas_scoring import DIMENSIONS, LEVELS
+from file_watch import WatchedFiles, data_path
+
+# Layout of data/content.json this code reads; the file's "version" is the
+# content revision and changes with every edit
+CONTENT_FORMAT = 1
+
+@dataclass(frozen=True, slots=True)
+class ContentCatalog:
+    """Guidance text compiled into read-only lookup tables
+
+    Every table is keyed on exactly what callers have in hand, so a lookup
+    is one dict access returning a shared string or tuple.
+    """
+    version: str
+    interpretations: MappingProxyType  # (dimension, level) -> str
+    skill_activities: MappingProxyType  # (dimension, level) -> tuple of str
+    development_timelines: MappingProxyType  # level -> str
+    career_next_steps: tuple
+    general_barrier_actions: tuple
+    barrier_actions: MappingProxyType  # barrier -> its specific actions
+    barrier_support: MappingProxyType  # barrier -> general then specific actions
+
+    def support_for(self, barrier):
+        """All actions shown for a barrier; the general ones if it has none of its own"""
+        return self.barrier_support.get(barrier, self.general_barrier_actions)
+
+def _by_dimension_and_level(raw, name):
+    table = {}
+    for dimension in DIMENSIONS:
+        for level in LEVELS:
+            try:
+                table[(dimension, level)] = raw[dimension][level]
+            except KeyError:
+                raise ValueError(f"content {name} is missing {dimension}/{level}") from None
+    return table
+
+def compile_content(raw):
+    """Validate parsed content.json data and build its ContentCatalog"""
+    if raw.get("format") != CONTENT_FORMAT:
+        raise ValueError(f"content format {raw.get('format')!r} is not {CONTENT_FORMAT}")
+    missing = [level for level in LEVELS if level not in raw["development_timelines"]]
+    if missing:
+        raise ValueError(f"content development_timelines is missing {', '.join(missing)}")
+
+    general = tuple(raw["barrier_actions"]["general"])
+    specific = {barrier: tuple(actions) for barrier, actions in raw["barrier_actions"]["specific"].items()}
+    return ContentCatalog(
+        version=str(raw["version"]),
+        interpretations=MappingProxyType(_by_dimension_and_level(raw["score_interpretations"], "score_interpretations")),
+        skill_activities=MappingProxyType({
+            key: tuple(activities)
+            for key, activities in _by_dimension_and_level(raw["skill_recommendations"], "skill_recommendations").items()
+        }),
+        development_timelines=MappingProxyType({level: raw["development_timelines"][level] for level in LEVELS}),
+        career_next_steps=tuple(raw["career_next_steps"]),
+        general_barrier_actions=general,
+        barrier_actions=MappingProxyType(specific),
+        barrier_support=MappingProxyType({barrier: general + actions for barrier, actions in specific.items()}),
+    )
+
+def load_content(path):
+    """Read and compile a content file"""
+    with open(path, encoding="utf-8") as f:
+        return compile_content(json.load(f))
+
+@functools.lru_cache(maxsize=None)
+def _content_file():
+    path = data_path(settings.CONTENT_PATH)
+    return WatchedFiles((path,), lambda: load_content(path), settings.DATA_RELOAD_SECONDS)
+
+def get_content():
+    """Return the current content catalog, reloaded when its file changes"""
+    return _content_file().get()
@@ -0,0 +1,73 @@
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever any watched file is rebuilt; results derived from data
+# files (e.g. the recommendations section memo) include it in their keys
+_generation = 0
+
+def generation():
+    """Counter of data reloads in this process"""
+    return _generation
+
+def data_path(path):
+    """Resolve a settings path relative to the repository"""
+    if os.path.isabs(path):
+        return path
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+
+def _stamp(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+class WatchedFiles:
+    """A value built from data files and rebuilt when any of them changes
+
+    ``get()`` stats the files at most once per ``interval`` seconds, so
+    between checks it costs a clock read. A failed rebuild is logged and
+    the previous value kept; only the very first build raises. An interval
+    of 0 builds once and never checks again.
+    """
+
+    def __init__(self, paths, build, interval):
+        self.paths = tuple(paths)
+        self.build = build
+        self.interval = interval
+        self._value = None
+        self._stamps = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        value = self._value
+        if value is not None and (self.interval <= 0 or time.monotonic() < self._next_check):
+            return value
+        with self._lock:
+            if self._value is not None and time.monotonic() < self._next_check:
+                return self._value
+            self._next_check = time.monotonic() + self.interval
+            stamps = tuple(_stamp(path) for path in self.paths)
+            if self._value is not None and stamps == self._stamps:
+                return self._value
+            # Remember the stamps even if the build fails, so a broken file
+            # is reported once rather than on every check
+            self._stamps = stamps
+            try:
+                value = self.build()
+            except Exception:
+                if self._value is None:
+                    raise
+                logger.exception("Could not reload %s; keeping the previous version", ", ".join(self.paths))
+                return self._value
+            if self._value is not None:
+                logger.info("Reloaded %s", ", ".join(self.paths))
+            global _generation
+            _generation += 1
+            self._value = value
+            return value
@@ -0,0 +1,239 @@
+import contextlib
+import logging
+import os
+import random
+import threading
+import time
+
+import streamlit as st
+
+import metrics
+import settings
+from rate_limiter import estimate_request_tokens, get_admission_queue
+
+# The anthropic SDK (with httpx and pydantic) is imported on first use rather
+# than at module load: most reruns never call the model, and it accounts for
+# most of the app's cold import time.
+
+logger = logging.getLogger(__name__)
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker is rejecting upstream calls"""
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a half-open probe
+
+    After ``failure_threshold`` consecutive upstream failures the circuit
+    opens and calls are rejected immediately. Once ``reset_timeout`` seconds
+    have passed a single probe request is let through; its outcome decides
+    whether the circuit closes again or stays open for another period.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        """Return (allowed, is_probe) for a call that wants to go upstream now
+
+        The caller holding the probe must end it with ``record_success``,
+        ``record_failure`` or, if it never reached the upstream,
+        ``release_probe``.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True, False
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True, True
+            return False, False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """Probe holder only: give back a probe that ended without an outcome"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("Circuit opened after %d consecutive failures", self.failures)
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+_client = None
+_client_lock = threading.Lock()
+
+breaker = CircuitBreaker(
+    settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+    settings.LLM_CIRCUIT_RESET_SECONDS,
+)
+
+def get_api_key():
+    """Read the Anthropic API key from Streamlit secrets or the environment"""
+    try:
+        return st.secrets["anthropic"]["api_key"]
+    except Exception:
+        return os.environ.get("ANTHROPIC_API_KEY")
+
+def get_client():
+    """Return the process-wide Anthropic client
+
+    The client owns a pooled httpx connection, so sessions and reruns reuse
+    warm TLS connections instead of opening a new one per request. Retries
+    are handled here rather than by the SDK so the circuit breaker sees the
+    final outcome of each call.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from anthropic import Anthropic, DefaultHttpxClient, Timeout
+
+                timeout = Timeout(
+                    settings.LLM_READ_TIMEOUT,
+                    connect=settings.LLM_CONNECT_TIMEOUT,
+                )
+                _client = Anthropic(
+                    api_key=get_api_key(),
+                    timeout=timeout,
+                    max_retries=0,
+                    http_client=DefaultHttpxClient(timeout=timeout),
+                )
+    return _client
+
+def is_retryable(error):
+    """Return True for rate limits, server errors and connection failures"""
+    from anthropic import APIConnectionError, APIStatusError
+
+    if isinstance(error, APIConnectionError):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+def backoff_delay(attempt, error=None):
+    """Full-jitter exponential backoff, honouring Retry-After when present"""
+    cap = min(settings.LLM_BACKOFF_MAX, settings.LLM_BACKOFF_BASE * (2 ** attempt))
+    delay = random.uniform(0, cap)
+    response = getattr(error, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        try:
+            delay = max(delay, min(float(retry_after), settings.LLM_BACKOFF_MAX))
+        except (TypeError, ValueError):
+            pass
+    return delay
+
+def call_with_retries(operation, cost=None, on_queue=None):
+    """Run an upstream operation behind the admission queue, circuit breaker and retries
+
+    Every attempt, retries included, is admitted through the process-wide
+    rate limiter with the given cost. ``on_queue(position)`` reports the
+    caller's place in the queue while it waits.
+    """
+    admission = get_admission_queue()
+    cost = cost or {"requests": 1}
+    requested = time.perf_counter()
+    # Fail fast while the upstream is down rather than queueing first
+    allowed, probe = breaker.allow_request()
+    if not allowed:
+        metrics.increment("llm_requests_total", outcome="circuit_open")
+        raise CircuitOpenError("Upstream AI service is temporarily unavailable")
+
+    def admit():
+        # A local rejection (AdmissionRejected) says nothing about the
+        # upstream, so it is not a breaker failure; if this call holds the
+        # probe, the finally below hands it back
+        if admission is not None:
+            admission.acquire(cost, on_queue)
+
+    # Set once the outcome is recorded, which also settles a probe
+    reported = False
+    try:
+        admit()
+        attempt = 0
+        while True:
+            attempt_started = time.perf_counter()
+            try:
+                result = operation()
+            except Exception as e:
+                if not is_retryable(e):
+                    # The upstream answered; a bad request is not an outage
+                    breaker.record_success()
+                    reported = True
+                    metrics.increment("llm_requests_total", outcome="rejected")
+                    raise
+                if attempt >= settings.LLM_MAX_RETRIES:
+                    breaker.record_failure()
+                    reported = True
+                    metrics.observe("llm_queue_wait_seconds", attempt_started - requested)
+                    metrics.increment("llm_requests_total", outcome="failed")
+                    raise
+                delay = backoff_delay(attempt, e)
+                logger.info("Retrying upstream call in %.2fs after %s", delay, type(e).__name__)
+                time.sleep(delay)
+                attempt += 1
+                admit()
+            else:
+                breaker.record_success()
+                reported = True
+                metrics.observe("llm_queue_wait_seconds", attempt_started - requested)
+                metrics.increment("llm_requests_total", outcome="ok")
+                return result
+    finally:
+        # A probe that ended any other way (including a Streamlit rerun or
+        # stop while it waited in the queue) is handed back, or the circuit
+        # would stay half-open with no probe ever finishing
+        if probe and not reported:
+            breaker.release_probe()
+
+def request_cost(params):
+    """Rate limiter charges for one messages request"""
+    return {"requests": 1, "tokens": estimate_request_tokens(params)}
+
+def create_message(on_queue=None, **params):
+    """Send a messages.create request through the shared client"""
+    return call_with_retries(
+        lambda: get_client().messages.create(**params), request_cost(params), on_queue
+    )
+
+@contextlib.contextmanager
+def stream_message(on_queue=None, **params):
+    """Open a messages.stream request through the shared client
+
+    Only opening the stream is retried; once tokens have started flowing a
+    failure is reported to the breaker and re-raised to the caller.
+    """
+    with contextlib.ExitStack() as stack:
+        stream = call_with_retries(
+            lambda: stack.enter_context(get_client().messages.stream(**params)),
+            request_cost(params),
+            on_queue,
+        )
+        try:
+            yield stream
+        except Exception as e:
+            if is_retryable(e):
+                breaker.record_failure()
+            raise
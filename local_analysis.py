@@ -0,0 +1,110 @@
+import textwrap
+
+import metrics
+from caas_assessment import get_score_interpretation
+from content_catalog import get_content
+from recommendations import get_barrier_resources, get_career_paths, get_skill_recommendations
+
+# Careers named in the local analysis; the Career Paths tab lists more
+LOCAL_CAREER_LIMIT = 3
+
+def generate_local_analysis(caas_scores, background_info):
+    """Deterministic career analysis built from the rule-based recommendations
+
+    Follows the same section layout as the model's analysis, using the
+    score interpretations, career catalog, skill plans and barrier support.
+    It needs no network access, so it is shown while the model's analysis
+    is generated and whenever the model is unavailable.
+    """
+    with metrics.span("local_analysis"):
+        skill_sets = sorted(get_skill_recommendations(caas_scores), key=lambda s: s["score"])
+        careers = get_career_paths(
+            background_info.get("interests", []),
+            background_info.get("education", ""),
+            caas_scores,
+            limit=LOCAL_CAREER_LIMIT,
+        )
+        barriers = [b for b in background_info.get("barriers", []) if b != "Other"]
+        barrier_resources = {
+            barrier: get_barrier_resources(
+                background_info.get("county", ""), background_info.get("postcode_area", ""), barrier, limit=1
+            )
+            for barrier in barriers
+        }
+
+        sections = [
+            strengths_section(caas_scores),
+            careers_section(careers, background_info.get("interests", [])),
+            barriers_section(barriers, barrier_resources),
+            next_steps_section(skill_sets, careers, barrier_resources, background_info.get("goals", "")),
+            long_term_section(skill_sets),
+        ]
+        return "\n\n".join(section for section in sections if section)
+
+def strengths_section(caas_scores):
+    ranked = sorted(caas_scores.items(), key=lambda item: item[1], reverse=True)
+    lines = ["### Strengths and Development Areas"]
+    for dimension, score in ranked:
+        lines.append(f"- **{dimension}** ({score:.1f}/5.0): {get_score_interpretation(dimension, score)}")
+    if len(ranked) > 1:
+        lines.append("")
+        lines.append(
+            f"Your strongest area is **{ranked[0][0]}**; building your **{ranked[-1][0]}** "
+            "is likely to make the biggest difference right now."
+        )
+    return "\n".join(lines)
+
+def careers_section(careers, interests):
+    if not careers:
+        return ""
+    lines = ["### Career Recommendations"]
+    for career in careers:
+        line = f"- **{career.title}**: {career.description}"
+        matched = [i for i in interests if i in career.interests]
+        if matched:
+            line += f" (matches your interest in {', '.join(matched)})"
+        lines.append(line)
+    return "\n".join(lines)
+
+def barriers_section(barriers, barrier_resources):
+    if not barriers:
+        return ""
+    content = get_content()
+    lines = ["### Strategies for Overcoming Barriers"]
+    for barrier in barriers:
+        actions = content.barrier_actions.get(barrier, content.general_barrier_actions[:2])
+        line = f"- **{barrier}**: {'; '.join(actions)}."
+        for resource in barrier_resources.get(barrier, []):
+            line += f" Nearby: {resource['name']} ({resource['distance_km']} km)."
+        lines.append(line)
+    return "\n".join(lines)
+
+def next_steps_section(skill_sets, careers, barrier_resources, goals):
+    content = get_content()
+    steps = []
+    if skill_sets:
+        weakest = skill_sets[0]
+        steps.append(f"{weakest['recommendations'][0]} to build your {weakest['dimension'].lower()}.")
+    if careers:
+        steps.append(f"{content.career_next_steps[0]} for {careers[0].title.lower()} roles.")
+    contacts = [r for resources in barrier_resources.values() for r in resources if r.get("contact")]
+    if contacts:
+        steps.append(f"Get in touch with {contacts[0]['name']}: {contacts[0]['contact']}")
+    else:
+        steps.append(f"{content.general_barrier_actions[0]} for help getting started.")
+    if goals and goals.strip():
+        goal = textwrap.shorten(goals.strip(), width=160, placeholder="...")
+        steps.append(f'Write down one thing you can do this week towards your goal: "{goal}"')
+    lines = ["### Immediate Next Steps"]
+    lines.extend(f"{i}. {step}" for i, step in enumerate(steps, 1))
+    return "\n".join(lines)
+
+def long_term_section(skill_sets):
+    if not skill_sets:
+        return ""
+    timelines = get_content().development_timelines
+    lines = ["### Long-Term Development"]
+    for skill_set in skill_sets:
+        activities = "; ".join(skill_set["recommendations"][1:])
+        lines.append(f"- **{skill_set['dimension']}**: {activities}. {timelines[skill_set['level']]}")
+    return "\n".join(lines)
@@ -0,0 +1,225 @@
+import contextlib
+import functools
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import settings
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "career_guidance_"
+
+# Upper bounds in seconds; spans range from sub-millisecond lookups to
+# minute-long model calls
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# name: (type, help) or, for histograms not measured in seconds,
+# (type, help, buckets)
+DEFINITIONS = {
+    "stage_seconds": ("histogram", "Time spent in each instrumented stage"),
+    "llm_queue_wait_seconds": ("histogram", "Time from requesting a model call to the attempt that completed it"),
+    "llm_time_to_first_token_seconds": ("histogram", "Time from sending a model request to its first token"),
+    "llm_request_seconds": ("histogram", "Total time of model requests"),
+    "llm_requests_total": ("counter", "Model requests by outcome"),
+    "llm_input_tokens_total": ("counter", "Uncached input tokens sent to the model"),
+    "llm_cache_read_tokens_total": ("counter", "Input tokens served from the prompt cache"),
+    "llm_cache_write_tokens_total": ("counter", "Input tokens written to the prompt cache"),
+    "llm_output_tokens_total": ("counter", "Output tokens generated by the model"),
+    "llm_hedges_total": ("counter", "Hedged duplicate requests by whether the hedge answered first"),
+    "llm_admissions_total": ("counter", "Admission queue outcomes for upstream calls"),
+    "analysis_cache_total": ("counter", "Analysis cache lookups by result"),
+    "analysis_cache_write_errors_total": ("counter", "Analyses not cached because the cache database failed"),
+    "analysis_cache_touches_dropped_total": ("counter", "Cache hits whose access time was not recorded for LRU eviction"),
+    "analysis_fallbacks_total": ("counter", "Rule-based analyses shown instead of the model's"),
+    "similarity_lookups_total": ("counter", "Reusable-analysis lookups by result"),
+}
+
+def _buckets(name):
+    definition = DEFINITIONS.get(name, ())
+    return definition[2] if len(definition) > 2 else BUCKETS
+
+class _Histogram:
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds=BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+
+class Registry:
+    """Process-wide counters and histograms, keyed by name and labels"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def increment(self, name, amount=1, labels=()):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, labels=()):
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(_buckets(name))
+            histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self):
+        """Prometheus text exposition of every recorded series"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {
+                key: (list(h.counts), h.total, h.count) for key, h in self._histograms.items()
+            }
+
+        lines = []
+        for name, (kind, help_text, *_) in DEFINITIONS.items():
+            if kind == "counter":
+                series = sorted((labels, value) for (n, labels), value in counters.items() if n == name)
+            else:
+                series = sorted((labels, value) for (n, labels), value in histograms.items() if n == name)
+            if not series:
+                continue
+            full_name = PREFIX + name
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            for labels, value in series:
+                if kind == "counter":
+                    lines.append(f"{full_name}{_format_labels(labels)} {_format_number(value)}")
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(_buckets(name), counts):
+                    cumulative += bucket_count
+                    bucket_labels = labels + (("le", _format_number(bound)),)
+                    lines.append(f"{full_name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                lines.append(f"{full_name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{full_name}_sum{_format_labels(labels)} {_format_number(total)}")
+                lines.append(f"{full_name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for key, value in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+registry = Registry()
+
+# Checked on every call so instrumentation costs one branch when disabled
+enabled = settings.METRICS_ENABLED
+
+_NOOP = contextlib.nullcontext()
+
+def increment(name, amount=1, **labels):
+    """Add amount to a counter"""
+    if not enabled:
+        return
+    registry.increment(name, amount, tuple(sorted(labels.items())))
+
+def observe(name, seconds, **labels):
+    """Record a duration measured elsewhere"""
+    if not enabled:
+        return
+    registry.observe(name, seconds, tuple(sorted(labels.items())))
+
+@contextlib.contextmanager
+def _timed(name, labels):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe(name, time.perf_counter() - started, labels)
+
+def span(stage, **labels):
+    """Time a block as one stage of request handling
+
+    Usage: ``with metrics.span("career_lookup"): ...``. Returns a shared
+    no-op context when metrics are disabled.
+    """
+    if not enabled:
+        return _NOOP
+    return _timed("stage_seconds", tuple(sorted(dict(labels, stage=stage).items())))
+
+def render():
+    return registry.render()
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0].rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def _write_file_forever(path, interval):
+    while True:
+        time.sleep(interval)
+        tmp = f"{path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(render())
+            os.replace(tmp, path)
+        except OSError:
+            logger.exception("Could not write metrics to %s", path)
+
+@functools.lru_cache(maxsize=None)
+def start_exporter():
+    """Start the /metrics endpoint and file writer once per process
+
+    Does nothing when metrics are disabled. ``METRICS_PORT`` of 0 skips the
+    endpoint and an empty ``METRICS_FILE`` skips the file.
+    """
+    if not enabled:
+        return None
+    server = None
+    if settings.METRICS_PORT:
+        try:
+            server = ThreadingHTTPServer((settings.METRICS_HOST, settings.METRICS_PORT), _MetricsHandler)
+        except OSError as e:
+            logger.warning("Metrics endpoint not started on port %s: %s", settings.METRICS_PORT, e)
+        else:
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, daemon=True, name="metrics-http").start()
+            logger.info("Serving metrics on http://%s:%s/metrics", settings.METRICS_HOST, settings.METRICS_PORT)
+    if settings.METRICS_FILE:
+        threading.Thread(
+            target=_write_file_forever,
+            args=(settings.METRICS_FILE, settings.METRICS_FILE_INTERVAL),
+            daemon=True,
+            name="metrics-file",
+        ).start()
+    return server
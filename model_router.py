@@ -0,0 +1,202 @@
+import collections
+import dataclasses
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
+
+import metrics
+import settings
+
+# Recent requests kept per model for the routing estimates
+LATENCY_WINDOW = 200
+# Below this many samples a model's prior is used instead of its history
+MIN_SAMPLES = 20
+
+# Output budgets are rounded to this many tokens so similar profiles share
+# requests (and single-flight keys)
+BUDGET_STEP = 50
+
+# Race threads for hedged requests; the callers are already worker threads
+_executor = ThreadPoolExecutor(
+    max_workers=settings.ANALYSIS_WORKERS * 2,
+    thread_name_prefix="model-race",
+)
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class ModelTier:
+    """A configured model with latency priors used until it has history"""
+    name: str
+    first_token_seconds: float
+    tokens_per_second: float
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Route:
+    """Where one request goes: the model, its output budget and any hedge"""
+    model: str
+    max_tokens: int
+    predicted_seconds: float
+    hedge_model: str | None = None
+
+class LatencyTracker:
+    """Rolling per-model window of (first token, total, output tokens)"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, model, first_token_seconds, total_seconds, output_tokens):
+        with self._lock:
+            samples = self._samples.get(model)
+            if samples is None:
+                samples = self._samples[model] = collections.deque(maxlen=self.window)
+            samples.append((first_token_seconds, total_seconds, output_tokens))
+
+    def _values(self, model, index):
+        with self._lock:
+            samples = list(self._samples.get(model, ()))
+        return sorted(s[index] for s in samples if s[index] is not None)
+
+    def percentile(self, model, stage, pct):
+        """Nearest-rank percentile of "first_token" or "total" seconds, or None"""
+        values = self._values(model, 0 if stage == "first_token" else 1)
+        if len(values) < MIN_SAMPLES:
+            return None
+        return values[max(0, min(len(values) - 1, round(pct / 100 * len(values) + 0.5) - 1))]
+
+    def tokens_per_second(self, model):
+        """Median output rate after the first token, or None"""
+        with self._lock:
+            samples = list(self._samples.get(model, ()))
+        rates = sorted(
+            tokens / (total - first)
+            for first, total, tokens in samples
+            if first is not None and tokens and total > first
+        )
+        if len(rates) < MIN_SAMPLES:
+            return None
+        return rates[len(rates) // 2]
+
+tracker = LatencyTracker()
+
+@functools.lru_cache(maxsize=None)
+def get_tiers():
+    """Configured model tiers, most capable first"""
+    tiers = [ModelTier(settings.ANALYSIS_MODEL, first_token_seconds=2.0, tokens_per_second=40.0)]
+    if settings.ANALYSIS_FAST_MODEL and settings.ANALYSIS_FAST_MODEL != settings.ANALYSIS_MODEL:
+        tiers.append(ModelTier(settings.ANALYSIS_FAST_MODEL, first_token_seconds=0.8, tokens_per_second=120.0))
+    return tuple(tiers)
+
+def profile_complexity(background_info):
+    """How much a profile asks of the analysis, from 0 (simple) to 1
+
+    Counts career interests and barriers (each needing its own advice) and
+    the length of the free-text answers.
+    """
+    interests = len(background_info.get("interests", []))
+    barriers = len(background_info.get("barriers", []))
+    text_tokens = sum(
+        len(background_info.get(field) or "") // 4
+        for field in ("current_situation", "goals", "support_systems")
+    )
+    return (min(interests, 4) / 4 + min(barriers, 4) / 4 + min(text_tokens, 800) / 800) / 3
+
+def output_budget(background_info):
+    """max_tokens scaled between the configured bounds by profile complexity"""
+    low, high = settings.ANALYSIS_MIN_TOKENS, settings.ANALYSIS_MAX_TOKENS
+    budget = low + profile_complexity(background_info) * (high - low)
+    return min(high, max(low, int(round(budget / BUDGET_STEP) * BUDGET_STEP)))
+
+def predicted_seconds(tier, max_tokens):
+    """Expected time for a full response, from history or the tier's priors"""
+    first = tracker.percentile(tier.name, "first_token", 50) or tier.first_token_seconds
+    rate = tracker.tokens_per_second(tier.name) or tier.tokens_per_second
+    return first + max_tokens / rate
+
+def route(background_info, max_tokens=None):
+    """Pick the model tier and output budget for a request
+
+    The most capable tier predicted to finish within the latency SLO wins;
+    if none is, the fastest does. Requests on any slower tier are hedged to
+    the fastest one when hedging is on.
+    """
+    if max_tokens is None:
+        max_tokens = output_budget(background_info)
+    tiers = get_tiers()
+    predictions = [(tier, predicted_seconds(tier, max_tokens)) for tier in tiers]
+    chosen = next(
+        ((tier, seconds) for tier, seconds in predictions if seconds <= settings.ANALYSIS_LATENCY_SLO_SECONDS),
+        min(predictions, key=lambda item: item[1]),
+    )
+    fastest = tiers[-1]
+    hedge = fastest.name if settings.ANALYSIS_HEDGING and chosen[0] is not fastest else None
+    return Route(chosen[0].name, max_tokens, chosen[1], hedge)
+
+def hedge_delay(route, streaming):
+    """Seconds to wait on the routed model before sending the hedge
+
+    The model's p95 time to first token when streaming, otherwise its p95
+    total time; until there is enough history, twice the prior estimate.
+    """
+    stage = "first_token" if streaming else "total"
+    observed = tracker.percentile(route.model, stage, 95)
+    if observed is not None:
+        return observed
+    tier = next(t for t in get_tiers() if t.name == route.model)
+    return 2 * (tier.first_token_seconds if streaming else route.predicted_seconds)
+
+def record(model, mode, first_token_seconds, total_seconds, output_tokens):
+    """Record a completed request for routing and the per-model histograms"""
+    tracker.record(model, first_token_seconds, total_seconds, output_tokens)
+    metrics.observe("llm_request_seconds", total_seconds, mode=mode, model=model)
+    if first_token_seconds is not None:
+        metrics.observe("llm_time_to_first_token_seconds", first_token_seconds, mode=mode, model=model)
+
+def run(route, attempt, streaming):
+    """Call ``attempt(model, claim)`` on the routed model, hedging if it is slow
+
+    When the routed model has produced nothing after ``hedge_delay``, the
+    same request is sent to the hedge model as well. Each attempt calls
+    ``claim()`` once it has output; only the first caller gets True, and the
+    other attempt stops (a stream is closed, a plain request's reply is
+    dropped). Returns (result, model) for the winning attempt.
+    """
+    if route.hedge_model is None:
+        return attempt(route.model, None), route.model
+
+    winner = []
+    lock = threading.Lock()
+
+    def claimer(model):
+        def claim():
+            with lock:
+                if not winner:
+                    winner.append(model)
+                return winner[0] == model
+        return claim
+
+    primary = _executor.submit(attempt, route.model, claimer(route.model))
+    try:
+        return primary.result(timeout=hedge_delay(route, streaming)), route.model
+    except FutureTimeout:
+        pass
+    with lock:
+        answering = bool(winner)
+    if answering:
+        return primary.result(), route.model
+
+    hedge = _executor.submit(attempt, route.hedge_model, claimer(route.hedge_model))
+    owners = {primary: route.model, hedge: route.hedge_model}
+    errors = []
+    for future in as_completed(owners):
+        try:
+            result = future.result()
+        except Exception as e:
+            errors.append(e)
+            continue
+        if winner and winner[0] == owners[future]:
+            metrics.increment("llm_hedges_total", result="won" if future is hedge else "lost")
+            return result, owners[future]
+    if errors:
+        raise errors[0]
+    return None, None
@@ -0,0 +1,130 @@
+import collections
+import functools
+import json
+import logging
+import threading
+import time
+
+import metrics
+import settings
+from state_backend import StateBackendError, get_state_backend
+
+logger = logging.getLogger(__name__)
+
+class AdmissionRejected(Exception):
+    """An upstream call was not admitted; show the fallback instead"""
+
+class QueueFullError(AdmissionRejected):
+    """Raised on arrival when the admission queue is already at its depth limit"""
+
+class QueueTimeoutError(AdmissionRejected):
+    """Raised when a call waited in the admission queue for too long"""
+
+def estimate_request_tokens(params):
+    """Tokens a messages request may consume: prompt estimate plus max_tokens
+
+    The output side is charged at max_tokens up front, as the provider does
+    when it admits a request, so the bucket never runs ahead of the limit.
+    """
+    prompt = json.dumps([params.get("system", ""), params.get("messages", [])])
+    return len(prompt) // 4 + int(params.get("max_tokens", 0))
+
+class TokenBuckets:
+    """Named token buckets kept in a state backend
+
+    ``limits`` maps a bucket name to its allowance per minute; each bucket
+    holds at most ``burst_seconds`` worth of allowance. With a shared
+    backend every process drawing from it shares the allowance.
+    """
+
+    def __init__(self, backend, limits, burst_seconds):
+        self.backend = backend
+        self.limits = {
+            name: (per_minute / 60.0, max(1.0, per_minute / 60.0 * burst_seconds))
+            for name, per_minute in limits.items()
+        }
+
+    def try_acquire(self, costs):
+        """Take costs from every bucket at once, or none of them
+
+        Returns 0.0 when taken, otherwise the seconds until all buckets
+        could cover the costs. If the backend is unreachable the call is
+        let through; the client's retries still handle provider 429s.
+        """
+        try:
+            return self.backend.take_tokens(self.limits, costs)
+        except StateBackendError as e:
+            logger.warning("Rate limit not applied: %s", e)
+            return 0.0
+
+class AdmissionQueue:
+    """Fair FIFO admission in front of rate-limited upstream calls
+
+    Callers queue in arrival order and only the head of the queue may draw
+    from the buckets, so a burst drains at the configured rate instead of
+    racing into provider 429s. Arrivals beyond ``max_depth`` are shed
+    immediately and callers waiting longer than ``timeout`` give up.
+    """
+
+    def __init__(self, store, max_depth, timeout):
+        self.store = store
+        self.max_depth = max_depth
+        self.timeout = timeout
+        self._waiting = collections.deque()
+        self._cond = threading.Condition()
+
+    def depth(self):
+        with self._cond:
+            return len(self._waiting)
+
+    def acquire(self, costs, on_wait=None):
+        """Block until admitted; returns the seconds spent queueing
+
+        ``on_wait(position)`` is called from the waiting thread whenever the
+        caller's 1-based queue position changes, including while it waits
+        at the head for the rate limit.
+        """
+        ticket = object()
+        with self._cond:
+            if self.max_depth and len(self._waiting) >= self.max_depth:
+                metrics.increment("llm_admissions_total", result="shed")
+                raise QueueFullError("Too many analyses are queued right now")
+            self._waiting.append(ticket)
+
+        started = time.monotonic()
+        last_position = None
+        try:
+            while True:
+                with self._cond:
+                    position = self._waiting.index(ticket) + 1
+                    wait = self.store.try_acquire(costs) if position == 1 else None
+                    if wait == 0:
+                        metrics.increment("llm_admissions_total", result="admitted")
+                        return time.monotonic() - started
+                    remaining = self.timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        metrics.increment("llm_admissions_total", result="timeout")
+                        raise QueueTimeoutError("Timed out waiting for the AI service")
+                    if position == last_position:
+                        self._cond.wait(remaining if wait is None else min(wait, remaining))
+                        continue
+                last_position = position
+                if on_wait is not None:
+                    on_wait(position)
+        finally:
+            with self._cond:
+                self._waiting.remove(ticket)
+                self._cond.notify_all()
+
+@functools.lru_cache(maxsize=None)
+def get_admission_queue():
+    """Return the process-wide admission queue, or None when unlimited"""
+    limits = {}
+    if settings.LLM_REQUESTS_PER_MINUTE > 0:
+        limits["requests"] = settings.LLM_REQUESTS_PER_MINUTE
+    if settings.LLM_TOKENS_PER_MINUTE > 0:
+        limits["tokens"] = settings.LLM_TOKENS_PER_MINUTE
+    if not limits:
+        return None
+    store = TokenBuckets(get_state_backend(), limits, settings.LLM_BURST_SECONDS)
+    return AdmissionQueue(store, settings.LLM_QUEUE_MAX_DEPTH, settings.LLM_QUEUE_TIMEOUT)
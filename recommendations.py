@@ -1,225 +1,148 @@
+import collections
+import threading
+
 import streamlit as st
-from ai_analysis import generate_career_analysis, display_ai_analysis
-from caas_assessment import CAAS_QUESTIONS
+import file_watch
+import metrics
+import settings
+from ai_analysis import generate_career_analysis, display_ai_analysis, hedged_career_analysis, stream_career_analysis
+from analysis_cache import canonical_json
+from caas_scoring import score_level, score_responses
+from career_catalog import get_career_catalog
+from content_catalog import get_content
+from resource_directory import get_resource_directory
+from speculative import speculative_analysis_pending, wait_for_speculative_analysis
+
+# Services everyone is shown alongside barrier-specific support
+GENERAL_SERVICES = {"Employment support", "Careers advice"}
+
+# Most recent section results kept for reuse across sessions
+SECTION_MEMO_SIZE = 2048
+_section_results = collections.OrderedDict()
+_section_lock = threading.Lock()
 
-def get_career_paths(interests, education_level):
+RECOMMENDATION_SECTIONS = ("AI Analysis", "Career Paths", "Skill Development", "Resources & Support")
+
+def get_career_paths(interests, education_level, caas_scores=None, limit=5):
     """Generate career path suggestions based on interests and education"""
-    career_suggestions = {
-        "Technology & Computers": [
-            "IT Support Specialist",
-            "Web Developer",
-            "Data Entry Specialist",
-            "Computer Network Technician"
-        ],
-        "Healthcare & Medical": [
-            "Medical Assistant",
-            "Patient Care Technician",
-            "Healthcare Support Worker",
-            "Pharmacy Technician"
-        ],
-        "Construction & Trades": [
-            "Apprentice Electrician",
-            "Construction Worker",
-            "HVAC Technician",
-            "Carpenter's Assistant"
-        ],
-        "Business & Administration": [
-            "Administrative Assistant",
-            "Customer Service Representative",
-            "Sales Associate",
-            "Office Support Staff"
-        ]
-    }
-    
-    suggested_careers = []
-    for interest in interests:
-        if interest in career_suggestions:
-            suggested_careers.extend(career_suggestions[interest])
-    
-    return suggested_careers[:5]  # Return top 5 suggestions
+    with metrics.span("career_lookup"):
+        return get_career_catalog().top_k(interests, education_level, caas_scores, k=limit)
 
 def get_skill_recommendations(caas_scores):
     """Generate skill development recommendations based on CAAS scores"""
-    recommendations = {
-        "Concern": {
-            "low": [
-                "Set short-term career goals (3-6 months)",
-                "Create a weekly planning routine",
-                "Research career paths in your interest areas",
-                "Connect with a career counselor"
-            ],
-            "medium": [
-                "Develop a 1-year career plan",
-                "Start networking in your chosen field",
-                "Identify potential mentors",
-                "Join professional organizations"
-            ],
-            "high": [
-                "Create 3-5 year career plans",
-                "Mentor others in career planning",
-                "Explore advancement opportunities",
-                "Lead career development workshops"
-            ]
-        },
-        "Control": {
-            "low": [
-                "Practice daily decision-making exercises",
-                "Learn basic project management skills",
-                "Set small, achievable weekly goals",
-                "Take a personal development course"
-            ],
-            "medium": [
-                "Take on leadership roles in small projects",
-                "Improve time management skills",
-                "Build problem-solving abilities",
-                "Learn conflict resolution techniques"
-            ],
-            "high": [
-                "Mentor others in decision-making",
-                "Lead team projects",
-                "Develop crisis management skills",
-                "Train others in leadership skills"
-            ]
-        },
-        "Curiosity": {
-            "low": [
-                "Try one new activity each week",
-                "Read about different career paths",
-                "Shadow someone in a job you're interested in",
-                "Take personality and career assessments"
-            ],
-            "medium": [
-                "Attend career fairs and workshops",
-                "Interview professionals in different fields",
-                "Take courses in new subject areas",
-                "Join professional networking groups"
-            ],
-            "high": [
-                "Organize career exploration events",
-                "Start a career research project",
-                "Cross-train in different roles",
-                "Write career guidance content"
-            ]
-        },
-        "Confidence": {
-            "low": [
-                "Complete online skill-building courses",
-                "Practice public speaking",
-                "Document your daily achievements",
-                "Join a supportive study group"
-            ],
-            "medium": [
-                "Take on challenging assignments",
-                "Present at team meetings",
-                "Mentor newcomers in your field",
-                "Lead small group projects"
-            ],
-            "high": [
-                "Teach others in your area of expertise",
-                "Take on leadership positions",
-                "Start your own initiatives",
-                "Write expert guides or tutorials"
-            ]
-        }
-    }
-    
+    activities = get_content().skill_activities
     skill_suggestions = []
     for dimension, score in caas_scores.items():
-        if score < 3:
-            level = "low"
-        elif score < 4:
-            level = "medium"
-        else:
-            level = "high"
-            
-        if dimension in recommendations:
+        level = score_level(score)
+        recommendations = activities.get((dimension, level))
+        if recommendations is not None:
             skill_suggestions.append({
                 "dimension": dimension,
                 "level": level,
                 "score": score,
-                "recommendations": recommendations[dimension][level]
+                "recommendations": recommendations
             })
-    
     return skill_suggestions
 
-def get_resource_recommendations(location, barriers):
+def provider_to_resource(provider, distance_km=None):
+    """Convert a directory provider into the resource dict shown in the UI"""
+    resource = {
+        "name": provider.name,
+        "description": provider.description,
+    }
+    if provider.contact:
+        resource["contact"] = provider.contact
+    if provider.links:
+        resource["links"] = provider.links
+    if distance_km is not None:
+        resource["distance_km"] = round(distance_km, 1)
+    return resource
+
+def get_resource_recommendations(county, postcode_area, barriers, limit=5):
     """Generate local resource recommendations based on location and barriers"""
-    general_resources = [
-        {
-            "name": "Local Workforce Development Center",
-            "description": "Offers job training, resume writing, and career counseling services. Programs are often free or low-cost, and they can help connect you with local employers.",
-            "contact": "Visit CareerOneStop.org to find your nearest American Job Center"
-        },
-        {
-            "name": "Community College Career Services",
-            "description": "Provides educational guidance, career development support, and often offers short-term certificate programs.",
-            "contact": "Search for your nearest community college online",
-            "links": ["Use the College Navigator tool at NCES.ed.gov"]
-        },
-        {
-            "name": "Online Learning Resources",
-            "description": "Free or low-cost online courses and certifications to build job-ready skills.",
-            "links": [
-                "Coursera.org - Offers financial aid",
-                "edX.org - Free courses available",
-                "FreeCodeCamp.org - Completely free",
-                "DigitalLiteracy.gov - Basic computer skills"
-            ]
-        },
-        {
-            "name": "Employment Support Organizations",
-            "description": "Organizations that provide job search assistance, interview preparation, and sometimes professional clothing for interviews.",
-            "links": [
-                "Goodwill Career Centers",
-                "Salvation Army Employment Services",
-                "United Way Employment Programs"
-            ]
-        }
-    ]
-    return general_resources
+    with metrics.span("resource_lookup"):
+        directory = get_resource_directory()
+        services = set(barriers) | GENERAL_SERVICES
+
+        resources = []
+        location = directory.locate(county, postcode_area)
+        if location is not None:
+            for provider, distance_km in directory.nearest(*location, services=services, n=limit):
+                resources.append(provider_to_resource(provider, distance_km))
+
+        for provider in directory.national_for(services):
+            resources.append(provider_to_resource(provider))
+        return resources
+
+def get_barrier_resources(county, postcode_area, barrier, limit=2):
+    """Nearest providers that specifically help with one barrier"""
+    with metrics.span("resource_lookup"):
+        directory = get_resource_directory()
+        location = directory.locate(county, postcode_area)
+        if location is None:
+            return []
+        return [
+            provider_to_resource(provider, distance_km)
+            for provider, distance_km in directory.nearest(*location, services=[barrier], n=limit)
+        ]
 
 def calculate_caas_scores():
     """Calculate scores for each CAAS dimension"""
-    caas_scores = {}
-    
-    for dimension in ["Concern", "Control", "Curiosity", "Confidence"]:
-        dimension_questions = CAAS_QUESTIONS.get(dimension, [])
-        matching_responses = [
-            st.session_state.responses[question]
-            for question in dimension_questions
-            if question in st.session_state.responses
-        ]
-        
-        if matching_responses:
-            score = sum(matching_responses) / len(matching_responses)
-            caas_scores[dimension] = score
-    
-    return caas_scores
+    with metrics.span("scoring"):
+        return score_responses(st.session_state.responses)
+
+def section_memo(name, inputs, compute):
+    """Return compute() for a page section, recomputing only when inputs change
 
-def show_career_paths():
+    Results are shared by every session in the process, so sessions with
+    the same inputs hold references to one result rather than their own
+    copies. Results must not be mutated.
+    """
+    # A data reload starts a new generation, so stale results are not reused
+    key = (name, file_watch.generation(), canonical_json(inputs))
+    with _section_lock:
+        if key in _section_results:
+            _section_results.move_to_end(key)
+            return _section_results[key]
+    result = compute()
+    with _section_lock:
+        _section_results[key] = result
+        while len(_section_results) > SECTION_MEMO_SIZE:
+            _section_results.popitem(last=False)
+    return result
+
+@st.fragment
+def show_career_paths(caas_scores=None):
     """Display career path recommendations"""
     st.subheader("Recommended Career Paths")
     
-    careers = get_career_paths(
-        st.session_state.background_info['interests'],
-        st.session_state.background_info['education']
+    if caas_scores is None:
+        caas_scores = calculate_caas_scores()
+    interests = tuple(st.session_state.background_info['interests'])
+    education = st.session_state.background_info['education']
+    careers = section_memo(
+        'career_paths',
+        (interests, education, caas_scores),
+        lambda: get_career_paths(interests, education, caas_scores)
     )
     
     for career in careers:
-        with st.expander(career):
-            st.write(f"Based on your interests in {', '.join(st.session_state.background_info['interests'])}")
+        with st.expander(career.title):
+            st.write(career.description)
+            matched = [i for i in st.session_state.background_info['interests'] if i in career.interests]
+            if matched:
+                st.write(f"Based on your interests in {', '.join(matched)}")
             st.write("Next steps to explore this career:")
-            st.write("1. Research typical job responsibilities")
-            st.write("2. Look for entry-level positions or apprenticeships")
-            st.write("3. Identify required certifications or training")
-            st.write("4. Connect with professionals in this field")
+            for i, step in enumerate(get_content().career_next_steps, 1):
+                st.write(f"{i}. {step}")
 
-def show_skill_development():
+@st.fragment
+def show_skill_development(caas_scores=None):
     """Display skill development recommendations"""
     st.subheader("Skill Development Recommendations")
     
-    # Calculate CAAS dimension scores
-    caas_scores = calculate_caas_scores()
+    if caas_scores is None:
+        caas_scores = calculate_caas_scores()
     
     if not caas_scores:
         st.warning("No scores could be calculated. Please ensure you've completed the full assessment.")
@@ -239,7 +162,9 @@ def show_skill_development():
     st.write("---")
     
     # Get and display recommendations
-    skill_recommendations = get_skill_recommendations(caas_scores)
+    skill_recommendations = section_memo(
+        'skill_development', caas_scores, lambda: get_skill_recommendations(caas_scores)
+    )
     
     for skill_set in skill_recommendations:
         with st.expander(f"{skill_set['dimension']} Development Plan"):
@@ -249,24 +174,30 @@ def show_skill_development():
                 st.write(f"• {rec}")
             
             st.write("\n**Development Timeline:**")
-            if skill_set['level'] == "low":
-                st.write("Focus on these activities over the next 1-3 months to build a strong foundation.")
-            elif skill_set['level'] == "medium":
-                st.write("Work on these activities over the next 3-6 months to enhance your capabilities.")
-            else:
-                st.write("Incorporate these activities into your ongoing development to maintain and share your expertise.")
+            st.write(get_content().development_timelines[skill_set['level']])
 
+@st.fragment
 def show_resources():
     """Display resource recommendations"""
     st.subheader("Resources & Support")
     
-    resources = get_resource_recommendations(
-        f"{st.session_state.background_info.get('county', '')}, {st.session_state.background_info.get('postcode_area', '')}",
-        st.session_state.background_info['barriers']
+    county = st.session_state.background_info.get('county', '')
+    postcode_area = st.session_state.background_info.get('postcode_area', '')
+    barriers = tuple(st.session_state.background_info['barriers'])
+    resources, barrier_resources = section_memo(
+        'resources',
+        (county, postcode_area, barriers),
+        lambda: (
+            get_resource_recommendations(county, postcode_area, barriers),
+            {barrier: get_barrier_resources(county, postcode_area, barrier) for barrier in barriers}
+        )
     )
     
     for resource in resources:
-        with st.expander(resource["name"]):
+        label = resource["name"]
+        if "distance_km" in resource:
+            label += f" ({resource['distance_km']} km)"
+        with st.expander(label):
             st.write(resource["description"])
             if "contact" in resource:
                 st.write(f"**How to Access:** {resource['contact']}")
@@ -275,24 +206,18 @@ def show_resources():
                 for link in resource["links"]:
                     st.write(f"• {link}")
     
-    if st.session_state.background_info['barriers']:
+    if barriers:
         st.subheader("Support for Specific Barriers")
-        for barrier in st.session_state.background_info['barriers']:
+        for barrier in barriers:
             with st.expander(f"Resources for: {barrier}"):
+                nearby = barrier_resources[barrier]
+                if nearby:
+                    st.write("**Nearby:**")
+                    for resource in nearby:
+                        st.write(f"• {resource['name']} ({resource['distance_km']} km) - {resource.get('contact', '')}")
                 st.write("**Available Support:**")
-                st.write("• Contact local support services")
-                st.write("• Explore available assistance programs")
-                st.write("• Connect with community organizations")
-                
-                if barrier == "Transportation issues":
-                    st.write("• Research public transportation options")
-                    st.write("• Look into carpool programs")
-                elif barrier == "Childcare needs":
-                    st.write("• Explore subsidized childcare programs")
-                    st.write("• Research flexible work arrangements")
-                elif barrier == "Housing instability":
-                    st.write("• Contact local housing assistance programs")
-                    st.write("• Connect with housing support services")
+                for action in get_content().support_for(barrier):
+                    st.write(f"• {action}")
 
 def show_recommendations_page():
     """Main recommendations page showing all sections"""
@@ -306,26 +231,62 @@ def show_recommendations_page():
             st.rerun()
         return
     
-    # Create tabs for different types of recommendations
-    tabs = st.tabs(["AI Analysis", "Career Paths", "Skill Development", "Resources & Support"])
-    
-    with tabs[0]:
-        # Calculate CAAS scores
-        caas_scores = calculate_caas_scores()
+    # Scores are computed once per run and shared by every section
+    caas_scores = calculate_caas_scores()
+    show_recommendation_sections(caas_scores)
+
+@st.fragment
+def show_recommendation_sections(caas_scores):
+    """Section picker and the selected section
+
+    Only the selected section is rendered, and switching sections reruns
+    this fragment rather than the whole app.
+    """
+    section = st.radio(
+        "Section",
+        RECOMMENDATION_SECTIONS,
+        horizontal=True,
+        key="recommendations_section",
+        label_visibility="collapsed"
+    )
+
+    if section == "AI Analysis":
+        show_ai_analysis(caas_scores)
+    elif section == "Career Paths":
+        show_career_paths(caas_scores)
+    elif section == "Skill Development":
+        show_skill_development(caas_scores)
+    else:
+        show_resources()
+
+@st.fragment
+def show_ai_analysis(caas_scores):
+    """Display the AI analysis, reusing a speculative or cached result"""
+    if not caas_scores:
+        st.error("Unable to calculate CAAS scores. Please complete the assessment first.")
+        return
         
-        if not caas_scores:
-            st.error("Unable to calculate CAAS scores. Please complete the assessment first.")
-            return
-            
-        # Generate and display AI analysis
-        analysis = generate_career_analysis(caas_scores, st.session_state.background_info)
+    background_info = st.session_state.background_info
+    if settings.ANALYSIS_DEADLINE_SECONDS > 0:
+        _, from_model = hedged_career_analysis(
+            caas_scores, background_info, st.empty(), settings.ANALYSIS_DEADLINE_SECONDS
+        )
+        if not from_model:
+            # Rerunning this fragment picks up a late analysis from the cache
+            st.button("Check for your AI analysis", key="refresh_ai_analysis")
+        return
+
+    # Attach to an analysis started while the user was on the background form
+    analysis = None
+    if speculative_analysis_pending(caas_scores, background_info):
+        with st.spinner("Finishing your personalised analysis..."):
+            analysis = wait_for_speculative_analysis(caas_scores, background_info)
+
+    # Generate and display AI analysis
+    if analysis is not None:
+        display_ai_analysis(analysis)
+    elif settings.ANALYSIS_STREAMING and not settings.ANALYSIS_SECTIONED:
+        stream_career_analysis(caas_scores, background_info, st.empty())
+    else:
+        analysis = generate_career_analysis(caas_scores, background_info)
         display_ai_analysis(analysis)
-    
-    with tabs[1]:
-        show_career_paths()
-    
-    with tabs[2]:
-        show_skill_development()
-    
-    with tabs[3]:
-        show_resources()
\ No newline at end of file
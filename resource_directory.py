@@ -0,0 +1,239 @@
+import csv
+import functools
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+import settings
+from file_watch import WatchedFiles, data_path
+
+EARTH_RADIUS_KM = 6371.0
+
+# Grid cell size in degrees; roughly 28 km north-south and 17 km east-west
+# across England, so most lookups touch only a handful of cells.
+GRID_DEGREES = 0.25
+
+# Service tags are bits of one uint64 mask per provider
+MAX_SERVICE_TAGS = 64
+
+@dataclass(frozen=True, slots=True)
+class Provider:
+    """A support provider; national providers have no location"""
+    name: str
+    description: str
+    outcode: str
+    services: frozenset
+    contact: str
+    links: tuple
+    latitude: float = None
+    longitude: float = None
+
+def haversine_km(lat, lon, latitudes, longitudes):
+    """Great-circle distance from one point to arrays of points, in km"""
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(latitudes), np.radians(longitudes)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+def normalize_outcode(postcode_area):
+    """Uppercase and strip a postcode area, keeping only the outward code"""
+    return (postcode_area or "").upper().replace(" ", "")[:4]
+
+def postcode_area_letters(outcode):
+    """Leading letters of an outcode, e.g. SW for SW1A and M for M14"""
+    letters = []
+    for ch in outcode:
+        if not ch.isalpha():
+            break
+        letters.append(ch)
+    return "".join(letters)
+
+class ResourceDirectory:
+    """Provider directory with a lat/lon grid index for nearest-N lookups
+
+    Built once per process and shared by every session; sessions only ever
+    hold the handful of providers returned for their location.
+    """
+
+    def __init__(self, providers, outcodes):
+        self.outcodes = dict(outcodes)
+        located = []
+        national = []
+        for provider in providers:
+            if provider.latitude is None:
+                national.append(provider)
+            else:
+                located.append(provider)
+        self.providers = tuple(located)
+        self.national = tuple(national)
+
+        self._latitudes = np.array([p.latitude for p in located], dtype=np.float64)
+        self._longitudes = np.array([p.longitude for p in located], dtype=np.float64)
+
+        # Service tags become bit positions so filtering is one vectorised AND
+        services = sorted({s for p in providers for s in p.services})
+        if len(services) > MAX_SERVICE_TAGS:
+            raise ValueError(
+                f"providers use {len(services)} service tags; at most {MAX_SERVICE_TAGS} are supported"
+            )
+        self.service_bit = {service: 1 << i for i, service in enumerate(services)}
+        self._service_masks = np.array(
+            [self.service_mask(p.services) for p in located], dtype=np.uint64
+        )
+
+        grid = {}
+        for i, provider in enumerate(located):
+            grid.setdefault(self._cell(provider.latitude, provider.longitude), []).append(i)
+        self._grid = {cell: np.array(ids, dtype=np.intp) for cell, ids in grid.items()}
+
+        counties = {}
+        for latitude, longitude, county in self.outcodes.values():
+            counties.setdefault(county, []).append((latitude, longitude))
+        self._county_centroids = {
+            county: tuple(float(x) for x in np.mean(points, axis=0))
+            for county, points in counties.items()
+        }
+
+    @staticmethod
+    def _cell(latitude, longitude):
+        return (math.floor(latitude / GRID_DEGREES), math.floor(longitude / GRID_DEGREES))
+
+    def service_mask(self, services):
+        """Bitmask of the known service tags in services"""
+        mask = 0
+        for service in services:
+            mask |= self.service_bit.get(service, 0)
+        return mask
+
+    def locate(self, county, postcode_area):
+        """Best-effort (lat, lon) for a user, or None if unknown
+
+        Tries the exact outcode, then the outcode without a trailing
+        sub-district letter (SW1A -> SW1), then the centroid of all known
+        outcodes in the same postcode area, and finally the county centroid.
+        """
+        outcode = normalize_outcode(postcode_area)
+        for candidate in (outcode, outcode[:-1] if outcode[-1:].isalpha() else None):
+            if candidate and candidate in self.outcodes:
+                return self.outcodes[candidate][:2]
+
+        area = postcode_area_letters(outcode)
+        if area:
+            points = [
+                value[:2] for code, value in self.outcodes.items()
+                if postcode_area_letters(code) == area
+            ]
+            if points:
+                return tuple(float(x) for x in np.mean(points, axis=0))
+
+        return self._county_centroids.get(county)
+
+    def nearest(self, latitude, longitude, services=(), n=5, max_km=None):
+        """Return up to n (provider, km) pairs nearest the point
+
+        Only providers offering at least one of services are considered
+        (all providers when services is empty). The grid is searched in
+        expanding rings until no unsearched cell can hold a closer match.
+        """
+        max_km = settings.RESOURCE_MAX_DISTANCE_KM if max_km is None else max_km
+        wanted = self.service_mask(services)
+        if services and not wanted:
+            return []
+
+        row, col = self._cell(latitude, longitude)
+        # Narrowest cell dimension at this latitude bounds the ring distance
+        cell_km = GRID_DEGREES * 111.0 * min(1.0, math.cos(math.radians(abs(latitude) + GRID_DEGREES)))
+        max_ring = int(max_km / cell_km) + 1
+
+        found_ids = []
+        found_km = np.empty(0)
+        for ring in range(max_ring + 1):
+            # Cells in this ring are at least (ring - 1) cells from the point
+            if len(found_km) >= n and np.partition(found_km, n - 1)[n - 1] <= (ring - 1) * cell_km:
+                break
+            ring_ids = [
+                self._grid[cell] for cell in self._ring_cells(row, col, ring) if cell in self._grid
+            ]
+            if not ring_ids:
+                continue
+            ids = np.concatenate(ring_ids)
+            if wanted:
+                ids = ids[(self._service_masks[ids] & np.uint64(wanted)) != 0]
+            if ids.size:
+                found_ids.append(ids)
+                found_km = np.concatenate([
+                    found_km, haversine_km(latitude, longitude, self._latitudes[ids], self._longitudes[ids])
+                ])
+
+        if not found_ids:
+            return []
+        ids = np.concatenate(found_ids)
+        within = found_km <= max_km
+        ids, distances = ids[within], found_km[within]
+        order = np.argsort(distances, kind="stable")[:n]
+        return [(self.providers[i], float(distances[j])) for j, i in zip(order, ids[order])]
+
+    @staticmethod
+    def _ring_cells(row, col, ring):
+        """Grid cells at Chebyshev distance ring from (row, col)"""
+        if ring == 0:
+            yield (row, col)
+            return
+        for d in range(-ring, ring + 1):
+            yield (row - ring, col + d)
+            yield (row + ring, col + d)
+        for d in range(-ring + 1, ring):
+            yield (row + d, col - ring)
+            yield (row + d, col + ring)
+
+    def national_for(self, services=()):
+        """National providers offering any of services (all when empty)"""
+        if not services:
+            return list(self.national)
+        wanted = set(services)
+        return [p for p in self.national if p.services & wanted]
+
+def load_outcodes(path):
+    """Read outcode centroids: {outcode: (latitude, longitude, county)}"""
+    outcodes = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            outcodes[row["outcode"].upper()] = (
+                float(row["latitude"]), float(row["longitude"]), row["county"]
+            )
+    return outcodes
+
+def load_providers(path, outcodes):
+    """Read providers, placing each at its outcode centroid"""
+    providers = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            outcode = row["outcode"].upper()
+            latitude = longitude = None
+            if outcode in outcodes:
+                latitude, longitude = outcodes[outcode][:2]
+            providers.append(Provider(
+                name=row["name"],
+                description=row["description"],
+                outcode=outcode,
+                services=frozenset(s.strip() for s in row["services"].split(";") if s.strip()),
+                contact=row["contact"],
+                links=tuple(link.strip() for link in row["links"].split(";") if link.strip()),
+                latitude=latitude,
+                longitude=longitude,
+            ))
+    return providers
+
+def load_directory(outcodes_path, providers_path):
+    outcodes = load_outcodes(outcodes_path)
+    return ResourceDirectory(load_providers(providers_path, outcodes), outcodes)
+
+@functools.lru_cache(maxsize=None)
+def _directory_files():
+    paths = (data_path(settings.OUTCODES_PATH), data_path(settings.PROVIDERS_PATH))
+    return WatchedFiles(paths, lambda: load_directory(*paths), settings.DATA_RELOAD_SECONDS)
+
+def get_resource_directory():
+    """Return the process-wide resource directory, reloaded when its files change"""
+    return _directory_files().get()
@@ -0,0 +1,198 @@
+import functools
+import hashlib
+import json
+import os
+import secrets
+import sqlite3
+import time
+
+import streamlit as st
+
+import metrics
+import settings
+from analysis_cache import canonical_json
+from caas_scoring import NUM_QUESTIONS, Answers, encode_responses
+
+# Query parameter carrying the resumable session token
+TOKEN_PARAM = "session"
+
+# Leading byte of stored responses; bump it when the question order or the
+# encoding changes so older rows are ignored rather than misread
+RESPONSES_FORMAT = 1
+
+def pack_responses(responses):
+    """Format byte followed by one rating byte per question (0 = unanswered)"""
+    return bytes([RESPONSES_FORMAT]) + encode_responses(responses).tobytes()
+
+def unpack_responses(blob):
+    """Responses dict from pack_responses output, or None if it is not readable"""
+    if not blob or blob[0] != RESPONSES_FORMAT or len(blob) != NUM_QUESTIONS + 1:
+        return None
+    return Answers(bytearray(blob[1:]))
+
+class SessionStore:
+    """Assessment progress per session token in SQLite
+
+    Each part of a session (responses, background, page) is written on its
+    own as it changes, so a reconnect or restart loses at most the section
+    being filled in.
+    """
+
+    FIELDS = ("responses", "background", "page")
+
+    def __init__(self, path, ttl_seconds):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS sessions (
+                    token TEXT PRIMARY KEY,
+                    responses BLOB,
+                    background TEXT,
+                    page TEXT,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def load(self, token):
+        """Return the stored fields of a live session, or None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT responses, background, page FROM sessions WHERE token = ? AND updated_at >= ?",
+                (token, time.time() - self.ttl_seconds),
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(self.FIELDS, row))
+
+    def save(self, token, **fields):
+        """Write the given encoded fields, leaving the others as they are"""
+        columns = [name for name in self.FIELDS if name in fields]
+        updates = "".join(f", {name} = excluded.{name}" for name in columns)
+        with self._connect() as conn:
+            conn.execute(
+                f"""INSERT INTO sessions (token, {''.join(f'{name}, ' for name in columns)}updated_at)
+                VALUES (?, {'?, ' * len(columns)}?)
+                ON CONFLICT(token) DO UPDATE SET updated_at = excluded.updated_at{updates}""",
+                (token, *(fields[name] for name in columns), time.time()),
+            )
+
+    def delete(self, token):
+        """Remove a session"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE token = ?", (token,))
+
+    def prune(self):
+        """Drop sessions untouched for longer than the TTL"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE updated_at < ?", (time.time() - self.ttl_seconds,))
+
+@functools.lru_cache(maxsize=None)
+def get_session_store():
+    """Return the process-wide session store, or None when persistence is disabled"""
+    if not settings.SESSION_STORE_ENABLED:
+        return None
+    return SessionStore(settings.SESSION_STORE_PATH, settings.SESSION_TTL_SECONDS)
+
+def _encode(fields):
+    encoded = {}
+    if "responses" in fields:
+        encoded["responses"] = pack_responses(fields["responses"])
+    if "background" in fields:
+        encoded["background"] = canonical_json(fields["background"])
+    if "page" in fields:
+        encoded["page"] = fields["page"]
+    return encoded
+
+def _digest(value):
+    # What was last written is remembered as a short digest, not a copy
+    data = value if isinstance(value, bytes) else value.encode("utf-8")
+    return hashlib.blake2b(data, digest_size=8).digest()
+
+def restore_session():
+    """Load the session named in the URL into st.session_state
+
+    Runs once per browser session, before any page state is initialised,
+    so the assessment and background form pick up the restored answers.
+    """
+    if 'session_token' in st.session_state:
+        return
+    st.session_state.session_token = None
+    st.session_state.session_saved = {}
+    store = get_session_store()
+    token = st.query_params.get(TOKEN_PARAM)
+    if store is None or not token:
+        return
+
+    with metrics.span("session_restore"):
+        saved = store.load(token)
+        if saved is None:
+            del st.query_params[TOKEN_PARAM]
+            return
+        st.session_state.session_token = token
+        st.session_state.session_saved = {
+            name: _digest(value) for name, value in saved.items() if value is not None
+        }
+        responses = unpack_responses(saved["responses"])
+        if responses is not None:
+            st.session_state.responses = responses
+        if saved["background"] is not None:
+            st.session_state.background_info = json.loads(saved["background"])
+        if saved["page"] is not None:
+            st.session_state.page = saved["page"]
+
+def persist_session(**fields):
+    """Write the given parts of the session if they changed since the last write
+
+    Accepts ``responses``, ``background`` and ``page``. The first write
+    issues the session token and puts it in the URL, so reloading or
+    reopening that URL resumes the session.
+    """
+    store = get_session_store()
+    if store is None or st.session_state.get('session_ended'):
+        return
+    saved = st.session_state.setdefault('session_saved', {})
+    changed = {name: value for name, value in _encode(fields).items() if saved.get(name) != _digest(value)}
+    if not changed:
+        return
+
+    with metrics.span("session_save"):
+        token = st.session_state.get('session_token')
+        if not token:
+            store.prune()
+            token = st.session_state.session_token = secrets.token_urlsafe(16)
+            st.query_params[TOKEN_PARAM] = token
+        store.save(token, **changed)
+        saved.update((name, _digest(value)) for name, value in changed.items())
+
+def end_session():
+    """Stop keeping this session once its journey is complete
+
+    The saved copy is deleted and the token leaves the URL, so neither a
+    later visitor on the same computer nor the browser history can bring
+    the answers back. The page keeps its state, but nothing more is saved
+    for this browser session.
+    """
+    st.session_state.session_ended = True
+    token = st.session_state.get('session_token')
+    if token:
+        store = get_session_store()
+        if store is not None:
+            store.delete(token)
+        st.session_state.session_token = None
+        st.session_state.session_saved = {}
+    if TOKEN_PARAM in st.query_params:
+        del st.query_params[TOKEN_PARAM]
+
+def forget_session():
+    """Delete the saved session and every answer in this browser session"""
+    end_session()
+    st.session_state.clear()
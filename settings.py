@@ -0,0 +1,128 @@
+import os
+
+# Runtime settings, overridable through environment variables so the same
+# code can run under `streamlit run`, the batch CLI and the benchmark tools.
+
+def env_bool(name, default):
+    """Read a boolean flag from the environment"""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+def env_int(name, default):
+    """Read an integer setting from the environment"""
+    value = os.environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+def env_float(name, default):
+    """Read a float setting from the environment"""
+    value = os.environ.get(name)
+    return float(value) if value not in (None, "") else default
+
+CACHE_DIR = os.environ.get("CAREER_CACHE_DIR", ".cache")
+
+# Persistent analysis cache
+ANALYSIS_CACHE_ENABLED = env_bool("ANALYSIS_CACHE_ENABLED", True)
+ANALYSIS_CACHE_PATH = os.environ.get(
+    "ANALYSIS_CACHE_PATH", os.path.join(CACHE_DIR, "analysis_cache.sqlite3")
+)
+ANALYSIS_CACHE_TTL_SECONDS = env_int("ANALYSIS_CACHE_TTL_SECONDS", 7 * 24 * 3600)
+ANALYSIS_CACHE_MAX_BYTES = env_int("ANALYSIS_CACHE_MAX_BYTES", 50 * 1024 * 1024)
+
+# Render the AI Analysis tab progressively as tokens arrive
+ANALYSIS_STREAMING = env_bool("ANALYSIS_STREAMING", True)
+
+# Shared Anthropic client
+LLM_CONNECT_TIMEOUT = env_float("LLM_CONNECT_TIMEOUT", 5.0)
+LLM_READ_TIMEOUT = env_float("LLM_READ_TIMEOUT", 60.0)
+LLM_MAX_RETRIES = env_int("LLM_MAX_RETRIES", 3)
+LLM_BACKOFF_BASE = env_float("LLM_BACKOFF_BASE", 0.5)
+LLM_BACKOFF_MAX = env_float("LLM_BACKOFF_MAX", 8.0)
+LLM_CIRCUIT_FAILURE_THRESHOLD = env_int("LLM_CIRCUIT_FAILURE_THRESHOLD", 5)
+LLM_CIRCUIT_RESET_SECONDS = env_float("LLM_CIRCUIT_RESET_SECONDS", 30.0)
+
+# Model tiers, most capable first. Each request goes to the most capable
+# tier predicted to finish within the SLO, with an output budget scaled by
+# profile complexity, and is hedged to the fast tier when it runs slow.
+ANALYSIS_MODEL = os.environ.get("ANALYSIS_MODEL", "claude-3-sonnet-20240229")
+ANALYSIS_FAST_MODEL = os.environ.get("ANALYSIS_FAST_MODEL", "claude-3-haiku-20240307")
+ANALYSIS_LATENCY_SLO_SECONDS = env_float("ANALYSIS_LATENCY_SLO_SECONDS", 40.0)
+ANALYSIS_MIN_TOKENS = env_int("ANALYSIS_MIN_TOKENS", 800)
+ANALYSIS_MAX_TOKENS = env_int("ANALYSIS_MAX_TOKENS", 1500)
+ANALYSIS_HEDGING = env_bool("ANALYSIS_HEDGING", True)
+
+# Show the local analysis at once and swap in the model's only if it starts
+# arriving within this many seconds; 0 waits for the model as before
+ANALYSIS_DEADLINE_SECONDS = env_float("ANALYSIS_DEADLINE_SECONDS", 8.0)
+ANALYSIS_WORKERS = env_int("ANALYSIS_WORKERS", 8)
+
+# Generate the five analysis sections as concurrent smaller requests. Each
+# analysis then costs five (mostly shared and cached) upstream calls.
+ANALYSIS_SECTIONED = env_bool("ANALYSIS_SECTIONED", False)
+
+# Reuse the analysis of a profile with the same scores, selections,
+# education, county and free-text answers in another postcode area
+SIMILARITY_REUSE_ENABLED = env_bool("SIMILARITY_REUSE_ENABLED", True)
+SIMILARITY_MAX_PER_BUCKET = env_int("SIMILARITY_MAX_PER_BUCKET", 200)
+SIMILARITY_INDEX_PATH = os.environ.get(
+    "SIMILARITY_INDEX_PATH", os.path.join(CACHE_DIR, "similarity_index.sqlite3")
+)
+
+# Admission for upstream calls; 0 disables a limit. With a shared
+# STATE_BACKEND every worker and replica draws from the same allowance.
+LLM_REQUESTS_PER_MINUTE = env_int("LLM_REQUESTS_PER_MINUTE", 50)
+LLM_TOKENS_PER_MINUTE = env_int("LLM_TOKENS_PER_MINUTE", 0)
+LLM_BURST_SECONDS = env_float("LLM_BURST_SECONDS", 10.0)
+LLM_QUEUE_MAX_DEPTH = env_int("LLM_QUEUE_MAX_DEPTH", 100)
+LLM_QUEUE_TIMEOUT = env_float("LLM_QUEUE_TIMEOUT", 120.0)
+
+# Where rate-limit buckets, cross-process single-flight leases and (for
+# redis) cached analyses live: "memory" (this process only), "sqlite" (a
+# WAL database shared by the processes on one host) or "redis" (any
+# Redis-protocol server shared by every replica)
+STATE_BACKEND = os.environ.get("STATE_BACKEND", "memory")
+STATE_SQLITE_PATH = os.environ.get("STATE_SQLITE_PATH", os.path.join(CACHE_DIR, "state.sqlite3"))
+STATE_REDIS_URL = os.environ.get("STATE_REDIS_URL", "redis://127.0.0.1:6379/0")
+STATE_KEY_PREFIX = os.environ.get("STATE_KEY_PREFIX", "career_guidance:")
+# How long a cross-process single-flight leader holds its lease; followers
+# take over if it disappears without finishing
+SHARED_FLIGHT_LEASE_SECONDS = env_float("SHARED_FLIGHT_LEASE_SECONDS", 120.0)
+
+# Save answers and background server-side under a token in the page URL,
+# so a reconnect or restart resumes a half-finished assessment. Anyone with
+# the URL can resume it, e.g. the next person on a shared computer, so the
+# saved copy is deleted once the recommendations are shown and otherwise
+# kept only for a few hours.
+SESSION_STORE_ENABLED = env_bool("SESSION_STORE_ENABLED", True)
+SESSION_STORE_PATH = os.environ.get("SESSION_STORE_PATH", os.path.join(CACHE_DIR, "sessions.sqlite3"))
+SESSION_TTL_SECONDS = env_int("SESSION_TTL_SECONDS", 4 * 3600)
+
+# Speculative pre-generation while the user is on the background form
+SPECULATIVE_ANALYSIS_ENABLED = env_bool("SPECULATIVE_ANALYSIS_ENABLED", True)
+SPECULATIVE_WORKERS = env_int("SPECULATIVE_WORKERS", 4)
+SPECULATIVE_SETTLE_SECONDS = env_float("SPECULATIVE_SETTLE_SECONDS", 1.0)
+
+# Guidance text (score interpretations, skill plans, barrier support)
+CONTENT_PATH = os.environ.get("CONTENT_PATH", os.path.join("data", "content.json"))
+# Seconds between checks for edited data files (content, careers,
+# providers); 0 loads them once per process
+DATA_RELOAD_SECONDS = env_float("DATA_RELOAD_SECONDS", 2.0)
+
+# Occupation catalog used for career path suggestions (relative to the repo)
+CAREER_CATALOG_PATH = os.environ.get("CAREER_CATALOG_PATH", os.path.join("data", "careers.csv"))
+
+# Local resource directory (paths relative to the repo)
+OUTCODES_PATH = os.environ.get("OUTCODES_PATH", os.path.join("data", "outcodes.csv"))
+PROVIDERS_PATH = os.environ.get("PROVIDERS_PATH", os.path.join("data", "providers.csv"))
+RESOURCE_MAX_DISTANCE_KM = env_float("RESOURCE_MAX_DISTANCE_KM", 80.0)
+
+# How long a request waits on an identical in-flight request before giving up
+SINGLE_FLIGHT_WAIT_TIMEOUT = env_float("SINGLE_FLIGHT_WAIT_TIMEOUT", 90.0)
+
+# Stage timings and counters in Prometheus text format; off by default
+METRICS_ENABLED = env_bool("METRICS_ENABLED", False)
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = env_int("METRICS_PORT", 9464)
+METRICS_FILE = os.environ.get("METRICS_FILE", "")
+METRICS_FILE_INTERVAL = env_float("METRICS_FILE_INTERVAL", 15.0)
@@ -0,0 +1,146 @@
+import functools
+import hashlib
+import os
+import re
+import sqlite3
+import time
+
+import metrics
+import settings
+from analysis_cache import canonical_json, get_analysis_cache
+from resource_directory import normalize_outcode
+
+# Free-text answers, which must match for an analysis to be reused
+TEXT_FIELDS = ("current_situation", "goals", "support_systems")
+
+WORD = re.compile(r"[a-z0-9']+")
+
+# Added to a reused analysis in place of any rewrite of its text
+LOCATION_LINE = "_Location: {county}, {postcode_area}_"
+
+def normalize_text(text):
+    """Lower-cased words only, so case, punctuation and spacing do not count"""
+    return " ".join(WORD.findall((text or "").lower()))
+
+def profile_bucket(caas_scores, background_info):
+    """Key for everything the prompt uses except the postcode area
+
+    Scores as the prompt renders them, the interest and barrier
+    selections, education, county and the normalised free-text answers,
+    so a reused analysis never quotes another person's scores or words.
+    """
+    payload = {
+        "scores": {dimension: f"{score}" for dimension, score in caas_scores.items()},
+        "interests": sorted(background_info.get("interests", [])),
+        "barriers": sorted(background_info.get("barriers", [])),
+        "education": background_info.get("education", ""),
+        "county": background_info.get("county", ""),
+        "answers": {field: normalize_text(background_info.get(field)) for field in TEXT_FIELDS},
+    }
+    return hashlib.sha256(canonical_json(payload).encode("utf-8")).hexdigest()
+
+def mentions_outcode(analysis, outcode):
+    """Whether analysis contains outcode as a whole, case-sensitive token"""
+    pattern = rf"(?<![A-Za-z0-9]){re.escape(outcode)}(?![A-Za-z0-9])"
+    return re.search(pattern, analysis) is not None
+
+def personalize(analysis, source_area, background_info):
+    """Return a reused analysis for this profile, or None if it cannot be
+
+    The text is never rewritten. An analysis written for another postcode
+    area is refused if it names that area, and otherwise gets this
+    profile's location as a templated line.
+    """
+    old = normalize_outcode(source_area)
+    new = (background_info.get("postcode_area") or "").strip()
+    if old == normalize_outcode(new):
+        return analysis
+    if old and mentions_outcode(analysis, old):
+        return None
+    location = LOCATION_LINE.format(county=background_info.get("county", ""), postcode_area=new)
+    return f"{analysis}\n\n{location}"
+
+class SimilarityIndex:
+    """Analyses that other profiles may reuse, grouped by bucket, in SQLite
+
+    Only the newest ``max_per_bucket`` entries of a bucket are tried. The
+    analysis text itself stays in the analysis cache and is looked up by
+    key, so expiry and eviction there apply here too.
+    """
+
+    def __init__(self, path, max_per_bucket):
+        self.path = path
+        self.max_per_bucket = max_per_bucket
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Entries bucketed on score levels could serve other people's answers
+            conn.execute("DROP TABLE IF EXISTS profiles")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS reusable_analyses (
+                    analysis_key TEXT PRIMARY KEY,
+                    bucket TEXT NOT NULL,
+                    postcode_area TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )"""
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_reusable_bucket ON reusable_analyses(bucket, created_at)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def find(self, caas_scores, background_info, cache):
+        """Return the newest reusable analysis for this profile, or None
+
+        The analysis is personalised for this profile. Lookups in a bucket
+        with no stored profiles are counted separately from misses.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                """SELECT analysis_key, postcode_area FROM reusable_analyses
+                WHERE bucket = ? ORDER BY created_at DESC LIMIT ?""",
+                (profile_bucket(caas_scores, background_info), self.max_per_bucket),
+            ).fetchall()
+        if not rows:
+            metrics.increment("similarity_lookups_total", result="empty_bucket")
+            return None
+
+        for analysis_key, postcode_area in rows:
+            analysis = cache.get(analysis_key)
+            if analysis is None:
+                continue
+            analysis = personalize(analysis, postcode_area, background_info)
+            if analysis is not None:
+                metrics.increment("similarity_lookups_total", result="hit")
+                return analysis
+        metrics.increment("similarity_lookups_total", result="miss")
+        return None
+
+    def add(self, caas_scores, background_info, analysis_key):
+        """Remember a profile whose analysis is cached under analysis_key"""
+        with self._connect() as conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO reusable_analyses (analysis_key, bucket, postcode_area, created_at)
+                VALUES (?, ?, ?, ?)""",
+                (
+                    analysis_key,
+                    profile_bucket(caas_scores, background_info),
+                    (background_info.get("postcode_area") or "").strip(),
+                    time.time(),
+                ),
+            )
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM reusable_analyses")
+
+@functools.lru_cache(maxsize=None)
+def get_similarity_index():
+    """Return the process-wide index, or None when reuse or caching is disabled"""
+    if not settings.SIMILARITY_REUSE_ENABLED or get_analysis_cache() is None:
+        return None
+    return SimilarityIndex(settings.SIMILARITY_INDEX_PATH, settings.SIMILARITY_MAX_PER_BUCKET)
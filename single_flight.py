@@ -0,0 +1,199 @@
+import functools
+import threading
+import time
+import uuid
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+import settings
+from state_backend import StateBackendError, get_state_backend
+
+class LeaderInterrupted(Exception):
+    """The leading call was cancelled (e.g. by a Streamlit rerun) before finishing"""
+
+class Flight(Future):
+    """Future of an in-flight call, with the text its leader has streamed so far"""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution
+
+    The first caller for a key becomes the leader and does the work; callers
+    arriving while it is in flight wait on the leader's future and receive
+    the same result or exception. Each waiter has its own timeout, so a slow
+    leader never holds a waiter longer than it asked for. A streaming leader
+    publishes its text as it goes, so a waiter that joins late can still
+    show the response as it is written.
+    """
+
+    def __init__(self, poll_interval=0.05):
+        self.poll_interval = poll_interval
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+
+    def begin(self, key):
+        """Join or start the call for key; returns (future, is_leader)"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.followers += 1
+                return future, False
+            future = Flight()
+            future.set_running_or_notify_cancel()
+            self._calls[key] = future
+            self.leaders += 1
+            return future, True
+
+    def publish(self, key, text):
+        """Leader only: pass a chunk of streamed output on to the waiters"""
+        with self._lock:
+            future = self._calls.get(key)
+        if future is not None:
+            future.chunks.append(text)
+
+    def wait(self, future, timeout=None, on_text=None):
+        """Follower: wait for the leader's result
+
+        ``on_text`` receives the leader's published text, everything so far
+        first, then each new chunk, on the calling thread.
+        """
+        if on_text is None:
+            return future.result(timeout=timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        sent = 0
+        while True:
+            try:
+                result = future.result(timeout=self.poll_interval)
+                done = True
+            except FutureTimeout:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise
+                done = False
+            available = len(future.chunks)
+            if available > sent:
+                on_text("".join(future.chunks[sent:available]))
+                sent = available
+            if done:
+                return result
+
+    def resolve(self, key, future, result):
+        """Leader only: publish the result and release the key"""
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        future.set_result(result)
+
+    def reject(self, key, future, error):
+        """Leader only: publish the failure and release the key
+
+        Control-flow exceptions such as Streamlit's rerun signals are not
+        forwarded to waiters; they see LeaderInterrupted and retry instead.
+        """
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        if not isinstance(error, Exception):
+            error = LeaderInterrupted(type(error).__name__)
+        future.set_exception(error)
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key, fn, timeout=None, on_text=None):
+        """Run fn once per concurrent key and return its result to every caller
+
+        A follower's ``on_text`` receives the leader's published text.
+        """
+        while True:
+            future, leader = self.begin(key)
+            if leader:
+                break
+            try:
+                return self.wait(future, timeout, on_text)
+            except LeaderInterrupted:
+                continue
+        try:
+            result = fn()
+        except BaseException as e:
+            self.reject(key, future, e)
+            raise
+        self.resolve(key, future, result)
+        return result
+
+    def stats(self):
+        """Leader/follower counts; followers are upstream calls saved"""
+        with self._lock:
+            return {"leaders": self.leaders, "followers": self.followers, "in_flight": len(self._calls)}
+
+class SharedFlight:
+    """Coalesce identical calls across processes through a state backend
+
+    The leader holds a lease key in the backend while it works. Callers in
+    other processes poll ``lookup()`` (normally the shared cache the leader
+    writes to) until it returns a result. If the lease is released or
+    expires with nothing to find, the next caller takes over as leader.
+    """
+
+    NAMESPACE = "flight:"
+
+    def __init__(self, backend, lease_seconds, poll_interval=0.25):
+        self.backend = backend
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+
+    def do(self, key, fn, lookup, timeout=None):
+        """Run fn unless another process is already running it for key
+
+        Raises TimeoutError when a follower has waited ``timeout`` seconds.
+        """
+        lease = self.NAMESPACE + key
+        token = uuid.uuid4().hex
+        deadline = None if timeout is None else time.monotonic() + timeout
+        following = False
+        while not self.backend.add(lease, token, ttl=self.lease_seconds):
+            if not following:
+                following = True
+                with self._lock:
+                    self.followers += 1
+            while self.backend.get(lease) is not None:
+                result = lookup()
+                if result is not None:
+                    return result
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(f"Timed out waiting for another process to finish {key}")
+                time.sleep(self.poll_interval)
+            # The leader finished or vanished; it may have left a result
+            result = lookup()
+            if result is not None:
+                return result
+
+        with self._lock:
+            self.leaders += 1
+        try:
+            return fn()
+        finally:
+            try:
+                self.backend.delete(lease, token)
+            except StateBackendError:
+                # The lease expires on its own
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {"leaders": self.leaders, "followers": self.followers}
+
+@functools.lru_cache(maxsize=None)
+def get_shared_flight():
+    """Return the cross-process single-flight, or None with the memory backend"""
+    backend = get_state_backend()
+    if not backend.shared:
+        return None
+    return SharedFlight(backend, settings.SHARED_FLIGHT_LEASE_SECONDS)
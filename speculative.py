@@ -0,0 +1,121 @@
+import copy
+import logging
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+import streamlit as st
+
+import settings
+from ai_analysis import analysis_cache_key, request_career_analysis
+
+logger = logging.getLogger(__name__)
+
+# Speculative jobs are shared by every session in the process, keyed on the
+# analysis cache key, so two sessions with identical inputs share one job.
+_executor = ThreadPoolExecutor(
+    max_workers=settings.SPECULATIVE_WORKERS,
+    thread_name_prefix="speculative-analysis",
+)
+_jobs = {}
+_lock = threading.Lock()
+
+class _Job:
+    """An in-flight speculative generation and the sessions waiting on it"""
+
+    def __init__(self):
+        self.future = None
+        self.owners = set()
+
+def _run_job(key, caas_scores, background_info):
+    # Give the user a moment to finish editing; a superseded job then exits
+    # before spending an API call.
+    time.sleep(settings.SPECULATIVE_SETTLE_SECONDS)
+    with _lock:
+        job = _jobs.get(key)
+        if job is None or not job.owners:
+            _jobs.pop(key, None)
+            return None
+    try:
+        return request_career_analysis(caas_scores, background_info)
+    finally:
+        with _lock:
+            _jobs.pop(key, None)
+
+def _release(key, owner):
+    """Drop a session's interest in a job, cancelling it if nobody else wants it"""
+    job = _jobs.get(key)
+    if job is None:
+        return
+    job.owners.discard(owner)
+    if not job.owners and job.future.cancel():
+        _jobs.pop(key, None)
+        logger.debug("Cancelled superseded speculative analysis %s", key[:12])
+
+def _session_owner():
+    if 'speculative_owner' not in st.session_state:
+        st.session_state.speculative_owner = object()
+    return st.session_state.speculative_owner
+
+def start_speculative_analysis(caas_scores, background_info):
+    """Start generating the analysis for these inputs in the background
+
+    Called on every rerun of the background form once the inputs are
+    complete. If the inputs changed since the last call, the session's
+    previous job is superseded.
+    """
+    if not settings.SPECULATIVE_ANALYSIS_ENABLED:
+        return
+
+    key = analysis_cache_key(caas_scores, background_info)
+    previous = st.session_state.get('speculative_key')
+    if previous == key:
+        return
+
+    owner = _session_owner()
+    with _lock:
+        if previous is not None:
+            _release(previous, owner)
+        job = _jobs.get(key)
+        if job is None:
+            job = _Job()
+            _jobs[key] = job
+            job.future = _executor.submit(
+                _run_job, key, dict(caas_scores), copy.deepcopy(background_info)
+            )
+        job.owners.add(owner)
+    st.session_state.speculative_key = key
+
+def cancel_speculative_analysis():
+    """Withdraw this session's speculative job, if any"""
+    previous = st.session_state.get('speculative_key')
+    if previous is None:
+        return
+    with _lock:
+        _release(previous, _session_owner())
+    st.session_state.speculative_key = None
+
+def speculative_analysis_pending(caas_scores, background_info):
+    """Return True if a job for these inputs is queued or running"""
+    key = analysis_cache_key(caas_scores, background_info)
+    with _lock:
+        return key in _jobs
+
+def wait_for_speculative_analysis(caas_scores, background_info, timeout=None):
+    """Attach to a matching in-flight job and return its analysis
+
+    Returns None when there is no job for these inputs or it failed; the
+    caller then falls back to the regular (cached) generation path.
+    """
+    key = analysis_cache_key(caas_scores, background_info)
+    with _lock:
+        job = _jobs.get(key)
+    if job is None:
+        return None
+    try:
+        return job.future.result(timeout=timeout)
+    except CancelledError:
+        return None
+    except Exception as e:
+        logger.info("Speculative analysis failed, regenerating: %s", e)
+        return None
@@ -0,0 +1,381 @@
+import functools
+import os
+import socket
+import sqlite3
+import threading
+import time
+import urllib.parse
+
+import settings
+
+class StateBackendError(Exception):
+    """The shared state backend could not complete an operation"""
+
+def _take(levels, limits, costs):
+    """Token bucket arithmetic shared by every backend
+
+    ``levels`` maps bucket names to (tokens, updated_at) already refilled to
+    now. Returns (wait_seconds, new_levels): a wait of 0 means every bucket
+    covered its cost and new_levels has the costs taken out.
+    """
+    wait = 0.0
+    for name, (rate, capacity) in limits.items():
+        # A single call larger than the bucket waits for a full bucket
+        needed = min(costs.get(name, 0), capacity)
+        if levels[name][0] < needed:
+            wait = max(wait, (needed - levels[name][0]) / rate)
+    if wait > 0:
+        return wait, levels
+    return 0.0, {
+        name: (tokens - min(costs.get(name, 0), limits[name][1]), updated_at)
+        for name, (tokens, updated_at) in levels.items()
+    }
+
+def _refill(stored, limits, now):
+    """Levels of the limited buckets at now, from (tokens, updated_at) or None"""
+    levels = {}
+    for name, (rate, capacity) in limits.items():
+        tokens, updated_at = stored.get(name) or (capacity, now)
+        levels[name] = (min(capacity, tokens + max(0.0, now - updated_at) * rate), now)
+    return levels
+
+class MemoryBackend:
+    """State held in this process: the default for a single worker
+
+    Every backend offers the same operations: string values with optional
+    expiry (``get``, ``set``, ``add``, ``delete``, ``delete_prefix``) and
+    atomic multi-bucket token taking (``take_tokens``).
+    """
+
+    shared = False
+
+    def __init__(self):
+        self._values = {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key, now):
+        item = self._values.get(key)
+        if item is not None and item[1] is not None and item[1] <= now:
+            del self._values[key]
+            return None
+        return item
+
+    def get(self, key):
+        with self._lock:
+            item = self._live(key, time.time())
+            return None if item is None else item[0]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._values[key] = (value, time.time() + ttl if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        """Set key only if it is absent; returns True if it was set"""
+        with self._lock:
+            now = time.time()
+            if self._live(key, now) is not None:
+                return False
+            self._values[key] = (value, now + ttl if ttl else None)
+            return True
+
+    def delete(self, key, value=None):
+        """Delete key, only while it still holds value when one is given"""
+        with self._lock:
+            item = self._live(key, time.time())
+            if item is None or (value is not None and item[0] != value):
+                return False
+            del self._values[key]
+            return True
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._values if k.startswith(prefix)]:
+                del self._values[key]
+
+    def take_tokens(self, limits, costs):
+        """Take costs from every bucket at once, or none of them
+
+        ``limits`` maps bucket names to (refill per second, capacity).
+        Returns 0.0 when taken, otherwise the seconds until all buckets
+        could cover the costs.
+        """
+        with self._lock:
+            wait, levels = _take(_refill(self._buckets, limits, time.time()), limits, costs)
+            self._buckets.update(levels)
+            return wait
+
+class SQLiteBackend(MemoryBackend):
+    """State in a SQLite database in WAL mode, shared by every process using the file
+
+    WAL lets readers proceed alongside the single writer. The file must be
+    on a volume local to the host: SQLite locking is not reliable over
+    network filesystems.
+    """
+
+    shared = True
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL
+                )"""
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS buckets (
+                    name TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+        finally:
+            conn.close()
+
+    def _connect(self):
+        # Autocommit mode; writes that read first take the write lock up
+        # front with BEGIN IMMEDIATE
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    def _transaction(self, work):
+        try:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    result = work(conn, time.time())
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+                conn.execute("COMMIT")
+                return result
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            raise StateBackendError(f"State database unavailable: {e}") from e
+
+    def _execute(self, sql, params):
+        """Run one autocommitted statement; returns (first row, rows changed)"""
+        try:
+            conn = self._connect()
+            try:
+                cursor = conn.execute(sql, params)
+                return cursor.fetchone(), cursor.rowcount
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            raise StateBackendError(f"State database unavailable: {e}") from e
+
+    def get(self, key):
+        row, _ = self._execute(
+            "SELECT value FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time()),
+        )
+        return None if row is None else row[0]
+
+    def set(self, key, value, ttl=None):
+        self._execute(
+            "INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, time.time() + ttl if ttl else None),
+        )
+
+    def add(self, key, value, ttl=None):
+        def work(conn, now):
+            conn.execute("DELETE FROM state WHERE key = ? AND expires_at <= ?", (key, now))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, now + ttl if ttl else None),
+            )
+            return cursor.rowcount == 1
+        return self._transaction(work)
+
+    def delete(self, key, value=None):
+        if value is None:
+            _, changed = self._execute("DELETE FROM state WHERE key = ?", (key,))
+        else:
+            _, changed = self._execute("DELETE FROM state WHERE key = ? AND value = ?", (key, value))
+        return changed == 1
+
+    def delete_prefix(self, prefix):
+        self._execute("DELETE FROM state WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+
+    def take_tokens(self, limits, costs):
+        def work(conn, now):
+            stored = {
+                name: (tokens, updated_at)
+                for name, tokens, updated_at in conn.execute("SELECT name, tokens, updated_at FROM buckets")
+            }
+            wait, levels = _take(_refill(stored, limits, now), limits, costs)
+            conn.executemany(
+                "INSERT OR REPLACE INTO buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                [(name, tokens, updated_at) for name, (tokens, updated_at) in levels.items()],
+            )
+            return wait
+        return self._transaction(work)
+
+class RedisConnection:
+    """Minimal RESP2 client: one socket, one command at a time"""
+
+    def __init__(self, host, port, db=0, password=None, timeout=5.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.reader = self.sock.makefile("rb")
+        if password:
+            self.command("AUTH", password)
+        if db:
+            self.command("SELECT", db)
+
+    def command(self, *args):
+        parts = [f"*{len(args)}\r\n".encode("ascii")]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self.sock.sendall(b"".join(parts))
+        return self._read()
+
+    def _read(self):
+        line = self.reader.readline()
+        if not line:
+            raise StateBackendError("Connection closed by the state server")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode("utf-8")
+        if kind == b"-":
+            raise StateBackendError(body.decode("utf-8"))
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            size = int(body)
+            if size < 0:
+                return None
+            data = self.reader.read(size + 2)[:-2]
+            return data.decode("utf-8")
+        if kind == b"*":
+            size = int(body)
+            return None if size < 0 else [self._read() for _ in range(size)]
+        raise StateBackendError(f"Unexpected reply from the state server: {line!r}")
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+class RedisBackend:
+    """State on a Redis-protocol server shared by every replica
+
+    Each thread keeps its own connection. Conditional updates use
+    WATCH/MULTI/EXEC and are retried when another client got in between.
+    """
+
+    shared = True
+
+    # Attempts at an optimistic transaction before giving up
+    MAX_CONFLICTS = 50
+
+    def __init__(self, url, prefix):
+        parsed = urllib.parse.urlparse(url)
+        self.address = (parsed.hostname or "127.0.0.1", parsed.port or 6379)
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.password = urllib.parse.unquote(parsed.password) if parsed.password else None
+        self.prefix = prefix
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = RedisConnection(*self.address, db=self.db, password=self.password)
+        return conn
+
+    def _command(self, *args):
+        try:
+            return self._conn().command(*args)
+        except OSError as e:
+            # Drop the broken connection so the next call reconnects
+            conn = getattr(self._local, "conn", None)
+            self._local.conn = None
+            if conn is not None:
+                conn.close()
+            raise StateBackendError(f"State server unavailable: {e}") from e
+
+    def get(self, key):
+        return self._command("GET", self.prefix + key)
+
+    def set(self, key, value, ttl=None):
+        if ttl:
+            self._command("SET", self.prefix + key, value, "PX", int(ttl * 1000))
+        else:
+            self._command("SET", self.prefix + key, value)
+
+    def add(self, key, value, ttl=None):
+        args = ["SET", self.prefix + key, value, "NX"]
+        if ttl:
+            args += ["PX", int(ttl * 1000)]
+        return self._command(*args) == "OK"
+
+    def delete(self, key, value=None):
+        if value is None:
+            return self._command("DEL", self.prefix + key) == 1
+
+        def work(current):
+            if current[0] != value:
+                return False, None
+            return True, [("DEL", self.prefix + key)]
+        return self._optimistic([self.prefix + key], work)
+
+    def delete_prefix(self, prefix):
+        cursor = "0"
+        while True:
+            cursor, keys = self._command("SCAN", cursor, "MATCH", self.prefix + prefix + "*", "COUNT", 500)
+            if keys:
+                self._command("DEL", *keys)
+            if cursor == "0":
+                return
+
+    def take_tokens(self, limits, costs):
+        names = list(limits)
+        keys = [f"{self.prefix}bucket:{name}" for name in names]
+
+        def work(current):
+            now = time.time()
+            stored = {}
+            for name, raw in zip(names, current):
+                if raw is not None:
+                    tokens, updated_at = raw.split(":")
+                    stored[name] = (float(tokens), float(updated_at))
+            wait, levels = _take(_refill(stored, limits, now), limits, costs)
+            if wait > 0:
+                return wait, None
+            return 0.0, [("SET", key, f"{levels[name][0]!r}:{levels[name][1]!r}") for name, key in zip(names, keys)]
+        return self._optimistic(keys, work)
+
+    def _optimistic(self, keys, work):
+        """Run work(current values) and apply its writes only if keys are unchanged"""
+        for _ in range(self.MAX_CONFLICTS):
+            self._command("WATCH", *keys)
+            result, writes = work(self._command("MGET", *keys))
+            if not writes:
+                self._command("UNWATCH")
+                return result
+            self._command("MULTI")
+            for write in writes:
+                self._command(*write)
+            if self._command("EXEC") is not None:
+                return result
+        raise StateBackendError("Too much contention on the state server")
+
+@functools.lru_cache(maxsize=None)
+def get_state_backend():
+    """Return the process-wide state backend chosen by ``STATE_BACKEND``"""
+    if settings.STATE_BACKEND == "sqlite":
+        return SQLiteBackend(settings.STATE_SQLITE_PATH)
+    if settings.STATE_BACKEND == "redis":
+        return RedisBackend(settings.STATE_REDIS_URL, settings.STATE_KEY_PREFIX)
+    if settings.STATE_BACKEND != "memory":
+        raise StateBackendError(f"Unknown STATE_BACKEND {settings.STATE_BACKEND!r}")
+    return MemoryBackend()
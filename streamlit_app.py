@@ -1,6 +1,8 @@
 import streamlit as st
-from caas_assessment import show_assessment_page, initialize_assessment_state
-from background_form import show_background_page, initialize_background_state
+import metrics
+from session_store import end_session, forget_session, persist_session, restore_session
+from caas_assessment import show_assessment_page, initialize_assessment_state, is_assessment_complete
+from background_form import show_background_page, initialize_background_state, all_required_fields_filled
 from recommendations import (
     show_recommendations_page,
     show_career_paths,
@@ -16,6 +18,12 @@ def main():
         layout="wide"
     )
 
+    # Count full-script runs; fragment reruns don't pass through here
+    st.session_state.script_runs = st.session_state.get('script_runs', 0) + 1
+
+    # Resume a saved session from the URL before any state is defaulted
+    restore_session()
+
     # Initialize session state if not already done
     if 'page' not in st.session_state:
         st.session_state.page = 'welcome'
@@ -33,16 +41,31 @@ def main():
             initialize_background_state()
         if st.button("View Recommendations", use_container_width=True):
             st.session_state.page = 'recommendations'
+        if st.button("Start Over", use_container_width=True,
+                     help="Clear your answers from this computer and from the server"):
+            forget_session()
+            st.rerun()
+
+    metrics.start_exporter()
+
+    # Reopening the session's URL returns to the page it was on, until the
+    # journey is complete and the saved copy is deleted
+    if (st.session_state.page == 'recommendations' and is_assessment_complete()
+            and 'background_info' in st.session_state and all_required_fields_filled()):
+        end_session()
+    elif st.session_state.page != 'welcome':
+        persist_session(page=st.session_state.page)
 
     # Page routing
-    if st.session_state.page == 'welcome':
-        show_welcome_page()
-    elif st.session_state.page == 'assessment':
-        show_assessment_page()
-    elif st.session_state.page == 'background':
-        show_background_page()
-    elif st.session_state.page == 'recommendations':
-        show_recommendations_page()
+    with metrics.span("page_render", page=st.session_state.page):
+        if st.session_state.page == 'welcome':
+            show_welcome_page()
+        elif st.session_state.page == 'assessment':
+            show_assessment_page()
+        elif st.session_state.page == 'background':
+            show_background_page()
+        elif st.session_state.page == 'recommendations':
+            show_recommendations_page()
 
 def show_welcome_page():
     st.title("Welcome to Your Career Journey")
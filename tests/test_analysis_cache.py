@@ -0,0 +1,35 @@
+import sqlite3
+
+from analysis_cache import AnalysisCache
+
+def make_cache(tmp_path, **kwargs):
+    return AnalysisCache(str(tmp_path / "cache.sqlite3"), kwargs.get("ttl", 3600), kwargs.get("max_bytes", 10**6))
+
+def test_hit_does_not_take_the_write_lock(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set("key", "analysis")
+    writer = sqlite3.connect(cache.path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")
+    try:
+        assert cache.get("key") == "analysis"
+    finally:
+        writer.execute("ROLLBACK")
+        writer.close()
+
+def test_access_times_are_written_with_the_next_set(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=10)
+    cache.set("old", "aaaaa")
+    cache.set("new", "bbbbb")
+    # Reading "old" makes "new" the least recently used entry
+    assert cache.get("old") == "aaaaa"
+    cache.set("newest", "ccccc")
+    assert cache.peek("old") == "aaaaa"
+    assert cache.peek("new") is None
+
+def test_database_errors_read_as_a_miss(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set("key", "analysis")
+    cache.path = str(tmp_path)  # a directory, so every connection fails
+    assert cache.get("key") is None
+    assert cache.peek("key") is None
+    cache.set("other", "analysis")
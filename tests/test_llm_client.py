@@ -0,0 +1,94 @@
+import pytest
+
+import llm_client
+from llm_client import CircuitBreaker, CircuitOpenError, call_with_retries
+from rate_limiter import QueueFullError
+
+class Interrupted(BaseException):
+    """Stands in for Streamlit's rerun and stop signals"""
+
+class RejectingQueue:
+    def acquire(self, costs, on_wait=None):
+        raise QueueFullError("full")
+
+class PassingQueue:
+    def acquire(self, costs, on_wait=None):
+        if on_wait is not None:
+            on_wait(1)
+        return 0.0
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    monkeypatch.setattr(llm_client, "breaker", breaker)
+    return breaker
+
+def open_circuit(breaker):
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+def test_only_one_probe_while_half_open(breaker):
+    open_circuit(breaker)
+    assert breaker.allow_request() == (True, True)
+    assert breaker.allow_request() == (False, False)
+    breaker.record_success()
+    assert breaker.allow_request() == (True, False)
+
+def test_rejected_probe_is_released_without_counting_a_failure(breaker, monkeypatch):
+    monkeypatch.setattr(llm_client, "get_admission_queue", RejectingQueue)
+    open_circuit(breaker)
+    with pytest.raises(QueueFullError):
+        call_with_retries(lambda: "reply")
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request() == (True, True)
+
+def test_interrupted_probe_is_released(breaker, monkeypatch):
+    monkeypatch.setattr(llm_client, "get_admission_queue", PassingQueue)
+    open_circuit(breaker)
+
+    def on_queue(position):
+        raise Interrupted()
+
+    with pytest.raises(Interrupted):
+        call_with_retries(lambda: "reply", on_queue=on_queue)
+    assert call_with_retries(lambda: "reply") == "reply"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_rejected_non_probe_leaves_another_calls_probe(breaker, monkeypatch):
+    queue = PassingQueue()
+
+    class SwitchingQueue:
+        def acquire(self, costs, on_wait=None):
+            return queue.acquire(costs, on_wait)
+
+    monkeypatch.setattr(llm_client, "get_admission_queue", SwitchingQueue)
+    monkeypatch.setattr(llm_client, "is_retryable", lambda error: True)
+    monkeypatch.setattr(llm_client, "backoff_delay", lambda attempt, error=None: 0.0)
+
+    def fails_while_another_call_probes():
+        # Admitted while closed; meanwhile the circuit opens and another
+        # call takes the probe, then this call's retry is rejected
+        nonlocal queue
+        open_circuit(breaker)
+        assert breaker.allow_request() == (True, True)
+        queue = RejectingQueue()
+        raise ConnectionError("upstream")
+
+    with pytest.raises(QueueFullError):
+        call_with_retries(fails_while_another_call_probes)
+    assert breaker.allow_request() == (False, False)
+
+def test_open_circuit_fails_before_queueing(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60.0)
+    monkeypatch.setattr(llm_client, "breaker", breaker)
+    queued = []
+
+    class RecordingQueue:
+        def acquire(self, costs, on_wait=None):
+            queued.append(costs)
+
+    monkeypatch.setattr(llm_client, "get_admission_queue", RecordingQueue)
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        call_with_retries(lambda: "reply")
+    assert queued == []
@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+
+from rate_limiter import AdmissionQueue, QueueFullError, QueueTimeoutError, TokenBuckets
+from state_backend import MemoryBackend
+
+class GatedStore:
+    """Admits one caller each time open() is called"""
+
+    def __init__(self):
+        self.permits = 0
+
+    def open(self, queue):
+        with queue._cond:
+            self.permits += 1
+            queue._cond.notify_all()
+
+    def try_acquire(self, costs):
+        if self.permits:
+            self.permits -= 1
+            return 0.0
+        return 0.05
+
+def wait_for_depth(queue, depth):
+    deadline = time.monotonic() + 5
+    while queue.depth() != depth:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+def test_callers_are_admitted_in_arrival_order():
+    store = GatedStore()
+    queue = AdmissionQueue(store, max_depth=10, timeout=5)
+    admitted = []
+    threads = []
+    for i in range(5):
+        thread = threading.Thread(target=lambda i=i: (queue.acquire({"requests": 1}), admitted.append(i)))
+        thread.start()
+        threads.append(thread)
+        wait_for_depth(queue, i + 1)
+    for depth in range(5, 0, -1):
+        store.open(queue)
+        wait_for_depth(queue, depth - 1)
+    for thread in threads:
+        thread.join(5)
+    assert admitted == [0, 1, 2, 3, 4]
+
+def test_positions_are_reported_while_waiting():
+    store = GatedStore()
+    queue = AdmissionQueue(store, max_depth=10, timeout=5)
+    head = threading.Thread(target=queue.acquire, args=({"requests": 1},))
+    head.start()
+    wait_for_depth(queue, 1)
+    positions = []
+    second = threading.Thread(target=queue.acquire, args=({"requests": 1}, positions.append))
+    second.start()
+    wait_for_depth(queue, 2)
+    store.open(queue)
+    head.join(5)
+    deadline = time.monotonic() + 5
+    while len(positions) < 2:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+    store.open(queue)
+    second.join(5)
+    assert positions == [2, 1]
+
+def test_arrivals_past_max_depth_are_shed():
+    store = GatedStore()
+    queue = AdmissionQueue(store, max_depth=2, timeout=5)
+    threads = [threading.Thread(target=queue.acquire, args=({"requests": 1},)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    wait_for_depth(queue, 2)
+    with pytest.raises(QueueFullError):
+        queue.acquire({"requests": 1})
+    store.open(queue)
+    store.open(queue)
+    for thread in threads:
+        thread.join(5)
+
+def test_waiting_too_long_times_out_and_leaves_the_queue():
+    queue = AdmissionQueue(GatedStore(), max_depth=10, timeout=0.1)
+    with pytest.raises(QueueTimeoutError):
+        queue.acquire({"requests": 1})
+    assert queue.depth() == 0
+
+def test_cost_above_capacity_waits_for_a_full_bucket():
+    # 10 tokens a second with a one-second burst: capacity 10
+    buckets = TokenBuckets(MemoryBackend(), {"tokens": 600}, burst_seconds=1.0)
+    queue = AdmissionQueue(buckets, max_depth=10, timeout=5)
+    assert queue.acquire({"tokens": 50}) < 0.05
+    # The oversized call emptied the bucket, so the next one waits to refill
+    assert buckets.try_acquire({"tokens": 5}) == pytest.approx(0.5, abs=0.05)
+    assert queue.acquire({"tokens": 5}) >= 0.4
@@ -0,0 +1,48 @@
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import session_store
+import settings
+
+def session_app():
+    import streamlit as st
+    from session_store import end_session, forget_session, persist_session, restore_session
+
+    restore_session()
+    if st.session_state.get("action") == "finish":
+        end_session()
+    elif st.session_state.get("action") == "forget":
+        forget_session()
+    persist_session(page="assessment", background={"goals": "A steady job."})
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SESSION_STORE_ENABLED", True)
+    monkeypatch.setattr(settings, "SESSION_STORE_PATH", str(tmp_path / "sessions.sqlite3"))
+    session_store.get_session_store.cache_clear()
+    yield session_store.get_session_store()
+    session_store.get_session_store.cache_clear()
+
+def start(store):
+    at = AppTest.from_function(session_app).run()
+    token = at.query_params[session_store.TOKEN_PARAM]
+    assert store.load(token) is not None
+    return at, token
+
+def test_completed_journey_is_not_kept(store):
+    at, token = start(store)
+    at.session_state["action"] = "finish"
+    at.run()
+    assert store.load(token) is None
+    assert session_store.TOKEN_PARAM not in at.query_params
+    # Later runs of the same browser session save nothing
+    at.run()
+    assert session_store.TOKEN_PARAM not in at.query_params
+
+def test_forget_deletes_the_saved_session(store):
+    at, token = start(store)
+    at.session_state["action"] = "forget"
+    at.run()
+    assert store.load(token) is None
+    # The cleared browser session starts a new journey under a new token
+    assert at.query_params[session_store.TOKEN_PARAM] != token
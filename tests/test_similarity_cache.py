@@ -0,0 +1,46 @@
+from similarity_cache import SimilarityIndex, personalize
+
+SCORES = {"Concern": 3.17, "Control": 4.0, "Curiosity": 2.5, "Confidence": 3.83}
+
+def make_profile(**overrides):
+    profile = {
+        "county": "South Yorkshire",
+        "postcode_area": "S1",
+        "education": "GCSEs",
+        "current_situation": "Looking for work after a warehouse contract ended.",
+        "interests": ["Construction", "Retail"],
+        "barriers": ["Transport"],
+        "support_systems": "My sister.",
+        "goals": "A steady job.",
+    }
+    profile.update(overrides)
+    return profile
+
+def make_index(tmp_path, analysis):
+    cache = {"source": analysis}
+    index = SimilarityIndex(str(tmp_path / "index.sqlite3"), max_per_bucket=10)
+    index.add(SCORES, make_profile(), "source")
+    return index, cache
+
+def test_one_letter_area_does_not_rewrite_words():
+    analysis = "It's worth asking about Plan B."
+    reused = personalize(analysis, "S", make_profile(postcode_area="B"))
+    assert reused.startswith(analysis)
+    assert reused.endswith("_Location: South Yorkshire, B_")
+
+def test_analysis_naming_its_area_is_not_reused():
+    assert personalize("Try the jobcentre in S1.", "S1", make_profile(postcode_area="S2")) is None
+    assert personalize("Try the jobcentre.", "s1", make_profile(postcode_area="S1")) == "Try the jobcentre."
+
+def test_reused_only_for_the_same_scores_and_answers(tmp_path):
+    index, cache = make_index(tmp_path, "Keep going.")
+    moved = make_profile(postcode_area="S2")
+    assert index.find(SCORES, moved, cache) == "Keep going.\n\n_Location: South Yorkshire, S2_"
+    # Same score level, different score
+    assert index.find(dict(SCORES, Concern=3.5), moved, cache) is None
+    assert index.find(SCORES, dict(moved, goals="A steady job in retail."), cache) is None
+
+def test_free_text_compared_without_case_or_punctuation(tmp_path):
+    index, cache = make_index(tmp_path, "Keep going.")
+    profile = make_profile(goals="a steady job", support_systems="my sister")
+    assert index.find(SCORES, profile, cache) == "Keep going."
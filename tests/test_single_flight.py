@@ -0,0 +1,116 @@
+import threading
+
+import pytest
+
+from single_flight import LeaderInterrupted, SingleFlight
+
+class Interrupted(BaseException):
+    """Stands in for Streamlit's rerun and stop signals"""
+
+def start_leader(flight, key, fn):
+    """Run flight.do(key, fn) on a thread once fn has started"""
+    started = threading.Event()
+    outcome = {}
+
+    def lead():
+        def work():
+            started.set()
+            return fn()
+        try:
+            outcome["result"] = flight.do(key, work)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=lead)
+    thread.start()
+    assert started.wait(5)
+    return thread, outcome
+
+def test_followers_share_the_leaders_result():
+    flight = SingleFlight()
+    release = threading.Event()
+    thread, outcome = start_leader(flight, "k", lambda: release.wait(5) and "result")
+    follower = []
+    waiter = threading.Thread(target=lambda: follower.append(flight.do("k", lambda: "own")))
+    waiter.start()
+    release.set()
+    thread.join(5)
+    waiter.join(5)
+    assert outcome["result"] == "result"
+    assert follower == ["result"]
+    assert flight.stats()["leaders"] == 1
+
+def test_follower_times_out_while_the_leader_runs():
+    flight = SingleFlight()
+    release = threading.Event()
+    thread, _ = start_leader(flight, "k", lambda: release.wait(5))
+    try:
+        with pytest.raises(TimeoutError):
+            flight.do("k", lambda: "own", timeout=0.1)
+        with pytest.raises(TimeoutError):
+            flight.do("k", lambda: "own", timeout=0.1, on_text=lambda text: None)
+    finally:
+        release.set()
+        thread.join(5)
+
+def test_leader_error_reaches_followers():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise ValueError("upstream")
+
+    thread, outcome = start_leader(flight, "k", fail)
+    follower, is_leader = flight.begin("k")
+    assert not is_leader
+    release.set()
+    with pytest.raises(ValueError, match="upstream"):
+        flight.wait(follower, timeout=5)
+    thread.join(5)
+    assert isinstance(outcome["error"], ValueError)
+    # The key is free again for the next caller
+    assert not flight.in_flight("k")
+
+def test_interrupted_leader_hands_over_to_a_follower():
+    flight = SingleFlight()
+    future, leader = flight.begin("k")
+    follower, is_leader = flight.begin("k")
+    assert not is_leader
+    flight.reject("k", future, Interrupted())
+    with pytest.raises(LeaderInterrupted):
+        follower.result(timeout=1)
+    # do() retries as the new leader rather than failing
+    assert flight.do("k", lambda: "retried") == "retried"
+
+def test_follower_replays_published_chunks_then_new_ones():
+    flight = SingleFlight()
+    future, leader = flight.begin("k")
+    flight.publish("k", "first ")
+    flight.publish("k", "second ")
+    received = []
+    more = threading.Event()
+
+    def on_text(text):
+        received.append(text)
+        more.set()
+
+    def lead():
+        assert more.wait(5)
+        flight.publish("k", "third")
+        flight.resolve("k", future, "first second third")
+
+    thread = threading.Thread(target=lead)
+    thread.start()
+    result = flight.wait(future, timeout=5, on_text=on_text)
+    thread.join(5)
+    assert result == "first second third"
+    assert received[0] == "first second "
+    assert "".join(received) == result
+
+def test_publish_after_resolve_is_ignored():
+    flight = SingleFlight()
+    future, _ = flight.begin("k")
+    flight.resolve("k", future, "done")
+    flight.publish("k", "late")
+    assert future.chunks == []
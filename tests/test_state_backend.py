@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from state_backend import MemoryBackend, RedisBackend, SQLiteBackend
+from tools.stub_redis_server import start_stub_server
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryBackend()
+    elif request.param == "sqlite":
+        yield SQLiteBackend(str(tmp_path / "state.sqlite3"))
+    else:
+        server, url = start_stub_server()
+        try:
+            yield RedisBackend(url, "test:")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+def run_concurrently(count, fn):
+    """Call fn(i) from count threads released together; returns the results"""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def worker(i):
+        barrier.wait()
+        results[i] = fn(i)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+    return results
+
+def test_values_expire(backend):
+    backend.set("a", "1", ttl=0.05)
+    backend.set("b", "2")
+    assert backend.get("a") == "1"
+    threading.Event().wait(0.1)
+    assert backend.get("a") is None
+    assert backend.get("b") == "2"
+
+def test_add_sets_for_exactly_one_caller(backend):
+    results = run_concurrently(16, lambda i: backend.add("lease", str(i), ttl=30))
+    assert results.count(True) == 1
+    assert backend.get("lease") == str(results.index(True))
+
+def test_delete_with_a_value_only_removes_the_owners_key(backend):
+    backend.add("lease", "owner", ttl=30)
+    results = run_concurrently(8, lambda i: backend.delete("lease", "owner" if i == 0 else f"other{i}"))
+    assert results == [True] + [False] * 7
+    assert backend.get("lease") is None
+
+def test_delete_prefix(backend):
+    backend.set("flight:a", "1")
+    backend.set("flight:b", "1")
+    backend.set("other", "1")
+    backend.delete_prefix("flight:")
+    assert backend.get("flight:a") is None and backend.get("flight:b") is None
+    assert backend.get("other") == "1"
+
+def test_take_tokens_never_oversubscribes(backend):
+    # Refill is negligible over the test, so exactly the capacity is taken
+    limits = {"requests": (0.001, 10.0), "tokens": (0.001, 1000.0)}
+    results = run_concurrently(24, lambda i: backend.take_tokens(limits, {"requests": 1, "tokens": 10}))
+    assert sum(wait == 0 for wait in results) == 10
+    assert all(wait > 0 for wait in results if wait != 0)
+
+def test_take_tokens_is_all_or_nothing(backend):
+    limits = {"requests": (0.001, 10.0), "tokens": (0.001, 100.0)}
+    assert backend.take_tokens(limits, {"requests": 1, "tokens": 95}) == 0
+    # Requests would fit but tokens would not, so neither bucket is charged
+    assert backend.take_tokens(limits, {"requests": 1, "tokens": 10}) > 0
+    assert backend.take_tokens(limits, {"requests": 9, "tokens": 5}) == 0
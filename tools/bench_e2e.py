@@ -0,0 +1,243 @@
+"""Headless end-to-end benchmark of the whole user journey
+
+Drives ``streamlit_app.py`` with Streamlit's AppTest through welcome ->
+assessment (all 24 answers) -> background form -> recommendations, visiting
+every recommendations section. The AI analysis is served by the local stub
+LLM server, so runs are repeatable and free.
+
+Reports per-page rerun latency percentiles, LLM calls per session, peak RSS
+and cold-start time. Save a run as a baseline and compare branches with:
+
+    python -m tools.bench_e2e --sessions 5 --output bench_main.json
+    python -m tools.bench_e2e --sessions 5 --compare bench_main.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "streamlit_app.py")
+
+PROFILE_TEXT = {
+    "current_situation": "Looking for work after a career break, volunteering two days a week",
+    "goals": "Find a stable role with training and room to progress",
+    "support_systems": "Family, a local community group and a work coach",
+}
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+def summarize(values):
+    """Latency summary in milliseconds"""
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 1),
+        "p95_ms": round(percentile(values, 95) * 1000, 1),
+        "p99_ms": round(percentile(values, 99) * 1000, 1),
+        "max_ms": round(max(values) * 1000, 1),
+        "mean_ms": round(statistics.fmean(values) * 1000, 1),
+    }
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def stub_requests(base_url):
+    with urllib.request.urlopen(base_url + "/stats") as response:
+        return json.load(response)["requests"]
+
+class Journey:
+    """One simulated user session, timing every rerun by page"""
+
+    def __init__(self, seed, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.rng = random.Random(seed)
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.timings = []
+
+    def run(self, widget=None):
+        """Rerun the script (via widget when given) and record the latency
+
+        Each rerun is attributed to the page it rendered.
+        """
+        started = time.perf_counter()
+        if widget is None:
+            self.at.run()
+        else:
+            widget.run()
+        elapsed = time.perf_counter() - started
+        page = self.at.session_state["page"]
+        if self.at.exception:
+            raise RuntimeError(f"{page}: {self.at.exception[0].message}")
+        self.timings.append((page, elapsed))
+        return elapsed
+
+    def button(self, label):
+        for button in self.at.button:
+            if button.label == label:
+                return button
+        raise LookupError(f"No button labelled {label!r}")
+
+    def widget(self, kind, label):
+        for element in getattr(self.at, kind):
+            if element.label.startswith(label):
+                return element
+        raise LookupError(f"No {kind} labelled {label!r}")
+
+    def complete(self):
+        self.run()
+        self.run(self.button("Start Assessment").click())
+
+        # Assessment: move every slider once, then submit the section
+        while not self.at.session_state["show_results"]:
+            for slider in self.at.select_slider:
+                value = self.rng.randint(1, 5)
+                if value != slider.value:
+                    slider.set_value(value)
+                    if not slider.proto.form_id:
+                        self.run()
+            forward = next(b for b in self.at.button if b.label in ("Next Section →", "View Results"))
+            self.run(forward.click())
+        self.run(self.button("Continue to Background Information →").click())
+
+        # Background form: one rerun per field, as a user tabbing through it
+        county = self.rng.choice(["West Yorkshire", "Greater Manchester", "Greater London", "Kent"])
+        postcode = {"West Yorkshire": "LS6", "Greater Manchester": "M14",
+                    "Greater London": "SE15", "Kent": "ME4"}[county]
+        interests = self.widget("multiselect", "Select your areas of career interest").options
+        barriers = self.widget("multiselect", "Select any barriers").options
+        steps = [
+            ("selectbox", "Select your county", county),
+            ("text_input", "Enter your postcode area", postcode),
+            ("selectbox", "What is your highest level of education", "Some college/vocational training"),
+            ("text_area", "Please describe your current work", PROFILE_TEXT["current_situation"]),
+            ("multiselect", "Select your areas of career interest", self.rng.sample(interests[:-1], 2)),
+            ("text_area", "What are your main career goals", PROFILE_TEXT["goals"]),
+            ("multiselect", "Select any barriers", self.rng.sample(barriers[:-1], 2)),
+            ("text_area", "What support systems", PROFILE_TEXT["support_systems"]),
+        ]
+        for kind, label, value in steps:
+            self.run(self.widget(kind, label).set_value(value))
+        self.run(self.button("Save and Continue to Recommendations →").click())
+
+        # Recommendations: the analysis renders first, then every other section
+        for section in ("Career Paths", "Skill Development", "Resources & Support", "AI Analysis"):
+            self.run(self.at.radio(key="recommendations_section").set_value(section))
+
+def run_benchmark(sessions=3, latency=0.2, tokens_per_second=200.0, output_tokens=300,
+                  seed=0, timeout=60, keep_cache=False):
+    """Run the journey for several sessions and return the results dict"""
+    sys.path.insert(0, ROOT)
+    from tools.stub_llm_server import start_stub_server
+
+    server, base_url = start_stub_server(
+        latency=latency, tokens_per_second=tokens_per_second, output_tokens=output_tokens
+    )
+    cache_dir = tempfile.mkdtemp(prefix="bench_cache_")
+    os.environ["ANTHROPIC_BASE_URL"] = base_url
+    os.environ.setdefault("ANTHROPIC_API_KEY", "stub")
+    os.environ["CAREER_CACHE_DIR"] = cache_dir
+
+    try:
+        by_page = {}
+        llm_calls = []
+        session_seconds = []
+        cold_start = None
+        for i in range(sessions):
+            before = stub_requests(base_url)
+            started = time.perf_counter()
+            journey = Journey(seed + i, timeout)
+            journey.complete()
+            session_seconds.append(time.perf_counter() - started)
+            llm_calls.append(stub_requests(base_url) - before)
+            if cold_start is None:
+                # The first rerun of the first session imports the app
+                cold_start = journey.timings[0][1]
+            for page, elapsed in journey.timings[1:] if i == 0 else journey.timings:
+                by_page.setdefault(page, []).append(elapsed)
+    finally:
+        server.shutdown()
+        if not keep_cache:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    return {
+        "config": {
+            "sessions": sessions,
+            "stub_latency": latency,
+            "stub_tokens_per_second": tokens_per_second,
+            "stub_output_tokens": output_tokens,
+            "seed": seed,
+            "python": platform.python_version(),
+        },
+        "cold_start_ms": round(cold_start * 1000, 1),
+        "pages": {page: summarize(values) for page, values in by_page.items()},
+        "llm_calls_per_session": round(statistics.fmean(llm_calls), 2),
+        "session_seconds": round(statistics.fmean(session_seconds), 2),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def flatten(results):
+    """Comparable scalar metrics of a results dict"""
+    metrics = {
+        "cold_start_ms": results["cold_start_ms"],
+        "llm_calls_per_session": results["llm_calls_per_session"],
+        "session_seconds": results["session_seconds"],
+        "peak_rss_mb": results["peak_rss_mb"],
+    }
+    for page, summary in results["pages"].items():
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            metrics[f"{page}.{key}"] = summary[key]
+    return metrics
+
+def compare(baseline, current):
+    """Print a side-by-side table of baseline and current metrics"""
+    old, new = flatten(baseline), flatten(current)
+    print(f"{'metric':<32}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name in sorted(set(old) | set(new)):
+        a, b = old.get(name), new.get(name)
+        change = f"{(b - a) / a * 100:+.1f}%" if a and b is not None else ""
+        print(f"{name:<32}{a if a is not None else '-':>12}{b if b is not None else '-':>12}{change:>10}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=3, help="complete journeys to run")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="stub output token rate")
+    parser.add_argument("--output-tokens", type=int, default=300, help="stub tokens per response")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results JSON here (e.g. a baseline)")
+    parser.add_argument("--compare", help="baseline JSON to compare this run against")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(
+        sessions=args.sessions,
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        seed=args.seed,
+    )
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Count server round trips for one completed CAAS assessment
+
+Drives the assessment page headlessly with Streamlit's AppTest, answering
+every question the way a user would: moving each slider once, then pressing
+the section's forward button. Sliders outside a form cost a rerun each;
+sliders inside a form cost nothing until the form is submitted.
+
+    python -m tools.count_reruns --seed 1
+
+AppTest always executes the whole script, so ``script_runs`` here is an
+upper bound. On a live server, interactions inside a fragment re-execute
+only that fragment.
+"""
+import argparse
+import json
+import os
+import random
+
+from streamlit.testing.v1 import AppTest
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "streamlit_app.py")
+
+FORWARD_LABELS = ("Next Section →", "View Results")
+
+def find_button(at, labels):
+    """First button (plain or form submit) whose label is in labels"""
+    for button in at.button:
+        if button.label in labels:
+            return button
+    return None
+
+def complete_assessment(seed=0, max_steps=50):
+    """Answer every section once and return round-trip counts"""
+    rng = random.Random(seed)
+    at = AppTest.from_file(APP_PATH, default_timeout=30)
+    at.session_state["page"] = "assessment"
+    at.run()
+
+    interactions = 0
+    slider_reruns = 0
+    for _ in range(max_steps):
+        if at.session_state["show_results"]:
+            break
+        for slider in at.select_slider:
+            value = rng.randint(1, 5)
+            if value == slider.value:
+                continue
+            slider.set_value(value)
+            if not slider.proto.form_id:
+                at.run()
+                interactions += 1
+                slider_reruns += 1
+        button = find_button(at, FORWARD_LABELS)
+        if button is None:
+            raise RuntimeError("No forward button on the assessment page")
+        button.click()
+        at.run()
+        interactions += 1
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+    else:
+        raise RuntimeError("Assessment did not reach the results page")
+
+    return {
+        "interactions": interactions,
+        "slider_reruns": slider_reruns,
+        # Includes the initial page load and any st.rerun() follow-ups
+        "script_runs": at.session_state["script_runs"],
+        "answered": len(at.session_state["responses"]),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=0, help="seed for the simulated answers")
+    args = parser.parse_args(argv)
+    print(json.dumps(complete_assessment(args.seed), indent=2))
+
+if __name__ == "__main__":
+    main()
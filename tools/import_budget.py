@@ -0,0 +1,87 @@
+"""Check the cold import time of the app against a tracked budget
+
+Imports the app module in fresh interpreters with ``python -X importtime``,
+takes the median cumulative time over several runs and compares it with
+``tools/import_budget.json``. Modules listed under ``deferred`` must not be
+imported at all on a cold start. Exits non-zero when either check fails.
+
+    python -m tools.import_budget
+    python -m tools.import_budget --runs 9 --top 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "import_budget.json")
+
+def measure_imports(module):
+    """Import module in a new interpreter; returns {name: (self_us, cumulative_us)}"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        try:
+            timings[name.strip()] = (int(self_us), int(cumulative_us))
+        except ValueError:
+            continue  # the header row
+    return timings
+
+def check_budget(budget, runs=5):
+    """Measure the budgeted module and return a report dict"""
+    module = budget["module"]
+    samples = [measure_imports(module) for _ in range(runs)]
+    totals = [sample[module][1] / 1000 for sample in samples]
+    median_ms = statistics.median(totals)
+
+    last = samples[-1]
+    deferred = [name for name in budget.get("deferred", []) if name in last]
+    slowest = sorted(last.items(), key=lambda item: item[1][0], reverse=True)
+
+    return {
+        "module": module,
+        "median_ms": round(median_ms, 1),
+        "budget_ms": budget["budget_ms"],
+        "runs": [round(t, 1) for t in totals],
+        "deferred_imported": deferred,
+        "slowest_self_ms": [(name, round(self_us / 1000, 1)) for name, (self_us, _) in slowest],
+        "ok": median_ms <= budget["budget_ms"] and not deferred,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to sample")
+    parser.add_argument("--budget-ms", type=float, help="override the tracked budget")
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to list")
+    args = parser.parse_args(argv)
+
+    with open(BUDGET_PATH, encoding="utf-8") as f:
+        budget = json.load(f)
+    if args.budget_ms is not None:
+        budget["budget_ms"] = args.budget_ms
+
+    report = check_budget(budget, args.runs)
+    print(f"{report['module']}: median {report['median_ms']} ms over {args.runs} runs "
+          f"(budget {report['budget_ms']} ms) {report['runs']}")
+    print("Slowest modules by self time:")
+    for name, self_ms in report["slowest_self_ms"][:args.top]:
+        print(f"  {self_ms:8.1f} ms  {name}")
+    if report["deferred_imported"]:
+        print(f"FAIL: imported at startup but should be deferred: {', '.join(report['deferred_imported'])}")
+    if report["median_ms"] > report["budget_ms"]:
+        print("FAIL: cold import exceeds the budget")
+    return 0 if report["ok"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
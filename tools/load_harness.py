@@ -0,0 +1,451 @@
+"""Concurrent-session load harness against a real Streamlit server
+
+Starts ``streamlit run streamlit_app.py`` in a subprocess for each
+configuration, with the AI analysis pointed at the local stub LLM server.
+It then ramps through concurrency levels. At each level N simulated users
+connect over Streamlit's websocket and complete the full journey
+concurrently: assessment with random answers, a random background profile,
+then every recommendations section.
+
+Each level records:
+- throughput (reruns/s and journeys/s)
+- p50/p95/p99 rerun latency per page
+- error rate
+- LLM requests in flight at the stub (upstream concurrency; the app's own
+  admission queue is not visible here)
+
+Together the levels form a saturation curve for each configuration.
+
+    python -m tools.load_harness --levels 1,10,50,100 --configs baseline,no-cache
+    python -m tools.load_harness --levels 1,25 --think-time 1.0 --output load.json
+
+The client speaks Streamlit's websocket protocol directly, using the
+protobuf messages of the installed Streamlit version, and needs the
+``websockets`` package (``pip install -r requirements-dev.txt``).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tools.bench_e2e import PROFILE_TEXT, percentile  # noqa: E402
+
+# Environment overrides for each configuration under test
+CONFIGS = {
+    "baseline": {},
+    "no-cache": {"ANALYSIS_CACHE_ENABLED": "false"},
+    "no-streaming": {"ANALYSIS_STREAMING": "false"},
+    "no-speculative": {"SPECULATIVE_ANALYSIS_ENABLED": "false"},
+}
+
+PAGE_TITLES = {
+    "Welcome to Your Career Journey": "welcome",
+    "Career Adapt-Abilities Scale (CAAS) Assessment": "assessment",
+    "Background Information": "background",
+    "Your Personalized Career Guidance": "recommendations",
+}
+
+LOCATIONS = [
+    ("West Yorkshire", "LS6"), ("Greater Manchester", "M14"), ("Greater London", "SE15"),
+    ("Kent", "ME4"), ("Merseyside", "L8"), ("West Midlands", "B12"),
+]
+
+class ScriptError(Exception):
+    """The app raised an exception or a rerun did not finish in time"""
+
+class Widget:
+    """A widget rendered by the server, as the harness sees it"""
+
+    def __init__(self, kind, proto, fragment_id):
+        self.kind = kind
+        self.proto = proto
+        self.fragment_id = fragment_id
+
+    @property
+    def id(self):
+        return self.proto.id
+
+    @property
+    def label(self):
+        return self.proto.label
+
+    @property
+    def options(self):
+        return list(self.proto.options)
+
+class AppSession:
+    """One browser-like websocket session with the Streamlit server
+
+    Keeps the rendered elements by delta path and the value of every widget
+    the simulated user has touched, and sends them back on each rerun the
+    way the frontend does. Widget values are encoded as the frontend encodes
+    them: formatted option strings for choice widgets, strings for text and
+    a trigger for buttons.
+    """
+
+    def __init__(self, url, timeout):
+        self.url = url
+        self.timeout = timeout
+        self.ws = None
+        self.elements = {}
+        self.values = {}
+
+    async def __aenter__(self):
+        import websockets
+
+        self.ws = await websockets.connect(
+            self.url, subprotocols=["streamlit"], max_size=None, open_timeout=self.timeout
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.ws.close()
+
+    async def rerun(self, trigger=None):
+        """Send the widget states and wait for the run to finish
+
+        ``trigger`` is the widget that caused the rerun; when it lives in a
+        fragment, only that fragment reruns, as in the browser.
+        """
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.page_script_hash = ""
+        present = {widget.id for widget in self.widgets()}
+        for widget_id, state in self.values.items():
+            if widget_id in present:
+                msg.rerun_script.widget_states.widgets.append(state)
+        if trigger is not None:
+            if trigger.kind == "button":
+                state = WidgetState(id=trigger.id, trigger_value=True)
+                msg.rerun_script.widget_states.widgets.append(state)
+            if trigger.fragment_id:
+                msg.rerun_script.fragment_id = trigger.fragment_id
+
+        started = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        deadline = started + self.timeout
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise ScriptError("rerun timed out")
+            try:
+                raw = await asyncio.wait_for(self.ws.recv(), remaining)
+            except asyncio.TimeoutError:
+                raise ScriptError("rerun timed out") from None
+            fwd = ForwardMsg()
+            fwd.ParseFromString(raw)
+            kind = fwd.WhichOneof("type")
+            if kind == "new_session" and not fwd.new_session.fragment_ids_this_run:
+                # A full script run starts from an empty page; a fragment
+                # run only replaces the fragment's own elements
+                self.elements = {}
+            elif kind == "delta":
+                self._apply(fwd)
+            elif kind == "script_finished":
+                status = fwd.script_finished
+                if status == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise ScriptError("script failed to compile")
+                if status != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    break
+        elapsed = time.perf_counter() - started
+
+        for kind, proto, _ in self.elements.values():
+            if kind == "exception":
+                raise ScriptError(proto.message)
+        return elapsed
+
+    def _apply(self, fwd):
+        delta = fwd.delta
+        if delta.WhichOneof("type") != "new_element":
+            return
+        element = delta.new_element
+        kind = element.WhichOneof("type")
+        self.elements[tuple(fwd.metadata.delta_path)] = (kind, getattr(element, kind), delta.fragment_id)
+
+    def widgets(self, kind=None):
+        for path in sorted(self.elements):
+            element_kind, proto, fragment_id = self.elements[path]
+            if kind is not None and element_kind != kind:
+                continue
+            if "id" in proto.DESCRIPTOR.fields_by_name and proto.id:
+                yield Widget(element_kind, proto, fragment_id)
+
+    @property
+    def page(self):
+        for kind, proto, _ in self.elements.values():
+            if kind == "heading" and proto.body in PAGE_TITLES:
+                return PAGE_TITLES[proto.body]
+        return "unknown"
+
+    def button(self, *labels):
+        for widget in self.widgets("button"):
+            if widget.label in labels:
+                return widget
+        raise ScriptError(f"no button labelled {labels[0]!r} on the {self.page} page")
+
+    def widget(self, kind, label):
+        for widget in self.widgets(kind):
+            if widget.label.startswith(label):
+                return widget
+        raise ScriptError(f"no {kind} labelled {label!r} on the {self.page} page")
+
+    def set_value(self, widget, value):
+        """Record a user's change to a widget, encoded as the frontend would"""
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        state = WidgetState(id=widget.id)
+        if widget.kind == "multiselect":
+            state.string_array_value.data[:] = [str(v) for v in value]
+        elif widget.kind == "slider" and widget.proto.options:
+            # st.select_slider renders as a slider with string options
+            state.string_array_value.data[:] = [str(value)]
+        else:
+            state.string_value = str(value)
+        self.values[widget.id] = state
+
+class LevelStats:
+    """Latencies and outcomes collected during one concurrency level"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.journeys = 0
+        self.errors = []
+        self.reruns = 0
+
+    def record(self, page, elapsed):
+        self.latencies.setdefault(page, []).append(elapsed)
+        self.reruns += 1
+
+async def think(rng, think_time):
+    if think_time > 0:
+        await asyncio.sleep(rng.uniform(0.5, 1.5) * think_time)
+
+async def journey(url, rng, stats, think_time, timeout):
+    """Complete the app once as a single simulated user"""
+    async with AppSession(url, timeout) as session:
+        async def act(trigger=None):
+            elapsed = await session.rerun(trigger)
+            stats.record(session.page, elapsed)
+            await think(rng, think_time)
+
+        await act()
+        await act(session.button("Start Assessment"))
+
+        for _ in CAAS_SECTIONS:
+            for slider in list(session.widgets("slider")):
+                session.set_value(slider, rng.randint(1, 5))
+            await act(session.button("Next Section →", "View Results"))
+        await act(session.button("Continue to Background Information →"))
+
+        county, postcode = rng.choice(LOCATIONS)
+        interests = session.widget("multiselect", "Select your areas of career interest").options
+        barriers = session.widget("multiselect", "Select any barriers").options
+        steps = [
+            ("selectbox", "Select your county", county),
+            ("text_input", "Enter your postcode area", postcode),
+            ("selectbox", "What is your highest level of education", rng.choice(EDUCATION_CHOICES)),
+            ("text_area", "Please describe your current work", PROFILE_TEXT["current_situation"]),
+            ("multiselect", "Select your areas of career interest", rng.sample(interests[:-1], rng.randint(1, 3))),
+            ("text_area", "What are your main career goals", PROFILE_TEXT["goals"]),
+            ("multiselect", "Select any barriers", rng.sample(barriers[:-1], rng.randint(0, 3))),
+            ("text_area", "What support systems", PROFILE_TEXT["support_systems"]),
+        ]
+        for kind, label, value in steps:
+            widget = session.widget(kind, label)
+            session.set_value(widget, value)
+            await act(widget)
+        await act(session.button("Save and Continue to Recommendations →"))
+
+        for section in ("Career Paths", "Skill Development", "Resources & Support", "AI Analysis"):
+            radio = session.widget("radio", "Section")
+            session.set_value(radio, section)
+            await act(radio)
+    stats.journeys += 1
+
+CAAS_SECTIONS = ("Concern", "Control", "Curiosity", "Confidence")
+EDUCATION_CHOICES = (
+    "Some high school", "High school diploma/GED", "Some college/vocational training", "College degree",
+)
+
+def stub_stats(base_url):
+    with urllib.request.urlopen(base_url + "/stats") as response:
+        return json.load(response)
+
+async def sample_in_flight(base_url, samples, interval=0.1):
+    """Record the stub's in-flight request count until cancelled"""
+    while True:
+        samples.append(stub_stats(base_url)["in_flight"])
+        await asyncio.sleep(interval)
+
+async def run_level(url, stub_url, concurrency, journeys_per_user, think_time, timeout, seed):
+    """Run concurrency users at once and summarise the level"""
+    stats = LevelStats()
+    in_flight = []
+    sampler = asyncio.create_task(sample_in_flight(stub_url, in_flight))
+    before = stub_stats(stub_url)
+
+    async def user(index):
+        rng = random.Random(seed * 100_000 + concurrency * 1000 + index)
+        # Stagger arrivals so users don't all connect in the same instant
+        await asyncio.sleep(rng.uniform(0, max(think_time, 0.1)))
+        for _ in range(journeys_per_user):
+            try:
+                await journey(url, rng, stats, think_time, timeout)
+            except Exception as e:
+                stats.errors.append(f"{type(e).__name__}: {e}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(i) for i in range(concurrency)))
+    duration = time.perf_counter() - started
+    sampler.cancel()
+    after = stub_stats(stub_url)
+
+    all_latencies = [t for values in stats.latencies.values() for t in values]
+    attempts = concurrency * journeys_per_user
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(duration, 2),
+        "journeys": stats.journeys,
+        "journeys_per_s": round(stats.journeys / duration, 3),
+        "reruns_per_s": round(stats.reruns / duration, 2),
+        "error_rate": round(len(stats.errors) / attempts, 3),
+        "errors": sorted(set(stats.errors))[:5],
+        "latency": latency_summary(all_latencies),
+        "pages": {page: latency_summary(values) for page, values in sorted(stats.latencies.items())},
+        "llm_requests": after["requests"] - before["requests"],
+        "llm_in_flight": {
+            "mean": round(statistics.fmean(in_flight), 2) if in_flight else 0,
+            "max": max(in_flight, default=0),
+        },
+    }
+
+def latency_summary(values):
+    if not values:
+        return {}
+    return {
+        "p50_ms": round(percentile(values, 50) * 1000, 1),
+        "p95_ms": round(percentile(values, 95) * 1000, 1),
+        "p99_ms": round(percentile(values, 99) * 1000, 1),
+    }
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_app_server(port, env, startup_timeout=30):
+    """Launch streamlit run for the app and wait until it is healthy"""
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "streamlit", "run", os.path.join(ROOT, "streamlit_app.py"),
+            "--server.headless", "true",
+            "--server.port", str(port),
+            "--server.address", "127.0.0.1",
+            "--browser.gatherUsageStats", "false",
+        ],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("streamlit exited during startup")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("streamlit did not become healthy in time")
+
+def run_config(name, levels, stub_url, journeys_per_user, think_time, timeout, seed):
+    """Ramp one configuration through every concurrency level"""
+    cache_dir = tempfile.mkdtemp(prefix="load_cache_")
+    env = dict(os.environ)
+    env.update(CONFIGS[name])
+    env.update({
+        "ANTHROPIC_BASE_URL": stub_url,
+        "ANTHROPIC_API_KEY": env.get("ANTHROPIC_API_KEY", "stub"),
+        "CAREER_CACHE_DIR": cache_dir,
+    })
+    port = free_port()
+    process = start_app_server(port, env)
+    url = f"ws://127.0.0.1:{port}/_stcore/stream"
+    curve = []
+    try:
+        for concurrency in levels:
+            result = asyncio.run(run_level(
+                url, stub_url, concurrency, journeys_per_user, think_time, timeout, seed
+            ))
+            curve.append(result)
+            print(
+                f"[{name}] users={concurrency:<4} p50={result['latency'].get('p50_ms', '-')}ms "
+                f"p95={result['latency'].get('p95_ms', '-')}ms p99={result['latency'].get('p99_ms', '-')}ms "
+                f"reruns/s={result['reruns_per_s']} errors={result['error_rate']:.1%} "
+                f"llm_in_flight_max={result['llm_in_flight']['max']}",
+                flush=True,
+            )
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return curve
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--levels", default="1,5,10,25,50", help="comma-separated concurrent users per step")
+    parser.add_argument("--configs", default="baseline", help=f"comma-separated from: {', '.join(CONFIGS)}")
+    parser.add_argument("--journeys", type=int, default=1, help="journeys per user at each level")
+    parser.add_argument("--think-time", type=float, default=0.5, help="mean seconds between user actions")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds before a rerun counts as failed")
+    parser.add_argument("--latency", type=float, default=0.5, help="stub seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0, help="stub output token rate")
+    parser.add_argument("--output-tokens", type=int, default=300, help="stub tokens per response")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the saturation curves as JSON here")
+    args = parser.parse_args(argv)
+
+    from tools.stub_llm_server import start_stub_server
+
+    levels = [int(level) for level in args.levels.split(",") if level.strip()]
+    names = [name.strip() for name in args.configs.split(",") if name.strip()]
+    unknown = [name for name in names if name not in CONFIGS]
+    if unknown:
+        parser.error(f"unknown config(s): {', '.join(unknown)}")
+
+    stub, stub_url = start_stub_server(
+        latency=args.latency, tokens_per_second=args.tokens_per_second, output_tokens=args.output_tokens
+    )
+    results = {"levels": levels, "configs": {}}
+    try:
+        for name in names:
+            results["configs"][name] = run_config(
+                name, levels, stub_url, args.journeys, args.think_time, args.timeout, args.seed
+            )
+    finally:
+        stub.shutdown()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Per-session memory of the app's session state
+
+Completes the whole journey (see ``tools.bench_e2e``) for many simulated
+sessions against the stub LLM, keeps every session's state alive as a
+server would, and reports what that state costs per session:
+
+    python -m tools.session_memory --levels 1,100,1000
+
+Sizes are deep ``sys.getsizeof`` totals of each session's Streamlit
+SessionState: user keys, widget values and widget metadata. Objects
+reachable from the app's modules (question tables, catalogs, caches) are
+shared by every session and counted once under ``shared_bytes``, and an
+object referenced by several sessions is counted only for the first, so
+per-session bytes fall as the level grows when state is referenced rather
+than copied. The largest keys of the first session show where bytes go.
+"""
+import argparse
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Referents not owned by any one session
+SKIP_TYPES = (
+    type,
+    types.ModuleType,
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.MethodType,
+    types.CodeType,
+    type(threading.Lock()),
+    type(threading.RLock()),
+)
+
+def deep_size(root, seen):
+    """Bytes of root and everything it references that is not yet in seen"""
+    size = 0
+    stack = [root]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, SKIP_TYPES):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        stack.extend(gc.get_referents(obj))
+    return size
+
+def app_modules():
+    """The app's own modules, as loaded by the journeys"""
+    return [
+        module for name, module in sys.modules.items()
+        if os.path.dirname(os.path.abspath(getattr(module, "__file__", None) or "/")) == ROOT
+    ]
+
+def key_sizes(state, seen):
+    """Deep size of each user key and keyed widget value, largest first"""
+    sizes = {key: deep_size(value, set(seen)) for key, value in state.filtered_state.items()}
+    return dict(sorted(sizes.items(), key=lambda item: item[1], reverse=True))
+
+def measure(levels, seed=0, timeout=60):
+    """Run max(levels) journeys and return per-level session bytes"""
+    sys.path.insert(0, ROOT)
+    from tools.bench_e2e import Journey
+    from tools.stub_llm_server import start_stub_server
+
+    server, base_url = start_stub_server(latency=0.0, tokens_per_second=0.0, output_tokens=300)
+    cache_dir = tempfile.mkdtemp(prefix="session_memory_")
+    os.environ["ANTHROPIC_BASE_URL"] = base_url
+    os.environ.setdefault("ANTHROPIC_API_KEY", "stub")
+    os.environ["CAREER_CACHE_DIR"] = cache_dir
+
+    states = []
+    started = time.perf_counter()
+    try:
+        for i in range(max(levels)):
+            journey = Journey(seed + i, timeout)
+            journey.complete()
+            # Keep only the session state; the rest of AppTest is test scaffolding
+            states.append(journey.at.session_state._state._state)
+    finally:
+        server.shutdown()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    gc.collect()
+    shared = set()
+    shared_bytes = sum(deep_size(vars(module), shared) for module in app_modules())
+    first_keys = key_sizes(states[0], shared)
+
+    results = []
+    seen = set(shared)
+    total = 0
+    counted = 0
+    for level in sorted(levels):
+        total += sum(deep_size(state, seen) for state in states[counted:level])
+        counted = level
+        results.append({"sessions": level, "bytes_per_session": round(total / level), "total_bytes": total})
+
+    return {
+        "levels": results,
+        "shared_bytes": shared_bytes,
+        "first_session_keys": first_keys,
+        "journey_seconds": round((time.perf_counter() - started) / max(levels), 3),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--levels", default="1,100,1000", help="comma-separated session counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results JSON here")
+    args = parser.parse_args(argv)
+
+    results = measure([int(level) for level in args.levels.split(",")], seed=args.seed)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
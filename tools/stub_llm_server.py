@@ -0,0 +1,348 @@
+"""Local stand-in for the Anthropic Messages API
+
+Serves ``POST /v1/messages`` (plain and streaming) with configurable latency
+and token rate so the app, the batch engine and the benchmarks can run
+without network access or API spend. ``GET /stats`` reports request counts
+and concurrency, and ``POST /stats/reset`` clears them.
+
+Run it with:
+
+    python -m tools.stub_llm_server --port 8787 --latency 0.5 --tokens-per-second 80
+
+and point the app at it with ``ANTHROPIC_BASE_URL=http://127.0.0.1:8787``.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SECTION_HEADERS = [
+    "### Strengths and Development Areas",
+    "### Career Recommendations",
+    "### Strategies for Overcoming Barriers",
+    "### Immediate Next Steps",
+    "### Long-Term Development",
+]
+
+FILLER = (
+    "Build on your existing strengths by setting one small, concrete goal each week "
+    "and asking your support network to help you review progress regularly."
+).split()
+
+class StubConfig:
+    """Behaviour knobs shared by all request handlers"""
+
+    def __init__(self, latency=0.5, tokens_per_second=80.0, output_tokens=300,
+                 error_rate=0.0, error_status=529, requests_per_minute=0, model_latency=None):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests_per_minute = requests_per_minute
+        # Per-model overrides of latency, to exercise routing and hedging
+        self.model_latency = dict(model_latency or {})
+
+    def latency_for(self, model):
+        return self.model_latency.get(model, self.latency)
+
+class StubStats:
+    """Thread-safe request counters exposed on /stats"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.streaming_requests = 0
+            self.errors = 0
+            self.in_flight = 0
+            self.max_in_flight = 0
+            self.input_tokens = 0
+            self.cache_read_input_tokens = 0
+            self.cache_creation_input_tokens = 0
+            self.cached_prefixes = set()
+            self.output_tokens = 0
+            self.models = {}
+            self.rate_limited = 0
+            self.recent = []
+
+    def begin(self, body):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            if body.get("stream"):
+                self.streaming_requests += 1
+            model = body.get("model", "unknown")
+            self.models[model] = self.models.get(model, 0) + 1
+
+    def over_rate_limit(self, requests_per_minute):
+        """Count a request against a sliding one-minute window"""
+        with self._lock:
+            now = time.monotonic()
+            self.recent = [t for t in self.recent if now - t < 60]
+            if len(self.recent) >= requests_per_minute:
+                self.rate_limited += 1
+                return True
+            self.recent.append(now)
+            return False
+
+    def cache_prefix(self, prefix_hash):
+        """Remember a cacheable prefix; returns True if it was already cached"""
+        with self._lock:
+            hit = prefix_hash in self.cached_prefixes
+            self.cached_prefixes.add(prefix_hash)
+            return hit
+
+    def end(self, usage=None, output_tokens=0, error=False):
+        usage = usage or {}
+        with self._lock:
+            self.in_flight -= 1
+            self.input_tokens += usage.get("input_tokens", 0)
+            self.cache_read_input_tokens += usage.get("cache_read_input_tokens", 0)
+            self.cache_creation_input_tokens += usage.get("cache_creation_input_tokens", 0)
+            self.output_tokens += output_tokens
+            if error:
+                self.errors += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "streaming_requests": self.streaming_requests,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "input_tokens": self.input_tokens,
+                "cache_read_input_tokens": self.cache_read_input_tokens,
+                "cache_creation_input_tokens": self.cache_creation_input_tokens,
+                "output_tokens": self.output_tokens,
+                "models": dict(self.models),
+                "rate_limited": self.rate_limited,
+            }
+
+def estimate_tokens(value):
+    """Rough token count of a JSON-serialisable value: four characters per token"""
+    return len(json.dumps(value)) // 4
+
+def input_usage(body, stats):
+    """Input token usage, simulating prompt caching of the system prefix
+
+    System blocks up to the last one marked with cache_control form the
+    cacheable prefix: the first request writes it, later ones read it.
+    """
+    system = body.get("system", "")
+    total = max(1, estimate_tokens(system) + estimate_tokens(body.get("messages", [])))
+    usage = {"input_tokens": total, "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0}
+    if isinstance(system, list):
+        marked = [i for i, block in enumerate(system) if block.get("cache_control")]
+        if marked:
+            prefix = system[:marked[-1] + 1]
+            prefix_tokens = estimate_tokens(prefix)
+            key = "cache_read_input_tokens" if stats.cache_prefix(json.dumps(prefix, sort_keys=True)) \
+                else "cache_creation_input_tokens"
+            usage[key] = prefix_tokens
+            usage["input_tokens"] = max(0, total - prefix_tokens)
+    return usage
+
+def is_section_request(body):
+    """True when the prompt asks for one section of the analysis"""
+    messages = body.get("messages") or [{}]
+    content = messages[-1].get("content", "")
+    return isinstance(content, str) and content.startswith("Section: ")
+
+def generate_tokens(count, headers=True):
+    """Produce markdown text chunks shaped like a sectioned analysis
+
+    Without headers the text is a single section body, as requested by the
+    app's per-section prompts.
+    """
+    if not headers:
+        return [FILLER[i % len(FILLER)] + " " for i in range(count)]
+    tokens = []
+    per_section = max(1, count // len(SECTION_HEADERS))
+    for header in SECTION_HEADERS:
+        tokens.append(("\n\n" if tokens else "") + header + "\n\n")
+        for i in range(per_section - 1):
+            tokens.append(FILLER[i % len(FILLER)] + " ")
+        if len(tokens) >= count:
+            break
+    return tokens[:count]
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = StubConfig()
+    stats = StubStats()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            self._send_json(200, self.stats.snapshot())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length) if length else b"{}"
+        if self.path.rstrip("/") == "/stats/reset":
+            self.stats.reset()
+            self._send_json(200, {"ok": True})
+            return
+        if not self.path.split("?")[0].rstrip("/").endswith("/v1/messages"):
+            self._send_json(404, {"error": "not found"})
+            return
+
+        body = json.loads(raw or b"{}")
+        self.stats.begin(body)
+        config = self.config
+
+        if config.requests_per_minute and self.stats.over_rate_limit(config.requests_per_minute):
+            self.stats.end(error=True)
+            self._send_json(429, {
+                "type": "error",
+                "error": {"type": "rate_limit_error", "message": "Stub rate limit exceeded"},
+            })
+            return
+
+        if config.error_rate and random.random() < config.error_rate:
+            time.sleep(config.latency_for(body.get("model")))
+            self.stats.end(error=True)
+            self._send_json(config.error_status, {
+                "type": "error",
+                "error": {"type": "overloaded_error", "message": "Stub overloaded"},
+            })
+            return
+
+        usage = input_usage(body, self.stats)
+        output_tokens = min(config.output_tokens, int(body.get("max_tokens", config.output_tokens)))
+        tokens = generate_tokens(output_tokens, headers=not is_section_request(body))
+        try:
+            if body.get("stream"):
+                self._stream(body, tokens, usage)
+            else:
+                self._respond(body, tokens, usage)
+        except (BrokenPipeError, ConnectionResetError):
+            self.stats.end(usage, len(tokens), error=True)
+            return
+        self.stats.end(usage, len(tokens))
+
+    def _message(self, body, text, usage, output_tokens):
+        return {
+            "id": f"msg_stub_{uuid.uuid4().hex[:16]}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", "stub"),
+            "content": [{"type": "text", "text": text}] if text is not None else [],
+            "stop_reason": "end_turn" if text is not None else None,
+            "stop_sequence": None,
+            "usage": dict(usage, output_tokens=output_tokens),
+        }
+
+    def _respond(self, body, tokens, usage):
+        rate = self.config.tokens_per_second
+        time.sleep(self.config.latency_for(body.get("model")) + (len(tokens) / rate if rate > 0 else 0))
+        self._send_json(200, self._message(body, "".join(tokens), usage, len(tokens)))
+
+    def _event(self, name, payload):
+        data = f"event: {name}\ndata: {json.dumps(payload)}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _stream(self, body, tokens, usage):
+        rate = self.config.tokens_per_second
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        time.sleep(self.config.latency_for(body.get("model")))
+        start = self._message(body, None, usage, 0)
+        self._event("message_start", {"type": "message_start", "message": start})
+        self._event("content_block_start", {
+            "type": "content_block_start",
+            "index": 0,
+            "content_block": {"type": "text", "text": ""},
+        })
+        for token in tokens:
+            if rate > 0:
+                time.sleep(1.0 / rate)
+            self._event("content_block_delta", {
+                "type": "content_block_delta",
+                "index": 0,
+                "delta": {"type": "text_delta", "text": token},
+            })
+        self._event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        self._event("message_delta", {
+            "type": "message_delta",
+            "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+            "usage": {"output_tokens": len(tokens)},
+        })
+        self._event("message_stop", {"type": "message_stop"})
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+def start_stub_server(host="127.0.0.1", port=0, **config):
+    """Start the stub in a daemon thread and return (server, base_url)"""
+    handler = type("ConfiguredStubHandler", (StubHandler,), {
+        "config": StubConfig(**config),
+        "stats": StubStats(),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True, name="stub-llm-server")
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0, help="output token rate (0 = instant)")
+    parser.add_argument("--output-tokens", type=int, default=300, help="tokens per response, capped by max_tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with an error")
+    parser.add_argument("--requests-per-minute", type=int, default=0, help="answer 429 above this rate (0 = unlimited)")
+    parser.add_argument("--model-latency", action="append", default=[], metavar="MODEL=SECONDS",
+                        help="latency for one model, overriding --latency (repeatable)")
+    parser.add_argument("--error-status", type=int, default=529, help="HTTP status used for injected errors")
+    args = parser.parse_args(argv)
+
+    server, base_url = start_stub_server(
+        args.host,
+        args.port,
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        requests_per_minute=args.requests_per_minute,
+        model_latency={
+            model: float(seconds)
+            for model, _, seconds in (item.partition("=") for item in args.model_latency)
+        },
+    )
+    print(f"Stub Anthropic API listening on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
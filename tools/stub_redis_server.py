@@ -0,0 +1,242 @@
+"""Local stand-in for a Redis server
+
+Speaks enough of the Redis protocol (RESP2) for ``STATE_BACKEND=redis``:
+PING, AUTH, SELECT, GET, SET (EX/PX/NX/XX), DEL, MGET, EXISTS, SCAN,
+DBSIZE, FLUSHDB and WATCH/MULTI/EXEC transactions. Data lives in memory in
+one keyspace, so several app processes or replicas on one machine can share
+caches, single-flight leases and rate limits without installing Redis.
+
+Run it with:
+
+    python -m tools.stub_redis_server --port 6390
+
+and point the app at it with ``STATE_BACKEND=redis STATE_REDIS_URL=redis://127.0.0.1:6390/0``.
+"""
+import argparse
+import fnmatch
+import socketserver
+import threading
+import time
+
+class StubStore:
+    """Keyspace shared by every connection, with per-key versions for WATCH"""
+
+    def __init__(self):
+        self.values = {}
+        self.versions = {}
+        self.lock = threading.Lock()
+        self.commands = 0
+
+    def live(self, key):
+        item = self.values.get(key)
+        if item is not None and item[1] is not None and item[1] <= time.time():
+            self.delete(key)
+            return None
+        return item
+
+    def touch(self, key):
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def delete(self, key):
+        if self.values.pop(key, None) is None:
+            return False
+        self.touch(key)
+        return True
+
+class CommandError(Exception):
+    pass
+
+class StubRedisHandler(socketserver.StreamRequestHandler):
+    store = None
+    password = None
+
+    def setup(self):
+        super().setup()
+        self.authenticated = not self.password
+        self.watched = None
+        self.queued = None
+
+    def handle(self):
+        while True:
+            try:
+                args = self._read_command()
+            except (ConnectionError, ValueError):
+                return
+            if args is None:
+                return
+            try:
+                reply = self._dispatch(args)
+            except CommandError as e:
+                reply = e
+            self.wfile.write(self._encode(reply))
+            self.wfile.flush()
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            # Inline command, as typed into telnet
+            return line.decode("utf-8").split()
+        args = []
+        for _ in range(int(line[1:])):
+            size = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(size + 2)[:-2].decode("utf-8"))
+        return args
+
+    def _encode(self, reply):
+        if isinstance(reply, CommandError):
+            return f"-ERR {reply}\r\n".encode("utf-8")
+        if reply is True:
+            return b"+OK\r\n"
+        if isinstance(reply, int):
+            return b":%d\r\n" % reply
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, list):
+            return b"*%d\r\n" % len(reply) + b"".join(self._encode(item) for item in reply)
+        if isinstance(reply, bytes):
+            # Simple status string
+            return b"+" + reply + b"\r\n"
+        data = reply.encode("utf-8")
+        return b"$%d\r\n%s\r\n" % (len(data), data)
+
+    def _dispatch(self, args):
+        if not args:
+            raise CommandError("empty command")
+        name = args[0].upper()
+        if name == "AUTH":
+            if args[-1] != self.password:
+                raise CommandError("invalid password")
+            self.authenticated = True
+            return True
+        if not self.authenticated:
+            raise CommandError("NOAUTH Authentication required")
+        if self.queued is not None and name not in ("EXEC", "DISCARD", "MULTI", "WATCH"):
+            self.queued.append(args)
+            return b"QUEUED"
+        handler = getattr(self, f"cmd_{name.lower()}", None)
+        if handler is None:
+            raise CommandError(f"unknown command '{args[0]}'")
+        with self.store.lock:
+            self.store.commands += 1
+            return handler(*args[1:])
+
+    def cmd_ping(self, message=None):
+        return b"PONG" if message is None else message
+
+    def cmd_select(self, db):
+        return True
+
+    def cmd_get(self, key):
+        item = self.store.live(key)
+        return None if item is None else item[0]
+
+    def cmd_mget(self, *keys):
+        return [self.cmd_get(key) for key in keys]
+
+    def cmd_exists(self, *keys):
+        return sum(self.store.live(key) is not None for key in keys)
+
+    def cmd_set(self, key, value, *options):
+        options = [option.upper() for option in options]
+        expires_at = None
+        for unit, scale in (("EX", 1.0), ("PX", 0.001)):
+            if unit in options:
+                expires_at = time.time() + float(options[options.index(unit) + 1]) * scale
+        exists = self.store.live(key) is not None
+        if ("NX" in options and exists) or ("XX" in options and not exists):
+            return None
+        self.store.values[key] = (value, expires_at)
+        self.store.touch(key)
+        return True
+
+    def cmd_del(self, *keys):
+        return sum(self.store.delete(key) for key in keys if self.store.live(key) is not None)
+
+    def cmd_scan(self, cursor, *options):
+        options = [option.upper() if i % 2 == 0 else option for i, option in enumerate(options)]
+        pattern = options[options.index("MATCH") + 1] if "MATCH" in options else "*"
+        keys = [key for key in list(self.store.values) if self.store.live(key) is not None]
+        # The whole keyspace in one page
+        return ["0", [key for key in keys if fnmatch.fnmatchcase(key, pattern)]]
+
+    def cmd_dbsize(self):
+        return sum(self.store.live(key) is not None for key in list(self.store.values))
+
+    def cmd_flushdb(self, *options):
+        for key in list(self.store.values):
+            self.store.delete(key)
+        return True
+
+    def cmd_watch(self, *keys):
+        if self.watched is None:
+            self.watched = {}
+        for key in keys:
+            self.watched.setdefault(key, self.store.versions.get(key, 0))
+        return True
+
+    def cmd_unwatch(self):
+        self.watched = None
+        return True
+
+    def cmd_multi(self):
+        if self.queued is not None:
+            raise CommandError("MULTI calls can not be nested")
+        self.queued = []
+        return True
+
+    def cmd_discard(self):
+        if self.queued is None:
+            raise CommandError("DISCARD without MULTI")
+        self.queued = None
+        self.watched = None
+        return True
+
+    def cmd_exec(self):
+        if self.queued is None:
+            raise CommandError("EXEC without MULTI")
+        queued, watched = self.queued, self.watched or {}
+        self.queued = self.watched = None
+        if any(self.store.versions.get(key, 0) != version for key, version in watched.items()):
+            return None
+        replies = []
+        for args in queued:
+            handler = getattr(self, f"cmd_{args[0].lower()}", None)
+            try:
+                if handler is None:
+                    raise CommandError(f"unknown command '{args[0]}'")
+                replies.append(handler(*args[1:]))
+            except CommandError as e:
+                replies.append(e)
+        return replies
+
+def start_stub_server(host="127.0.0.1", port=0, password=None):
+    """Start the stub in a daemon thread and return (server, url)"""
+    handler = type("ConfiguredStubRedisHandler", (StubRedisHandler,), {
+        "store": StubStore(),
+        "password": password,
+    })
+    server = socketserver.ThreadingTCPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True, name="stub-redis-server")
+    thread.start()
+    auth = f":{password}@" if password else ""
+    return server, f"redis://{auth}{host}:{server.server_address[1]}/0"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    parser.add_argument("--password", default=None, help="require AUTH with this password")
+    args = parser.parse_args(argv)
+
+    server, url = start_stub_server(args.host, args.port, args.password)
+    print(f"Stub Redis server listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()